@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ClientAlbum, Image
+from .models import ClientAlbum, DriveFolder, Image, ImageDerivative
 
 
 @admin.register(ClientAlbum)
@@ -22,18 +22,38 @@ class ClientAlbumAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(DriveFolder)
+class DriveFolderAdmin(admin.ModelAdmin):
+    list_display = ['name', 'parent_folder_name', 'kind', 'position', 'synced_at']
+    list_filter = ['kind', 'parent_folder_name']
+    search_fields = ['name', 'google_drive_id']
+    readonly_fields = ['id', 'google_drive_id', 'synced_at']
+
+
+class ImageDerivativeInline(admin.TabularInline):
+    model = ImageDerivative
+    extra = 0
+    fields = ['width', 'height', 'format', 'size', 'local_file_path']
+    readonly_fields = fields
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Image)
 class ImageAdmin(admin.ModelAdmin):
+    inlines = [ImageDerivativeInline]
     list_display = ['name', 'folder_name', 'parent_folder_name', 'downloaded_at', 'size']
     list_filter = ['folder_name', 'parent_folder_name', 'downloaded_at', 'mime_type']
     search_fields = ['name', 'google_drive_id', 'folder_name']
     readonly_fields = ['id', 'google_drive_id', 'downloaded_at', 'last_accessed']
     fieldsets = (
         ('Image Information', {
-            'fields': ('name', 'mime_type', 'size', 'width', 'height')
+            'fields': ('name', 'mime_type', 'size', 'width', 'height', 'md5_checksum', 'position')
         }),
         ('Storage Information', {
-            'fields': ('google_drive_id', 'local_file_path', 'folder_name', 'parent_folder_name')
+            'fields': ('google_drive_id', 'local_file_path', 'folder', 'folder_name', 'parent_folder_name')
         }),
         ('System Information', {
             'fields': ('id', 'downloaded_at', 'last_accessed'),
@@ -7,13 +7,9 @@ class AlbumsConfig(AppConfig):
     
     def ready(self):
         """Run when Django starts"""
-        import os
-        from django.conf import settings
-        
-        # Only run sync in production or when explicitly requested
-        if not settings.DEBUG or os.environ.get('SYNC_GOOGLE_DRIVE', '').lower() == 'true':
-            try:
-                from django.core.management import call_command
-                call_command('sync_google_drive')
-            except Exception as e:
-                print(f"Warning: Google Drive sync failed on startup: {e}")
+        # Register background job handlers. Syncing with Google Drive happens
+        # in `manage.py run_jobs` (or the cron endpoint), never at startup,
+        # so booting a worker doesn't wait on the network.
+        from . import jobs  # noqa: F401
+        # Sync change events refresh the affected cached pages
+        from . import cache_invalidation  # noqa: F401
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from core.drive_downloads import DriveDownloader
+from core.jobs import enqueue, is_active
+
+from .models import ClientAlbum, Image
+from .zip_stream import ZipMember, prefetch, stream_zip, unique_names
+
+# Bump when the archive layout changes so old archives aren't served
+ARCHIVE_VERSION = 1
+
+
+class IncompleteArchive(Exception):
+    """Some of the album's files couldn't be fetched; the partial archive was discarded"""
+
+
+def archive_dir() -> str:
+    return str(getattr(settings, 'ALBUM_ARCHIVE_DIR', '') or '')
+
+
+def archive_cache_enabled() -> bool:
+    """Archives are only cached in an explicitly configured ALBUM_ARCHIVE_DIR"""
+    return bool(getattr(settings, 'ALBUM_ARCHIVE_CACHE', False) and archive_dir())
+
+
+def album_archive_dir(album: ClientAlbum) -> str:
+    return os.path.join(archive_dir(), str(album.id))
+
+
+def content_hash(images: List[Dict], local_images: Dict[str, Image]) -> str:
+    """Hash of the album's image list: changes whenever a file is added, removed, renamed or edited"""
+    digest = hashlib.sha256(f'v{ARCHIVE_VERSION}'.encode('utf-8'))
+    for image_data in images:
+        image = local_images.get(image_data['id'])
+        # Listings carry Drive's checksum, so uncatalogued edits change the hash too
+        checksum = image_data.get('md5_checksum') or (image.md5_checksum if image else '')
+        modified = image_data.get('modified_time') or (image.modified_time.isoformat() if image and image.modified_time else '')
+        digest.update(f"\0{image_data['id']}\0{image_data['name']}\0{checksum}\0{modified}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def archive_path(album: ClientAlbum, archive_hash: str) -> str:
+    return os.path.join(album_archive_dir(album), f'{archive_hash}.zip')
+
+
+def album_members(drive_service, album: ClientAlbum, images: List[Dict], local_images: Dict[str, Image],
+                  async_service=None) -> List[ZipMember]:
+    """ZIP members for an album: local files where available, GCS/Drive fetches otherwise.
+
+    With ``async_service`` (an AsyncGoogleDriveService) remote members are
+    also given an ``afetch`` for ``aprefetch``.
+    """
+    downloader = DriveDownloader(drive_service)
+
+    def remote_fetch(image_data):
+        return lambda f: drive_service.fetch_image_content(
+            image_data['id'], image_data['name'], album.folder_name, f, downloader
+        )
+
+    def remote_afetch(image_data):
+        if async_service is None:
+            return None
+        return lambda f: async_service.fetch_image_content(
+            image_data['id'], image_data['name'], album.folder_name, f
+        )
+
+    members = []
+    for image_data, name in zip(images, unique_names(image_data['name'] for image_data in images)):
+        image = local_images.get(image_data['id'])
+        if image and image.local_file_path and os.path.exists(image.local_file_path):
+            members.append(ZipMember.from_path(name, image.local_file_path, image.mime_type))
+        else:
+            members.append(ZipMember(name, mime_type=image_data.get('mime_type', ''), fetch=remote_fetch(image_data),
+                                     afetch=remote_afetch(image_data)))
+    return members
+
+
+def local_images_for(images: List[Dict]) -> Dict[str, Image]:
+    return Image.objects.in_bulk([image_data['id'] for image_data in images], field_name='google_drive_id')
+
+
+def enqueue_archive_build(album: ClientAlbum):
+    """Queue a build unless one is already queued or running; every ZIP miss calls this"""
+    key = f'album-archive:{album.id}'
+    if is_active(key):
+        return None
+    return enqueue('build_album_archive', {'album_id': str(album.id)}, key=key)
+
+
+def build_album_archive(album: ClientAlbum, drive_service=None) -> Optional[str]:
+    """Write the album's current ZIP to the archive cache; returns its path.
+
+    Raises IncompleteArchive rather than caching an archive with missing
+    files, so the job is retried with backoff.
+    """
+    from core.services import GoogleDriveService
+
+    drive_service = drive_service or GoogleDriveService()
+    images = drive_service.get_private_album_files(album.folder_name)
+    if not images:
+        remove_album_archives(album)
+        return None
+
+    local_images = local_images_for(images)
+    path = archive_path(album, content_hash(images, local_images))
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.part')
+    missing = []
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            members = album_members(drive_service, album, images, local_images)
+            for data in stream_zip(prefetch(members, missing=missing)):
+                f.write(data)
+        if missing:
+            # An archive with MISSING_FILES.txt would be served until the album changes
+            raise IncompleteArchive(f'{len(missing)} files of {album.name} could not be fetched: {", ".join(missing)}')
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    # Only the archive for the current image list is worth keeping
+    remove_album_archives(album, keep=path)
+    print(f'Built archive for {album.name}: {os.path.getsize(path)} bytes')
+    return path
+
+
+def remove_album_archives(album: ClientAlbum, keep: Optional[str] = None) -> int:
+    directory = album_archive_dir(album)
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if path != keep and name.endswith('.zip'):
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def invalidate_album_archives(folder_names: Iterable[str]) -> int:
+    """Drop cached archives of albums whose Drive folder changed and queue fresh builds"""
+    if not archive_cache_enabled():
+        return 0
+    albums = ClientAlbum.objects.filter(folder_name__in=set(folder_names))
+    for album in albums:
+        remove_album_archives(album)
+        enqueue_archive_build(album)
+    return len(albums)
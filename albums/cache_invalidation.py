@@ -0,0 +1,53 @@
+from typing import Iterable, List, Set, Tuple
+
+from django.dispatch import receiver
+from django.urls import reverse
+
+from core.folder_cache import join_folder_path
+from core.listing_cache import listing_cache
+from core.page_cache import refresh_pages
+
+from .models import ClientAlbum, DriveFolder
+from .signals import drive_folders_changed
+
+# Listings of the whole public portfolio, affected by any gallery or carousel change
+PORTFOLIO_LISTING_KEYS = ['public-portfolio', 'public-galleries', 'public-carousel']
+
+
+def affected_listing_keys(changes: Iterable[Tuple[str, str]]) -> Set[str]:
+    keys = set()
+    for kind, folder_name in changes:
+        if kind == DriveFolder.KIND_ALBUM:
+            keys.add(f"folder:{join_folder_path('Private_Albums', folder_name)}")
+        else:
+            keys.add(f"folder:{join_folder_path('Public_Portfolio', folder_name)}")
+            keys.update(PORTFOLIO_LISTING_KEYS)
+    return keys
+
+
+def affected_pages(changes: Iterable[Tuple[str, str]]) -> List[str]:
+    """Paths of every cached page that shows images from the changed folders"""
+    changes = list(changes)
+    paths = []
+    if any(kind != DriveFolder.KIND_ALBUM for kind, _ in changes):
+        paths.append(reverse('portfolio:home'))
+    for kind, folder_name in changes:
+        if kind == DriveFolder.KIND_GALLERY:
+            paths.append(reverse('portfolio:gallery_detail', kwargs={'gallery_name': folder_name}))
+    album_folders = {folder_name for kind, folder_name in changes if kind == DriveFolder.KIND_ALBUM}
+    if album_folders:
+        for album in ClientAlbum.objects.filter(folder_name__in=album_folders):
+            paths.append(reverse('albums:album_detail', kwargs={'album_id': album.id}))
+    return paths
+
+
+@receiver(drive_folders_changed)
+def refresh_changed_pages(sender, changes, **kwargs):
+    """Forget the cached listings and pages of changed folders and render the pages again,
+    so the first visitor after a sync doesn't wait for Drive"""
+    changes = set(changes)
+    for key in affected_listing_keys(changes):
+        listing_cache.delete(key)
+    paths = affected_pages(changes)
+    refreshed = refresh_pages(paths)
+    print(f'Refreshed {refreshed} of {len(paths)} cached pages for {len(changes)} changed folders')
@@ -0,0 +1,360 @@
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.folder_cache import folder_id_cache, join_folder_path
+from core.time_budget import TimeBudget
+
+from .models import DriveFolder, DriveSyncState, Image
+
+
+# Metadata kept in the catalog for every image
+CATALOG_FIELDS = 'id, name, mimeType, size, md5Checksum, modifiedTime, imageMediaMetadata(width, height)'
+
+# Top-level Drive folders whose subfolders make up the catalog
+CATALOG_ROOTS = ['Public_Portfolio', 'Private_Albums']
+
+# File fields requested for each change in an incremental sync
+CHANGE_FIELDS = f'{CATALOG_FIELDS}, parents, trashed'
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+SYNC_STATE_NAME = 'catalog'
+
+
+class CatalogSync:
+    """Mirror every public gallery and private album into DriveFolder/Image rows.
+
+    Only metadata is stored; nothing is downloaded. Once the catalog is
+    complete, pages can be rendered from the database without calling Drive.
+    """
+
+    def __init__(self, drive_service, log=print):
+        self.drive_service = drive_service
+        self.log = log
+        self.stats = {'folders': 0, 'created': 0, 'updated': 0, 'removed': 0, 'folders_removed': 0, 'changes': 0}
+        # (kind, folder name) of every folder whose contents changed
+        self.changed_folders = []
+        # False when run_incremental stopped before applying every change
+        self.complete = True
+        self._root_ids_cache = None
+
+    @staticmethod
+    def folder_kind(parent_folder_name: str, folder_name: str) -> str:
+        if parent_folder_name == 'Private_Albums':
+            return DriveFolder.KIND_ALBUM
+        if folder_name == 'public':
+            return DriveFolder.KIND_CAROUSEL
+        return DriveFolder.KIND_GALLERY
+
+    def run(self) -> Dict[str, int]:
+        synced_at = timezone.now()
+
+        for root_name in CATALOG_ROOTS:
+            root_id = self.drive_service.get_folder_id(root_name)
+            if not root_id:
+                # Leave the existing catalog alone rather than wiping it
+                self.log(f'{root_name} folder not found, skipping')
+                continue
+
+            subfolders = list(self.drive_service.iter_subfolders(root_id))
+            folders = {}
+            for position, subfolder in enumerate(subfolders):
+                folders[subfolder['id']] = self._upsert_folder(subfolder, root_name, position, synced_at)
+
+            files_by_folder = {folder_id: [] for folder_id in folders}
+            for file in self.drive_service.iter_images_in_folders(list(folders), fields=CATALOG_FIELDS):
+                for parent_id in file.get('parents', []):
+                    if parent_id in files_by_folder:
+                        files_by_folder[parent_id].append(file)
+                        break
+
+            for folder_id, folder in folders.items():
+                self.sync_folder_images(folder, files_by_folder[folder_id])
+
+            self._remove_missing_folders(root_name, list(folders))
+
+        return self.stats
+
+    def _upsert_folder(self, drive_folder: Dict, parent_folder_name: str, position: int, synced_at) -> DriveFolder:
+        folder, _ = DriveFolder.objects.update_or_create(
+            google_drive_id=drive_folder['id'],
+            defaults={
+                'name': drive_folder['name'],
+                'parent_folder_name': parent_folder_name,
+                'kind': self.folder_kind(parent_folder_name, drive_folder['name']),
+                'position': position,
+                'synced_at': synced_at,
+            }
+        )
+        self.stats['folders'] += 1
+        return folder
+
+    @staticmethod
+    def image_values(file: Dict, folder: DriveFolder, position: int) -> Dict:
+        """Image field values for a Drive file listed with CATALOG_FIELDS"""
+        metadata = file.get('imageMediaMetadata') or {}
+        return {
+            'name': file['name'],
+            'mime_type': file['mimeType'],
+            'folder': folder,
+            'folder_name': folder.name,
+            'parent_folder_name': folder.parent_folder_name,
+            'size': int(file.get('size', 0)),
+            'width': metadata.get('width', 0),
+            'height': metadata.get('height', 0),
+            'md5_checksum': file.get('md5Checksum', ''),
+            'modified_time': parse_datetime(file['modifiedTime']) if file.get('modifiedTime') else None,
+            'position': position,
+        }
+
+    def sync_folder_images(self, folder: DriveFolder, files: List[Dict]) -> bool:
+        """Make the folder's Image rows match ``files`` (in display order)"""
+        file_ids = [file['id'] for file in files]
+        existing = {image.google_drive_id: image for image in Image.objects.filter(google_drive_id__in=file_ids)}
+
+        to_create = []
+        to_update = []
+        update_fields = set()
+        for position, file in enumerate(files):
+            values = self.image_values(file, folder, position)
+            image = existing.get(file['id'])
+            if image is None:
+                to_create.append(Image(google_drive_id=file['id'], **values))
+                continue
+            changed = [field for field, value in values.items() if getattr(image, field) != value]
+            if changed:
+                for field in changed:
+                    setattr(image, field, values[field])
+                update_fields.update(changed)
+                to_update.append(image)
+
+        stale = list(Image.objects.filter(folder=folder).exclude(google_drive_id__in=file_ids))
+
+        with transaction.atomic():
+            if to_create:
+                Image.objects.bulk_create(to_create, batch_size=500)
+            if to_update:
+                Image.objects.bulk_update(to_update, sorted(update_fields), batch_size=500)
+            for image in stale:
+                image.delete_local_file()
+                image.delete()
+
+        self.stats['created'] += len(to_create)
+        self.stats['updated'] += len(to_update)
+        self.stats['removed'] += len(stale)
+
+        changed = bool(to_create or to_update or stale)
+        if changed:
+            self.changed_folders.append((folder.kind, folder.name))
+            self.log(f'  {folder}: {len(to_create)} added, {len(to_update)} updated, {len(stale)} removed')
+        return changed
+
+    def _remove_missing_folders(self, parent_folder_name: str, seen_folder_ids: List[str]):
+        missing = DriveFolder.objects.filter(parent_folder_name=parent_folder_name).exclude(
+            google_drive_id__in=seen_folder_ids
+        )
+        for folder in missing:
+            self._delete_folder(folder)
+
+    # -------- incremental sync --------
+    def run_incremental(self, budget: Optional[TimeBudget] = None) -> Dict[str, int]:
+        """Apply only what changed on Drive since the stored page token.
+
+        The first run has no token yet: it records one, then seeds the catalog
+        with a full sync, so changes made while that sync runs are picked up
+        afterwards. With a ``budget``, no further folder (while seeding) or
+        page of changes is started once it runs low: progress is stored and
+        ``complete`` is False, so the next run continues from there.
+        """
+        state, _ = DriveSyncState.objects.get_or_create(name=SYNC_STATE_NAME)
+        if not state.page_token:
+            self.log('No change token stored yet, seeding the catalog with a full sync')
+            # Stored first, so a seed spread over several runs misses no change
+            state.page_token = self.drive_service.get_start_page_token()
+            state.seeding_since = timezone.now()
+            state.save(update_fields=['page_token', 'seeding_since', 'updated_at'])
+        if state.seeding_since is not None:
+            if not self._seed(state.seeding_since, budget):
+                self.complete = False
+                return self.stats
+            state.seeding_since = None
+            state.save(update_fields=['seeding_since', 'updated_at'])
+            return self.stats
+
+        touched_folder_ids = set()
+        new_token = state.page_token
+        for changes, new_token, last in self.drive_service.iter_change_pages(state.page_token, file_fields=CHANGE_FIELDS):
+            self.stats['changes'] += len(changes)
+            for change in changes:
+                folder = self._apply_change(change)
+                if folder is not None:
+                    touched_folder_ids.add(folder.pk)
+            if not last and budget is not None and budget.low():
+                self.log('Out of time, the remaining changes are applied next run')
+                self.complete = False
+                break
+
+        # Re-read the folders: later changes may have renamed or deleted them
+        for folder in DriveFolder.objects.filter(pk__in=touched_folder_ids):
+            self._renumber_images(folder)
+            self.changed_folders.append((folder.kind, folder.name))
+
+        state.page_token = new_token
+        state.save(update_fields=['page_token', 'updated_at'])
+        return self.stats
+
+    def _seed(self, since, budget: Optional[TimeBudget] = None) -> bool:
+        """Full sync one folder at a time, skipping folders already synced since ``since``.
+
+        Returns False when the budget ran low before every folder was synced.
+        """
+        for root_name in CATALOG_ROOTS:
+            root_id = self.drive_service.get_folder_id(root_name)
+            if not root_id:
+                self.log(f'{root_name} folder not found, skipping')
+                continue
+
+            subfolders = list(self.drive_service.iter_subfolders(root_id))
+            for position, subfolder in enumerate(subfolders):
+                folder = DriveFolder.objects.filter(google_drive_id=subfolder['id']).first()
+                if folder is not None and folder.synced_at and folder.synced_at >= since:
+                    continue
+                if budget is not None and budget.low():
+                    self.log('Out of time, the catalog seed continues next run')
+                    return False
+                files = list(self.drive_service.iter_images_in_folder(subfolder['id'], fields=CATALOG_FIELDS))
+                # Marked synced only once its images are in, so an interrupted folder is redone
+                folder = self._upsert_folder(subfolder, root_name, position, folder.synced_at if folder else None)
+                self.sync_folder_images(folder, files)
+                folder.synced_at = timezone.now()
+                folder.save(update_fields=['synced_at'])
+
+            self._remove_missing_folders(root_name, [subfolder['id'] for subfolder in subfolders])
+            self._renumber_folders(root_name)
+        return True
+
+    def _root_ids(self) -> Dict[str, str]:
+        """Drive ID -> name of the catalog roots (normally served from the folder cache)"""
+        if self._root_ids_cache is None:
+            self._root_ids_cache = {}
+            for root_name in CATALOG_ROOTS:
+                root_id = self.drive_service.get_folder_id(root_name)
+                if root_id:
+                    self._root_ids_cache[root_id] = root_name
+        return self._root_ids_cache
+
+    def _apply_change(self, change: Dict):
+        """Apply one Changes API entry; returns the folder whose images changed, if any"""
+        file = change.get('file') or {}
+        if change.get('removed') or file.get('trashed'):
+            return self._remove_file(change['fileId'])
+
+        if file.get('mimeType') == FOLDER_MIME_TYPE:
+            self._apply_folder_change(file)
+            return None
+        if not file.get('mimeType', '').startswith('image/'):
+            return None
+
+        folder = DriveFolder.objects.filter(google_drive_id__in=file.get('parents', [])).first()
+        if folder is None:
+            # Not (or no longer) inside a catalogued folder
+            return self._remove_file(file['id'])
+
+        previous = Image.objects.filter(google_drive_id=file['id']).select_related('folder').first()
+        values = self.image_values(file, folder, previous.position if previous and previous.folder_id == folder.pk else 0)
+        if previous is None:
+            Image.objects.create(google_drive_id=file['id'], **values)
+            self.stats['created'] += 1
+        else:
+            if previous.folder_id and previous.folder_id != folder.pk:
+                # Moved between catalogued folders: the old one changed too
+                self.changed_folders.append((previous.folder.kind, previous.folder.name))
+            for field, value in values.items():
+                setattr(previous, field, value)
+            previous.save()
+            self.stats['updated'] += 1
+        return folder
+
+    def _apply_folder_change(self, file: Dict):
+        """Handle a folder being added, renamed or moved under the catalog roots"""
+        root_name = next((self._root_ids()[parent] for parent in file.get('parents', []) if parent in self._root_ids()), None)
+        folder = DriveFolder.objects.filter(google_drive_id=file['id']).first()
+        if folder is None and root_name is None:
+            return
+
+        # The folder's old and new paths may both map to stale IDs
+        if folder is not None:
+            folder_id_cache.invalidate(join_folder_path(folder.parent_folder_name, folder.name))
+        if root_name is not None:
+            folder_id_cache.invalidate(join_folder_path(root_name, file['name']))
+
+        if root_name is None:
+            self._delete_folder(folder)
+            return
+
+        kind = self.folder_kind(root_name, file['name'])
+        if folder is None:
+            folder = DriveFolder.objects.create(
+                google_drive_id=file['id'], name=file['name'], parent_folder_name=root_name,
+                kind=kind, synced_at=timezone.now(),
+            )
+            self.stats['folders'] += 1
+            # A folder created with its images already inside (e.g. a moved
+            # folder) reports no change for those images, so list it once
+            self.sync_folder_images(folder, list(self.drive_service.iter_images_in_folder(file['id'], fields=CATALOG_FIELDS)))
+        else:
+            if folder.name != file['name'] or folder.parent_folder_name != root_name:
+                self.changed_folders.append((folder.kind, folder.name))
+            folder.name = file['name']
+            folder.parent_folder_name = root_name
+            folder.kind = kind
+            folder.synced_at = timezone.now()
+            folder.save()
+            # Images denormalize their folder's name
+            folder.images.update(folder_name=folder.name, parent_folder_name=root_name)
+            self.changed_folders.append((folder.kind, folder.name))
+        self._renumber_folders(root_name)
+
+    def _remove_file(self, file_id: str):
+        """Forget a deleted/trashed/moved-out file, whether it is an image or a folder"""
+        folder = DriveFolder.objects.filter(google_drive_id=file_id).first()
+        if folder is not None:
+            folder_id_cache.invalidate(join_folder_path(folder.parent_folder_name, folder.name))
+            self._delete_folder(folder)
+            return None
+
+        image = Image.objects.filter(google_drive_id=file_id).select_related('folder').first()
+        if image is None:
+            return None
+        touched = image.folder
+        image.delete_local_file()
+        image.delete()
+        self.stats['removed'] += 1
+        return touched
+
+    def _delete_folder(self, folder: DriveFolder):
+        self.log(f'  {folder} no longer exists on Google Drive, removing')
+        # Delete rows one at a time so files shared with other images are kept
+        for image in folder.images.all():
+            image.delete_local_file()
+            image.delete()
+        self.changed_folders.append((folder.kind, folder.name))
+        folder.delete()
+        self.stats['folders_removed'] += 1
+
+    @staticmethod
+    def _renumber_images(folder: DriveFolder):
+        images = list(folder.images.order_by('name'))
+        for position, image in enumerate(images):
+            image.position = position
+        Image.objects.bulk_update(images, ['position'], batch_size=500)
+
+    @staticmethod
+    def _renumber_folders(parent_folder_name: str):
+        folders = list(DriveFolder.objects.filter(parent_folder_name=parent_folder_name).order_by('name'))
+        for position, folder in enumerate(folders):
+            folder.position = position
+        DriveFolder.objects.bulk_update(folders, ['position'])
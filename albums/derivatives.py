@@ -0,0 +1,140 @@
+import os
+import tempfile
+from typing import List, Tuple
+
+from django.conf import settings
+
+from .models import Image, ImageDerivative
+
+try:
+    # Optional: derivatives are skipped when Pillow isn't installed
+    from PIL import Image as PILImage, ImageOps  # type: ignore
+except Exception:
+    PILImage = None
+
+# Pillow format name and encoder options for each derivative format
+ENCODERS = {
+    ImageDerivative.FORMAT_WEBP: ('WEBP', {'quality': 80, 'method': 4}),
+    ImageDerivative.FORMAT_JPEG: ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+FILE_EXTENSIONS = {
+    ImageDerivative.FORMAT_WEBP: '.webp',
+    ImageDerivative.FORMAT_JPEG: '.jpg',
+}
+
+
+def derivatives_enabled() -> bool:
+    return PILImage is not None and bool(getattr(settings, 'IMAGE_DERIVATIVES', True))
+
+
+def derivative_widths() -> List[int]:
+    return sorted(int(width) for width in getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', [400, 800, 1600]))
+
+
+def derivative_path(source_path: str, width: int, format: str) -> str:
+    """``.../abc123.jpg`` -> ``.../abc123.w400.webp``"""
+    return f"{os.path.splitext(source_path)[0]}.w{width}{FILE_EXTENSIONS[format]}"
+
+
+def open_oriented(source_path: str):
+    """Open an image with its camera orientation applied, in a mode every encoder accepts"""
+    with PILImage.open(source_path) as source:
+        # Apply the camera orientation so thumbnails aren't sideways
+        picture = ImageOps.exif_transpose(source)
+        if picture.mode not in ('RGB', 'L'):
+            picture = picture.convert('RGB')
+        picture.load()
+        return picture
+
+
+def save_image(picture, path: str, format: str):
+    """Encode ``picture`` to ``path`` atomically (temp file + rename)"""
+    pil_format, options = ENCODERS[format]
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            picture.save(f, pil_format, **options)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def resize_to_file(source_path: str, width: int, format: str, dest_path: str) -> Tuple[int, int]:
+    """Write a ``width``-px-wide copy of ``source_path`` (never upscaled); returns its size"""
+    source = open_oriented(source_path)
+    width = min(width, source.width)
+    height = round(source.height * width / source.width)
+    save_image(source.resize((width, height), PILImage.LANCZOS), dest_path, format)
+    return width, height
+
+
+class DerivativeGenerator:
+    """Create the resized WebP/JPEG copies grid tiles load instead of the original.
+
+    Derivatives are written next to the original file, so only locally stored
+    images get them; tiles of images listed from Drive use its thumbnail links
+    instead (``GoogleDriveService._thumbnail_urls``). Images that share a file (same checksum) also share its derivatives,
+    so they are only encoded once. Widths at or above the original's width are
+    skipped; an image narrower than the smallest width gets a single
+    derivative at its own width.
+    """
+
+    def __init__(self, widths: List[int] = None, formats: List[str] = None):
+        self.widths = widths or derivative_widths()
+        self.formats = formats or list(ENCODERS)
+        self.stats = {'images': 0, 'created': 0, 'encoded': 0, 'failed': 0}
+
+    def missing(self, image: Image) -> bool:
+        """Whether the image has a local original but not all of its derivatives"""
+        if not image.local_file_path or not os.path.exists(image.local_file_path):
+            return False
+        return len(image.derivatives.all()) < self._expected_count(image)
+
+    def _expected_count(self, image: Image) -> int:
+        return len(self._target_widths(image.width)) * len(self.formats) if image.width else 1
+
+    def _target_widths(self, source_width: int) -> List[int]:
+        widths = [width for width in self.widths if width < source_width]
+        return widths or [min(source_width, self.widths[0])]
+
+    def generate(self, image: Image) -> List[ImageDerivative]:
+        """Create any missing derivatives for ``image``; returns its derivatives"""
+        if not derivatives_enabled() or not image.local_file_path or not os.path.exists(image.local_file_path):
+            return []
+
+        existing = {(d.width, d.format): d for d in image.derivatives.all()}
+        if len(existing) >= self._expected_count(image):
+            # Already done (e.g. a re-sync of an unchanged image): don't decode the original
+            return list(existing.values())
+        try:
+            source = open_oriented(image.local_file_path)
+            created = []
+            for width in self._target_widths(source.width):
+                height = round(source.height * width / source.width)
+                resized = None
+                for format in self.formats:
+                    if (width, format) in existing:
+                        continue
+                    path = derivative_path(image.local_file_path, width, format)
+                    if not os.path.exists(path):
+                        if resized is None:
+                            resized = source.resize((width, height), PILImage.LANCZOS)
+                        save_image(resized, path, format)
+                        self.stats['encoded'] += 1
+                    created.append(ImageDerivative(
+                        image=image, width=width, height=height, format=format,
+                        local_file_path=path, size=os.path.getsize(path),
+                    ))
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f'Error creating derivatives for {image.name}: {e}')
+            return list(existing.values())
+
+        if created:
+            ImageDerivative.objects.bulk_create(created, ignore_conflicts=True)
+            self.stats['created'] += len(created)
+        self.stats['images'] += 1
+        return list(ImageDerivative.objects.filter(image=image))
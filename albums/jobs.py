@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management import call_command
+
+from core.jobs import Reschedule, register
+from core.services import GoogleDriveService
+from core.time_budget import TimeBudget
+
+from . import archives
+from .catalog import CatalogSync
+from .models import ClientAlbum
+from .signals import drive_folders_changed
+
+SYNC_INTERVAL = int(getattr(settings, 'DRIVE_SYNC_INTERVAL_SECONDS', 15 * 60))
+CATALOG = bool(getattr(settings, 'IMAGE_CATALOG', False))
+
+
+# Needs a `run_jobs` worker: downloads and derivatives can run for minutes.
+# With the image catalog, sync_catalog_changes keeps it current instead
+@register('sync_google_drive', interval=None if CATALOG else SYNC_INTERVAL)
+def sync_google_drive(payload):
+    """Run ``manage.py sync_google_drive`` with the payload as its options"""
+    options = dict(payload)
+    if not options and CATALOG:
+        # Scheduled runs only need to apply what changed since the last sync
+        options['incremental'] = True
+    call_command('sync_google_drive', **options)
+
+
+@register('sync_catalog_changes', interval=SYNC_INTERVAL if CATALOG else None, cron=True)
+def sync_catalog_changes(payload):
+    """Apply Drive changes to the image catalog, stopping after CRON_JOB_BUDGET_SECONDS.
+
+    Safe for the cron endpoint: a backlog too large for one run is continued
+    by the next one from the stored change token.
+    """
+    budget = TimeBudget(float(getattr(settings, 'CRON_JOB_BUDGET_SECONDS', 20)))
+    catalog = CatalogSync(GoogleDriveService(budget=budget))
+    stats = catalog.run_incremental(budget=budget)
+    print(f'Catalog changes: {stats}')
+    if catalog.changed_folders:
+        drive_folders_changed.send(sender=CatalogSync, changes=sorted(set(catalog.changed_folders)))
+    if not catalog.complete:
+        raise Reschedule('more changes to apply')
+
+
+# Needs a `run_jobs` worker: zipping a whole album takes longer than a function may run
+@register('build_album_archive')
+def build_album_archive(payload):
+    """Prebuild an album's ZIP so downloads are served from the archive cache"""
+    album = ClientAlbum.objects.filter(id=payload['album_id']).first()
+    if album is not None:
+        archives.build_album_archive(album)
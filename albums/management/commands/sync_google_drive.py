@@ -1,9 +1,16 @@
 import os
 import requests
+from django.utils.dateparse import parse_datetime
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from albums.models import Image
+from albums.archives import invalidate_album_archives
+from albums.catalog import CatalogSync
+from albums.derivatives import DerivativeGenerator, derivatives_enabled
+from albums.models import DriveFolder, Image
+from albums.signals import drive_folders_changed
+from core.drive_downloads import DriveDownloader
 from core.services import GoogleDriveService
+from core.folder_cache import folder_id_cache, join_folder_path
 
 
 class Command(BaseCommand):
@@ -20,6 +27,27 @@ class Command(BaseCommand):
             action='store_true',
             help='Download public gallery images on deployment',
         )
+        parser.add_argument(
+            '--catalog',
+            action='store_true',
+            help='Record metadata for every public gallery and private album in the image catalog',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Apply only changes since the last sync (Drive Changes API) to the image catalog',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'DRIVE_DOWNLOAD_WORKERS', 4),
+            help='Number of images to download in parallel',
+        )
+        parser.add_argument(
+            '--derivatives',
+            action='store_true',
+            help='Create missing thumbnails (resized WebP/JPEG copies) for every downloaded image',
+        )
         parser.add_argument(
             '--force',
             action='store_true',
@@ -34,6 +62,10 @@ class Command(BaseCommand):
         os.makedirs(media_dir, exist_ok=True)
         
         drive_service = GoogleDriveService()
+        self.downloader = DriveDownloader(drive_service, workers=options['workers'])
+        self.derivatives = DerivativeGenerator()
+        # (kind, folder name) of every gallery, carousel or album this sync changed
+        self.changed_folders = set()
         
         # Sync public folder on deployment
         if options['download_public']:
@@ -45,9 +77,38 @@ class Command(BaseCommand):
             self.stdout.write('Downloading public gallery images...')
             self._download_public_galleries(drive_service, media_dir, options['force'])
         
-        # Check for deleted folders and clean up
-        self.stdout.write('Checking for deleted folders...')
-        self._cleanup_deleted_folders(drive_service)
+        # Keep the image catalog complete so pages can render from the database
+        if options['incremental']:
+            self.stdout.write('Applying Google Drive changes to image catalog...')
+            self._sync_catalog(drive_service, incremental=True)
+        elif options['catalog']:
+            self.stdout.write('Syncing image catalog...')
+            self._sync_catalog(drive_service)
+        
+        # Backfill thumbnails for images downloaded before they existed
+        if options['derivatives']:
+            self.stdout.write('Creating missing image derivatives...')
+            self._create_missing_derivatives()
+        
+        # Check for deleted folders and clean up; incremental syncs already
+        # receive deletions through the change feed
+        if not options['incremental']:
+            self.stdout.write('Checking for deleted folders...')
+            self._cleanup_deleted_folders(drive_service)
+        
+        if self.downloader.files or self.downloader.failures:
+            self.stdout.write(f'Downloads: {self.downloader.summary()}')
+        if self.derivatives.stats['images'] or self.derivatives.stats['failed']:
+            stats = self.derivatives.stats
+            self.stdout.write(
+                f"Derivatives: {stats['created']} created ({stats['encoded']} encoded) "
+                f"for {stats['images']} images, {stats['failed']} failed"
+            )
+        
+        # Let cached listings and pages of changed folders be refreshed
+        if self.changed_folders:
+            self.stdout.write(f'{len(self.changed_folders)} folders changed, refreshing cached pages...')
+            drive_folders_changed.send(sender=self.__class__, changes=sorted(self.changed_folders))
         
         self.stdout.write(self.style.SUCCESS('Google Drive sync completed!'))
 
@@ -66,34 +127,15 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING('public folder not found'))
                 return
             
-            # Get files from public folder
-            results = drive_service.service.files().list(
-                q=f"'{public_folder_id}' in parents and trashed=false",
-                spaces='drive',
-                fields='files(id, name, mimeType, size, imageMediaMetadata)',
-                orderBy='name'
-            ).execute()
-            
-            files = results.get('files', [])
-            downloaded_count = 0
-            
-            for file in files:
-                if file['mimeType'].startswith('image/'):
-                    # Check if image already exists
-                    existing_image = Image.objects.filter(google_drive_id=file['id']).first()
-                    
-                    if existing_image and not force:
-                        self.stdout.write(f'Image {file["name"]} already exists, skipping...')
-                        continue
-                    
-                    # Download the image
-                    success = self._download_image(
-                        drive_service, file, media_dir, 'public', 'Public_Portfolio'
-                    )
-                    if success:
-                        downloaded_count += 1
+            # Stream files from the public folder page by page
+            files = drive_service.iter_images_in_folder(public_folder_id, fields=drive_service.DOWNLOAD_FIELDS)
+            downloaded_count, skipped_count = self._download_images(
+                self._files_to_download(files, force), media_dir, 'public', 'Public_Portfolio'
+            )
             
-            self.stdout.write(f'Downloaded {downloaded_count} images from public folder')
+            self.stdout.write(
+                f'Downloaded {downloaded_count} images from public folder ({skipped_count} already stored)'
+            )
             
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error downloading public images: {e}'))
@@ -108,113 +150,182 @@ class Command(BaseCommand):
                 return
             
             # Get all subfolders in Public_Portfolio (excluding 'public' folder)
-            results = drive_service.service.files().list(
-                q=f"'{portfolio_folder_id}' in parents and mimeType='application/vnd.google-apps.folder' and name!='public' and trashed=false",
-                spaces='drive',
-                fields='files(id, name)',
-                orderBy='name'
-            ).execute()
-            
-            subfolders = results.get('files', [])
+            subfolders = list(drive_service.iter_subfolders(portfolio_folder_id, exclude='public'))
             total_downloaded = 0
+            total_skipped = 0
             
             for subfolder in subfolders:
                 gallery_name = subfolder['name']
                 self.stdout.write(f'Processing gallery: {gallery_name}')
                 
-                # Get files from this gallery
-                gallery_results = drive_service.service.files().list(
-                    q=f"'{subfolder['id']}' in parents and trashed=false",
-                    spaces='drive',
-                    fields='files(id, name, mimeType, size, imageMediaMetadata)',
-                    orderBy='name'
-                ).execute()
+                # Stream files from this gallery page by page
+                files = drive_service.iter_images_in_folder(subfolder['id'], fields=drive_service.DOWNLOAD_FIELDS)
+                gallery_downloaded, gallery_skipped = self._download_images(
+                    self._files_to_download(files, force), media_dir, gallery_name, 'Public_Portfolio'
+                )
                 
-                gallery_files = gallery_results.get('files', [])
-                gallery_downloaded = 0
-                
-                for file in gallery_files:
-                    if file['mimeType'].startswith('image/'):
-                        # Check if image already exists
-                        existing_image = Image.objects.filter(google_drive_id=file['id']).first()
-                        
-                        if existing_image and not force:
-                            self.stdout.write(f'  Image {file["name"]} already exists, skipping...')
-                            continue
-                        
-                        # Download the image
-                        success = self._download_image(
-                            drive_service, file, media_dir, gallery_name, 'Public_Portfolio'
-                        )
-                        if success:
-                            gallery_downloaded += 1
-                
-                self.stdout.write(f'  Downloaded {gallery_downloaded} images from {gallery_name}')
+                self.stdout.write(
+                    f'  Downloaded {gallery_downloaded} images from {gallery_name} ({gallery_skipped} already stored)'
+                )
                 total_downloaded += gallery_downloaded
+                total_skipped += gallery_skipped
             
-            self.stdout.write(f'Total downloaded: {total_downloaded} images from {len(subfolders)} galleries')
+            self.stdout.write(
+                f'Total downloaded: {total_downloaded} images from {len(subfolders)} galleries '
+                f'({total_skipped} already stored)'
+            )
             
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error downloading public galleries: {e}'))
 
-    def _download_image(self, drive_service, file_data, media_dir, folder_name, parent_folder_name=None):
-        """Download a single image from Google Drive"""
+    def _sync_catalog(self, drive_service, incremental=False):
+        """Mirror Drive folder and image metadata into the catalog tables"""
         try:
-            # Generate local file path
-            file_extension = os.path.splitext(file_data['name'])[1]
-            local_filename = f"{file_data['id']}{file_extension}"
-            local_path = os.path.join(media_dir, local_filename)
+            catalog = CatalogSync(drive_service, log=self.stdout.write)
+            stats = catalog.run_incremental() if incremental else catalog.run()
+            self.changed_folders.update(catalog.changed_folders)
             
-            # Download file from Google Drive
-            request = drive_service.service.files().get_media(fileId=file_data['id'])
-            with open(local_path, 'wb') as f:
-                f.write(request.execute())
-            
-            # Get image dimensions
-            width = 0
-            height = 0
-            if file_data.get('imageMediaMetadata'):
-                metadata = file_data['imageMediaMetadata']
-                width = metadata.get('width', 0)
-                height = metadata.get('height', 0)
-            
-            # Create or update Image record
-            image, created = Image.objects.update_or_create(
-                google_drive_id=file_data['id'],
-                defaults={
-                    'name': file_data['name'],
-                    'mime_type': file_data['mimeType'],
-                    'local_file_path': local_path,
-                    'folder_name': folder_name,
-                    'parent_folder_name': parent_folder_name,
-                    'size': int(file_data.get('size', 0)),
-                    'width': width,
-                    'height': height,
-                }
+            # Cached ZIPs of changed albums are stale: drop them and rebuild in the background
+            changed_albums = [name for kind, name in catalog.changed_folders if kind == DriveFolder.KIND_ALBUM]
+            if changed_albums:
+                rebuilt = invalidate_album_archives(changed_albums)
+                self.stdout.write(f'Queued archive rebuilds for {rebuilt} changed albums')
+            self.stdout.write(
+                f"Catalog: {stats['changes']} changes, {stats['folders']} folders, {stats['created']} added, "
+                f"{stats['updated']} updated, {stats['removed']} removed, "
+                f"{stats['folders_removed']} folders removed"
             )
-            
-            action = 'Downloaded' if created else 'Updated'
-            self.stdout.write(f'{action} image: {file_data["name"]}')
-            return True
-            
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error downloading {file_data["name"]}: {e}'))
-            return False
+            self.stdout.write(self.style.ERROR(f'Error syncing image catalog: {e}'))
+
+    def _create_missing_derivatives(self):
+        """Generate derivatives for downloaded images that don't have them all"""
+        if not derivatives_enabled():
+            self.stdout.write(self.style.WARNING('Pillow is not installed or IMAGE_DERIVATIVES is off, skipping'))
+            return
+        images = Image.objects.exclude(local_file_path='').prefetch_related('derivatives')
+        for image in images.iterator(chunk_size=200):
+            if self.derivatives.missing(image):
+                self.derivatives.generate(image)
+
+    def _files_to_download(self, files, force=False):
+        """Yield the files that still need downloading"""
+        for file in files:
+            # Skip images we already have, unless Drive reports different content
+            image = Image.objects.filter(google_drive_id=file['id']).first()
+            if not force and image and image.local_file_path and os.path.exists(image.local_file_path):
+                checksum = file.get('md5Checksum')
+                if not checksum or checksum == image.md5_checksum:
+                    self.stdout.write(f'  Image {file["name"]} already exists, skipping...')
+                    continue
+            yield file
+
+    def _download_images(self, files, media_dir, folder_name, parent_folder_name=None):
+        """Download images on the worker pool, recording each one as it completes.
+        
+        Returns ``(downloaded, skipped)``; skipped files were already stored
+        under their checksum and are only recorded.
+        """
+        files_by_id = {}
+        jobs = []
+        downloaded = 0
+        skipped = 0
+        for file in files:
+            # Files are stored by checksum, so identical content is fetched once
+            local_path = Image.local_path_for(file, media_dir)
+            if file.get('md5Checksum') and os.path.exists(local_path):
+                self._record_image(file, local_path, folder_name, parent_folder_name, downloaded=False)
+                skipped += 1
+                continue
+            files_by_id[file['id']] = file
+            jobs.append((file['id'], local_path, file.get('md5Checksum')))
+        
+        for file_id, local_path, error in self.downloader.download_many(jobs):
+            file_data = files_by_id[file_id]
+            if error is not None:
+                self.stdout.write(self.style.ERROR(f'Error downloading {file_data["name"]}: {error}'))
+                continue
+            self._record_image(file_data, local_path, folder_name, parent_folder_name)
+            downloaded += 1
+        return downloaded, skipped
+
+    def _record_image(self, file_data, local_path, folder_name, parent_folder_name=None, downloaded=True):
+        """Create or update the Image row for a downloaded (or already stored) file"""
+        # Get image dimensions
+        width = 0
+        height = 0
+        if file_data.get('imageMediaMetadata'):
+            metadata = file_data['imageMediaMetadata']
+            width = metadata.get('width', 0)
+            height = metadata.get('height', 0)
+        
+        # Drop the previous file if this image now points at different content
+        previous = Image.objects.filter(google_drive_id=file_data['id']).first()
+        if previous and previous.local_file_path != local_path:
+            previous.delete_local_file()
+        
+        # Create or update Image record
+        image, created = Image.objects.update_or_create(
+            google_drive_id=file_data['id'],
+            defaults={
+                'name': file_data['name'],
+                'mime_type': file_data['mimeType'],
+                'local_file_path': local_path,
+                'folder_name': folder_name,
+                'parent_folder_name': parent_folder_name,
+                'size': int(file_data.get('size', 0)),
+                'width': width,
+                'height': height,
+                'md5_checksum': file_data.get('md5Checksum', ''),
+                'modified_time': parse_datetime(file_data['modifiedTime']) if file_data.get('modifiedTime') else None,
+            }
+        )
+        
+        # Resized copies for grid tiles
+        self.derivatives.generate(image)
+        self.changed_folders.add((CatalogSync.folder_kind(parent_folder_name, folder_name), folder_name))
+        
+        if not downloaded:
+            action = 'Already stored'
+        else:
+            action = 'Downloaded' if created else 'Updated'
+        self.stdout.write(f'{action} image: {file_data["name"]}')
+        return image
 
     def _cleanup_deleted_folders(self, drive_service):
         """Remove local images for folders that no longer exist on Google Drive"""
         try:
-            # Get all unique folder names from local database
-            local_folders = Image.objects.values_list('folder_name', flat=True).distinct()
+            # Get all unique (parent, folder) pairs from local database
+            local_folders = Image.objects.values_list('parent_folder_name', 'folder_name').distinct()
+            
+            # List each parent's subfolders once instead of looking up every
+            # folder separately; bypass the folder cache so a deleted folder
+            # isn't reported as present
+            existing_by_parent = {}
+            for parent_folder_name in {parent for parent, _ in local_folders if parent}:
+                parent_id = drive_service.get_folder_id(parent_folder_name, use_cache=False)
+                if parent_id:
+                    existing_by_parent[parent_folder_name] = {
+                        subfolder['name'] for subfolder in drive_service.iter_subfolders(parent_id)
+                    }
+                else:
+                    # Don't wipe everything just because the parent lookup failed
+                    self.stdout.write(self.style.WARNING(f'{parent_folder_name} folder not found, skipping cleanup'))
             
-            for folder_name in local_folders:
-                # Check if folder still exists on Google Drive
-                folder_id = drive_service.get_folder_id(folder_name)
-                if not folder_id:
+            for parent_folder_name, folder_name in local_folders:
+                if parent_folder_name:
+                    if parent_folder_name not in existing_by_parent:
+                        continue
+                    exists = folder_name in existing_by_parent[parent_folder_name]
+                else:
+                    exists = bool(drive_service.get_folder_id(folder_name, use_cache=False))
+                
+                if not exists:
                     self.stdout.write(f'Folder {folder_name} no longer exists, cleaning up...')
+                    folder_id_cache.invalidate(join_folder_path(parent_folder_name, folder_name))
                     
                     # Delete local images for this folder
-                    images_to_delete = Image.objects.filter(folder_name=folder_name)
+                    images_to_delete = Image.objects.filter(folder_name=folder_name, parent_folder_name=parent_folder_name)
                     deleted_count = 0
                     
                     for image in images_to_delete:
@@ -223,6 +334,7 @@ class Command(BaseCommand):
                         image.delete()
                     
                     self.stdout.write(f'Deleted {deleted_count} images for folder {folder_name}')
+                    self.changed_folders.add((CatalogSync.folder_kind(parent_folder_name, folder_name), folder_name))
             
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error cleaning up deleted folders: {e}')) 
+            self.stdout.write(self.style.ERROR(f'Error cleaning up deleted folders: {e}'))
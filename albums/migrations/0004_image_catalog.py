@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:28
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0003_clientalbum_folder_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='md5_checksum',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='position',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='local_file_path',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.CreateModel(
+            name='DriveFolder',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('google_drive_id', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('parent_folder_name', models.CharField(max_length=200)),
+                ('kind', models.CharField(choices=[('carousel', 'Carousel'), ('gallery', 'Public gallery'), ('album', 'Private album')], max_length=20)),
+                ('position', models.IntegerField(default=0)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['position', 'name'],
+                'constraints': [models.UniqueConstraint(fields=('parent_folder_name', 'name'), name='unique_drive_folder_path')],
+            },
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='folder',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='images', to='albums.drivefolder'),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['folder', 'position'], name='albums_imag_folder__8500f6_idx'),
+        ),
+    ]
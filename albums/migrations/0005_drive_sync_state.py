@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0004_image_catalog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriveSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('page_token', models.CharField(blank=True, default='', max_length=200)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0005_drive_sync_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='modified_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['md5_checksum'], name='albums_imag_md5_che_95ae89_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['local_file_path'], name='albums_imag_local_f_b0dd60_idx'),
+        ),
+    ]
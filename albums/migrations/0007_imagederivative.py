@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0006_image_checksums'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('width', models.IntegerField()),
+                ('height', models.IntegerField(default=0)),
+                ('format', models.CharField(choices=[('webp', 'WebP'), ('jpeg', 'JPEG')], max_length=10)),
+                ('local_file_path', models.CharField(max_length=500)),
+                ('size', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='albums.image')),
+            ],
+            options={
+                'ordering': ['image', 'format', 'width'],
+                'constraints': [models.UniqueConstraint(fields=('image', 'width', 'format'), name='unique_image_derivative')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0007_imagederivative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drivesyncstate',
+            name='seeding_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
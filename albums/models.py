@@ -1,9 +1,18 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 import uuid
 import os
 
 
+def media_url_for(path):
+    """URL a file under MEDIA_ROOT is served at"""
+    relative_path = os.path.relpath(path, settings.MEDIA_ROOT)
+    if relative_path.startswith('..'):
+        return f"/media/images/{os.path.basename(path)}"
+    return f"{settings.MEDIA_URL}{relative_path.replace(os.sep, '/')}"
+
+
 class ClientAlbum(models.Model):
     """Model for storing client album information"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -21,18 +30,51 @@ class ClientAlbum(models.Model):
         return f"{self.name} - {self.date}"
 
 
+class DriveFolder(models.Model):
+    """Google Drive folder tracked by the image catalog"""
+    KIND_CAROUSEL = 'carousel'
+    KIND_GALLERY = 'gallery'
+    KIND_ALBUM = 'album'
+    KIND_CHOICES = [
+        (KIND_CAROUSEL, 'Carousel'),
+        (KIND_GALLERY, 'Public gallery'),
+        (KIND_ALBUM, 'Private album'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    google_drive_id = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=200)  # Google Drive folder name
+    parent_folder_name = models.CharField(max_length=200)  # Public_Portfolio or Private_Albums
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    position = models.IntegerField(default=0)
+    synced_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['position', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['parent_folder_name', 'name'], name='unique_drive_folder_path'),
+        ]
+    
+    def __str__(self):
+        return f"{self.parent_folder_name}/{self.name}"
+
+
 class Image(models.Model):
     """Model for storing downloaded image metadata and local file paths"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     google_drive_id = models.CharField(max_length=100, unique=True)
     name = models.CharField(max_length=255)
     mime_type = models.CharField(max_length=100)
-    local_file_path = models.CharField(max_length=500)
+    local_file_path = models.CharField(max_length=500, blank=True, default='')
+    folder = models.ForeignKey(DriveFolder, on_delete=models.CASCADE, related_name='images', blank=True, null=True)
     folder_name = models.CharField(max_length=200)  # Google Drive folder name
     parent_folder_name = models.CharField(max_length=200, blank=True, null=True)  # Parent folder if nested
     size = models.BigIntegerField(default=0)
     width = models.IntegerField(default=0)
     height = models.IntegerField(default=0)
+    md5_checksum = models.CharField(max_length=32, blank=True, default='')
+    modified_time = models.DateTimeField(blank=True, null=True)  # Drive modifiedTime
+    position = models.IntegerField(default=0)  # Order within the folder (Drive name order)
     downloaded_at = models.DateTimeField(auto_now_add=True)
     last_accessed = models.DateTimeField(auto_now=True)
     
@@ -42,24 +84,116 @@ class Image(models.Model):
             models.Index(fields=['google_drive_id']),
             models.Index(fields=['folder_name']),
             models.Index(fields=['parent_folder_name']),
+            models.Index(fields=['folder', 'position']),
+            models.Index(fields=['md5_checksum']),
+            models.Index(fields=['local_file_path']),
         ]
     
     def __str__(self):
         return f"{self.name} ({self.folder_name})"
     
+    @staticmethod
+    def local_path_for(file_data, media_dir):
+        """Where a Drive file is stored locally.
+        
+        Files with a checksum are stored by content (``blobs/ab/abcd....jpg``)
+        so the same photo in several folders shares one file on disk.
+        """
+        file_extension = os.path.splitext(file_data['name'])[1]
+        checksum = file_data.get('md5Checksum')
+        if checksum:
+            return os.path.join(media_dir, 'blobs', checksum[:2], f"{checksum}{file_extension}")
+        return os.path.join(media_dir, f"{file_data['id']}{file_extension}")
+    
     @property
     def local_url(self):
         """Return the local URL for the image"""
         if self.local_file_path and os.path.exists(self.local_file_path):
-            return f"/media/images/{os.path.basename(self.local_file_path)}"
+            return media_url_for(self.local_file_path)
         return None
     
+    def responsive_urls(self):
+        """Thumbnail URL and ``srcset`` strings built from the image's derivatives.
+        
+        Uses ``self.derivatives.all()`` so listings can prefetch derivatives
+        instead of querying once per image.
+        """
+        srcsets = {ImageDerivative.FORMAT_WEBP: [], ImageDerivative.FORMAT_JPEG: []}
+        for derivative in sorted(self.derivatives.all(), key=lambda d: d.width):
+            srcsets.setdefault(derivative.format, []).append(f"{derivative.url} {derivative.width}w")
+        jpeg = srcsets[ImageDerivative.FORMAT_JPEG]
+        return {
+            'thumbnail_url': jpeg[0].rsplit(' ', 1)[0] if jpeg else None,
+            'srcset_webp': ', '.join(srcsets[ImageDerivative.FORMAT_WEBP]),
+            'srcset_jpeg': ', '.join(jpeg),
+        }
+    
     def delete_local_file(self):
-        """Delete the local file if it exists"""
+        """Delete the local file if it exists and no other image still uses it"""
         if self.local_file_path and os.path.exists(self.local_file_path):
+            if Image.objects.filter(local_file_path=self.local_file_path).exclude(pk=self.pk).exists():
+                return False
             try:
                 os.remove(self.local_file_path)
-                return True
             except OSError:
                 return False
+            # Derivatives are stored next to (and shared like) the original
+            for derivative in self.derivatives.all():
+                derivative.delete_local_file()
+            return True
         return False
+
+
+class ImageDerivative(models.Model):
+    """Resized copy of an Image used for grid tiles (see albums.derivatives)"""
+    FORMAT_WEBP = 'webp'
+    FORMAT_JPEG = 'jpeg'
+    FORMAT_CHOICES = [
+        (FORMAT_WEBP, 'WebP'),
+        (FORMAT_JPEG, 'JPEG'),
+    ]
+    
+    image = models.ForeignKey(Image, on_delete=models.CASCADE, related_name='derivatives')
+    width = models.IntegerField()
+    height = models.IntegerField(default=0)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    local_file_path = models.CharField(max_length=500)
+    size = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['image', 'format', 'width']
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'width', 'format'], name='unique_image_derivative'),
+        ]
+    
+    def __str__(self):
+        return f"{self.image.name} ({self.width}w {self.format})"
+    
+    @property
+    def url(self):
+        return media_url_for(self.local_file_path)
+    
+    def delete_local_file(self):
+        """Delete the file unless another image's derivative shares it"""
+        if not os.path.exists(self.local_file_path):
+            return False
+        if ImageDerivative.objects.filter(local_file_path=self.local_file_path).exclude(pk=self.pk).exists():
+            return False
+        try:
+            os.remove(self.local_file_path)
+            return True
+        except OSError:
+            return False
+
+
+class DriveSyncState(models.Model):
+    """Cursor for incremental Google Drive syncs (Changes API page token)"""
+    name = models.CharField(max_length=100, unique=True)
+    page_token = models.CharField(max_length=200, blank=True, default='')
+    # Set while the first full sync is still under way (see CatalogSync.run_incremental)
+    seeding_since = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name}: {self.page_token}"
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .derivatives import resize_to_file
+
+# Bump when encoder settings change so cached files (and their ETags) change too
+RESIZE_VERSION = 1
+
+FORMATS = {
+    'webp': ('webp', 'image/webp'),
+    'jpg': ('jpeg', 'image/jpeg'),
+    'jpeg': ('jpeg', 'image/jpeg'),
+}
+
+
+class ResizeCache:
+    """Bounded on-disk cache of resized images, evicted least recently used first.
+
+    Entries are named after a hash of the source content (its MD5 checksum, or
+    Drive ID and modification time) plus width and format, so a cache file
+    never goes stale and its name doubles as a strong ETag. Concurrent
+    requests for the same entry within a process wait for a single resize.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = str(directory or getattr(settings, 'IMAGE_RESIZE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'photo_portfolio', 'resized')))
+        self.max_bytes = max_bytes if max_bytes is not None else int(getattr(settings, 'IMAGE_RESIZE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+        self._lock = threading.Lock()
+        # path -> size, least recently used first
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._total = 0
+        self._inflight: Dict[str, threading.Event] = {}
+        self._scanned_at = None
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evicted': 0}
+
+    @staticmethod
+    def cache_key(image, width: int, format: str) -> str:
+        if image.md5_checksum:
+            source = image.md5_checksum
+        else:
+            source = f'{image.google_drive_id}:{int(os.path.getmtime(image.local_file_path))}'
+        return hashlib.sha1(f'{source}:w{width}:{format}:v{RESIZE_VERSION}'.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str, format: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.{format}')
+
+    def _scan(self):
+        """Rebuild the LRU index from disk; other processes share the directory"""
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime, path, stat.st_size))
+        entries.sort()
+        self._entries = OrderedDict((path, size) for _, path, size in entries)
+        self._total = sum(self._entries.values())
+        self._scanned_at = time.monotonic()
+
+    def _touch(self, path: str):
+        try:
+            # Record the access for other processes' scans too
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            if path in self._entries:
+                self._entries.move_to_end(path)
+
+    def _add(self, path: str):
+        size = os.path.getsize(path)
+        with self._lock:
+            if self._scanned_at is None or time.monotonic() - self._scanned_at > 60:
+                self._scan()
+            self._total += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                victim, victim_size = self._entries.popitem(last=False)
+                self._total -= victim_size
+                try:
+                    os.remove(victim)
+                    self.stats['evicted'] += 1
+                except FileNotFoundError:
+                    pass
+
+    def get(self, image, width: int, format: str) -> Tuple[str, str]:
+        """Return ``(path, key)`` of the resized image, creating it if needed"""
+        key = self.cache_key(image, width, format)
+        path = self._path(key, format)
+        if os.path.exists(path):
+            self.stats['hits'] += 1
+            self._touch(path)
+            return path, key
+
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            # Another thread is already resizing this image
+            self.stats['coalesced'] += 1
+            event.wait()
+            if os.path.exists(path):
+                return path, key
+            return self.get(image, width, format)
+
+        try:
+            self.stats['misses'] += 1
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            resize_to_file(image.local_file_path, width, format, path)
+            self._add(path)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+        return path, key
+
+    def open(self, image, width: int, format: str) -> Tuple[BinaryIO, str]:
+        """Return ``(file, key)`` with the resized image open for reading.
+
+        Another thread or process may evict the file between ``get`` and
+        opening it; it is then resized again. An open file stays readable
+        after eviction.
+        """
+        path, key = self.get(image, width, format)
+        try:
+            return open(path, 'rb'), key
+        except FileNotFoundError:
+            path, key = self.get(image, width, format)
+            return open(path, 'rb'), key
+
+
+resize_cache = ResizeCache()
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent once per sync with ``changes``: (DriveFolder kind, folder name) of every
+# gallery, carousel or album whose images were added, changed or removed
+drive_folders_changed = Signal()
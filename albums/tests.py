@@ -1,3 +1,463 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image as PILImage
+
+from core.folder_cache import folder_id_cache
+from core.time_budget import TimeBudget
+
+from .archives import IncompleteArchive, album_archive_dir, build_album_archive, content_hash
+from .catalog import FOLDER_MIME_TYPE, SYNC_STATE_NAME, CatalogSync
+from .models import ClientAlbum, DriveFolder, DriveSyncState, Image
+from .resize_cache import ResizeCache
+from .zip_stream import ZIP64_THRESHOLD, ZipMember, aprefetch, astream_zip, prefetch, stream_zip, unique_names
+
+
+class FakeChangesDrive:
+    """The GoogleDriveService calls CatalogSync.run_incremental makes, with canned change pages"""
+
+    def __init__(self, pages, folder_images=None, subfolders=None):
+        # [(changes, token, last)] as yielded by iter_change_pages
+        self.pages = pages
+        self.folder_images = folder_images or {}
+        self.subfolders = subfolders or {}
+        self.roots = {'Public_Portfolio': 'root-public', 'Private_Albums': 'root-private'}
+        self.listed_folders = []
+
+    def get_start_page_token(self):
+        return 'start'
+
+    def get_folder_id(self, folder_name, parent_folder_name=None, use_cache=True):
+        return self.roots.get(folder_name)
+
+    def iter_change_pages(self, page_token, file_fields=None):
+        yield from self.pages
+
+    def iter_images_in_folder(self, folder_id, fields=None):
+        self.listed_folders.append(folder_id)
+        return iter(self.folder_images.get(folder_id, []))
+
+    def iter_subfolders(self, folder_id, exclude=None):
+        return iter(self.subfolders.get(folder_id, []))
+
+
+class FakeBudget:
+    """A TimeBudget that runs low after ``calls`` checks"""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def low(self):
+        self.calls -= 1
+        return self.calls < 0
+
+
+def image_file(file_id, name, parent, **extra):
+    return {'id': file_id, 'name': name, 'mimeType': 'image/jpeg', 'parents': [parent], **extra}
+
+
+class CatalogIncrementalSyncTests(TestCase):
+    def setUp(self):
+        DriveSyncState.objects.create(name=SYNC_STATE_NAME, page_token='start')
+        self.gallery = DriveFolder.objects.create(
+            google_drive_id='gallery-1', name='Weddings', parent_folder_name='Public_Portfolio',
+            kind=DriveFolder.KIND_GALLERY,
+        )
+        for position, (file_id, name) in enumerate([('img-b', 'b.jpg'), ('img-c', 'c.jpg')]):
+            Image.objects.create(
+                google_drive_id=file_id, name=name, mime_type='image/jpeg', folder=self.gallery,
+                folder_name='Weddings', parent_folder_name='Public_Portfolio', position=position,
+            )
+
+    def sync(self, pages, budget=None, **kwargs):
+        catalog = CatalogSync(FakeChangesDrive(pages, **kwargs), log=lambda message: None)
+        stats = catalog.run_incremental(budget=budget)
+        return catalog, stats
+
+    def positions(self, folder):
+        return list(folder.images.order_by('position').values_list('name', flat=True))
+
+    def test_applies_added_edited_and_removed_images(self):
+        changes = [
+            {'fileId': 'img-a', 'file': image_file('img-a', 'a.jpg', 'gallery-1', md5Checksum='aaa')},
+            {'fileId': 'img-c', 'file': image_file('img-c', 'c.jpg', 'gallery-1', md5Checksum='ccc2')},
+            {'fileId': 'img-b', 'removed': True},
+        ]
+        catalog, stats = self.sync([(changes, 'next', True)])
+
+        self.assertEqual(self.positions(self.gallery), ['a.jpg', 'c.jpg'])
+        self.assertEqual(Image.objects.get(google_drive_id='img-c').md5_checksum, 'ccc2')
+        self.assertEqual((stats['changes'], stats['created'], stats['updated'], stats['removed']), (3, 1, 1, 1))
+        self.assertEqual(catalog.changed_folders, [(DriveFolder.KIND_GALLERY, 'Weddings')])
+        self.assertTrue(catalog.complete)
+        self.assertEqual(DriveSyncState.objects.get(name=SYNC_STATE_NAME).page_token, 'next')
+
+    def test_trashed_or_moved_out_images_are_removed(self):
+        changes = [
+            {'fileId': 'img-b', 'file': image_file('img-b', 'b.jpg', 'gallery-1', trashed=True)},
+            {'fileId': 'img-c', 'file': image_file('img-c', 'c.jpg', 'somewhere-else')},
+        ]
+        self.sync([(changes, 'next', True)])
+        self.assertFalse(self.gallery.images.exists())
+
+    def test_non_image_files_are_ignored(self):
+        changes = [{'fileId': 'doc', 'file': {'id': 'doc', 'name': 'notes.txt', 'mimeType': 'text/plain',
+                                              'parents': ['gallery-1']}}]
+        catalog, stats = self.sync([(changes, 'next', True)])
+        self.assertEqual(self.gallery.images.count(), 2)
+        self.assertEqual(catalog.changed_folders, [])
+
+    def test_new_folder_is_catalogued_with_its_images(self):
+        folder = {'id': 'album-1', 'name': 'Smith', 'mimeType': FOLDER_MIME_TYPE, 'parents': ['root-private']}
+        catalog, _ = self.sync(
+            [([{'fileId': 'album-1', 'file': folder}], 'next', True)],
+            folder_images={'album-1': [image_file('img-s', 's.jpg', 'album-1')]},
+        )
+        album = DriveFolder.objects.get(google_drive_id='album-1')
+        self.assertEqual((album.kind, album.parent_folder_name), (DriveFolder.KIND_ALBUM, 'Private_Albums'))
+        self.assertEqual(self.positions(album), ['s.jpg'])
+
+    def test_deleted_folder_is_removed_with_its_images(self):
+        catalog, stats = self.sync([([{'fileId': 'gallery-1', 'removed': True}], 'next', True)])
+        self.assertFalse(DriveFolder.objects.filter(google_drive_id='gallery-1').exists())
+        self.assertFalse(Image.objects.filter(google_drive_id__in=['img-b', 'img-c']).exists())
+        self.assertEqual(stats['folders_removed'], 1)
+        self.assertIn((DriveFolder.KIND_GALLERY, 'Weddings'), catalog.changed_folders)
+
+    def test_renamed_folder_only_invalidates_its_own_paths(self):
+        folder_id_cache.set_many({
+            'Public_Portfolio/Weddings': 'gallery-1',
+            'Public_Portfolio/Portraits': 'gallery-2',
+        })
+        folder = {'id': 'gallery-1', 'name': 'Weddings 2026', 'mimeType': FOLDER_MIME_TYPE, 'parents': ['root-public']}
+        self.sync([([{'fileId': 'gallery-1', 'file': folder}], 'next', True)])
+        self.assertEqual(
+            folder_id_cache.get_many(['Public_Portfolio/Weddings', 'Public_Portfolio/Portraits']),
+            {'Public_Portfolio/Portraits': 'gallery-2'},
+        )
+        self.assertEqual(set(self.gallery.images.values_list('folder_name', flat=True)), {'Weddings 2026'})
+
+    def test_stops_between_pages_when_the_budget_runs_low(self):
+        pages = [
+            ([{'fileId': 'img-a', 'file': image_file('img-a', 'a.jpg', 'gallery-1')}], 'page-2', False),
+            ([{'fileId': 'img-b', 'removed': True}], 'next', True),
+        ]
+        catalog, stats = self.sync(pages, budget=TimeBudget(seconds=0, low_seconds=1))
+
+        self.assertFalse(catalog.complete)
+        self.assertEqual(stats['changes'], 1)
+        # The first page is applied and the sync resumes from the second
+        self.assertEqual(self.positions(self.gallery), ['a.jpg', 'b.jpg', 'c.jpg'])
+        self.assertEqual(DriveSyncState.objects.get(name=SYNC_STATE_NAME).page_token, 'page-2')
+
+
+@override_settings(ZIP_STREAM_CHUNK_SIZE=1000)
+class StreamZipTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def archive(self, members):
+        chunks = list(stream_zip(members))
+        return zipfile.ZipFile(io.BytesIO(b''.join(chunks))), chunks
+
+    def test_round_trip(self):
+        photo = os.urandom(5000)
+        notes = b'ceremony at noon\n' * 500
+        archive, chunks = self.archive([
+            ZipMember.from_path('photo.jpg', self.write_file('photo.jpg', photo), 'image/jpeg'),
+            ZipMember.from_path('notes.txt', self.write_file('notes.txt', notes), 'text/plain'),
+        ])
+
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), ['photo.jpg', 'notes.txt'])
+        self.assertEqual(archive.read('photo.jpg'), photo)
+        self.assertEqual(archive.read('notes.txt'), notes)
+        # Already-compressed images are stored, text is deflated
+        self.assertEqual(archive.getinfo('photo.jpg').compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(archive.getinfo('notes.txt').compress_type, zipfile.ZIP_DEFLATED)
+        # Output is produced as it's written rather than in one piece
+        self.assertGreater(len(chunks), 3)
+
+    def test_members_of_unknown_size(self):
+        content = b'x' * 2500
+        member = ZipMember('generated.txt', lambda: [content[:1000], content[1000:]], 'text/plain')
+        archive, _ = self.archive([member])
+        self.assertEqual(archive.read('generated.txt'), content)
+
+    def test_empty_archive(self):
+        archive, _ = self.archive([])
+        self.assertEqual(archive.namelist(), [])
+
+    def test_large_members_get_zip64_headers(self):
+        big, _ = self.archive([ZipMember('big.bin', lambda: [b'data'], size=ZIP64_THRESHOLD)])
+        small, _ = self.archive([ZipMember('small.bin', lambda: [b'data'], size=4)])
+        self.assertEqual(big.read('big.bin'), b'data')
+        self.assertEqual(big.getinfo('big.bin').extract_version, zipfile.ZIP64_VERSION)
+        self.assertLess(small.getinfo('small.bin').extract_version, zipfile.ZIP64_VERSION)
+
+    def test_unique_names(self):
+        self.assertEqual(
+            unique_names(['a.jpg', 'A.jpg', 'a.jpg', 'b.jpg']),
+            ['a.jpg', 'A (1).jpg', 'a (2).jpg', 'b.jpg'],
+        )
+
+
+class PrefetchTests(SimpleTestCase):
+    """Remote members fetched ahead of the ZIP writer, with failures listed in MISSING_FILES.txt"""
+
+    contents = {'1.jpg': b'one' * 100, '2.jpg': b'two' * 100, '3.jpg': b'three' * 100}
+
+    def fetch(self, name):
+        def fetch(f):
+            if name == '2.jpg':
+                raise IOError('GCS and Drive both failed')
+            f.write(self.contents[name])
+        return fetch
+
+    def afetch(self, name):
+        async def afetch(f):
+            self.fetch(name)(f)
+        return afetch
+
+    def members(self):
+        local = ZipMember('local.txt', lambda: [b'on disk'], 'text/plain', 7)
+        remote = [ZipMember(name, mime_type='image/jpeg', fetch=self.fetch(name), afetch=self.afetch(name))
+                  for name in self.contents]
+        return [remote[0], local, *remote[1:]]
+
+    def assert_archive(self, data):
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        self.assertEqual(archive.namelist(), ['1.jpg', 'local.txt', '3.jpg', 'MISSING_FILES.txt'])
+        self.assertEqual(archive.read('1.jpg'), self.contents['1.jpg'])
+        self.assertEqual(archive.read('3.jpg'), self.contents['3.jpg'])
+        self.assertEqual(archive.read('local.txt'), b'on disk')
+        self.assertIn('2.jpg', archive.read('MISSING_FILES.txt').decode('utf-8').splitlines())
+
+    def test_prefetch_keeps_order_and_lists_missing_files(self):
+        with redirect_stdout(io.StringIO()):
+            data = b''.join(stream_zip(prefetch(self.members(), workers=2, window=2)))
+        self.assert_archive(data)
+
+    def test_aprefetch_keeps_order_and_lists_missing_files(self):
+        async def build():
+            return b''.join([chunk async for chunk in astream_zip(aprefetch(self.members(), window=2))])
+        with redirect_stdout(io.StringIO()):
+            data = asyncio.run(build())
+        self.assert_archive(data)
+
+    def test_no_report_when_everything_was_fetched(self):
+        members = [ZipMember('1.jpg', fetch=self.fetch('1.jpg'))]
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_zip(prefetch(members)))))
+        self.assertEqual(archive.namelist(), ['1.jpg'])
+
+
+class CatalogSeedTests(TestCase):
+    """run_incremental without a stored token seeds the catalog, resumably under a budget"""
+
+    def setUp(self):
+        folder = {'mimeType': FOLDER_MIME_TYPE}
+        self.drive_kwargs = {
+            'subfolders': {
+                'root-public': [{'id': 'g-1', 'name': 'Portraits', **folder}, {'id': 'g-2', 'name': 'Weddings', **folder}],
+                'root-private': [{'id': 'a-1', 'name': 'Smith', **folder}],
+            },
+            'folder_images': {
+                'g-1': [image_file('img-1', '1.jpg', 'g-1')],
+                'g-2': [image_file('img-2', '2.jpg', 'g-2'), image_file('img-3', '3.jpg', 'g-2')],
+                'a-1': [image_file('img-4', '4.jpg', 'a-1')],
+            },
+        }
+
+    def sync(self, budget=None, pages=()):
+        drive = FakeChangesDrive(list(pages), **self.drive_kwargs)
+        catalog = CatalogSync(drive, log=lambda message: None)
+        catalog.run_incremental(budget=budget)
+        return catalog, drive
+
+    def test_seed_stops_when_the_budget_runs_low_and_resumes(self):
+        catalog, drive = self.sync(budget=FakeBudget(calls=1))
+        self.assertFalse(catalog.complete)
+        self.assertEqual(drive.listed_folders, ['g-1'])
+        state = DriveSyncState.objects.get(name=SYNC_STATE_NAME)
+        # The change token is kept from the start, so nothing changed meanwhile is missed
+        self.assertEqual(state.page_token, 'start')
+        self.assertIsNotNone(state.seeding_since)
+        self.assertEqual(list(Image.objects.values_list('google_drive_id', flat=True)), ['img-1'])
+
+        catalog, drive = self.sync(budget=FakeBudget(calls=5))
+        self.assertTrue(catalog.complete)
+        # Folders seeded by the first run aren't listed again
+        self.assertEqual(drive.listed_folders, ['g-2', 'a-1'])
+        self.assertIsNone(DriveSyncState.objects.get(name=SYNC_STATE_NAME).seeding_since)
+        self.assertEqual(Image.objects.count(), 4)
+        self.assertEqual(
+            list(DriveFolder.objects.order_by('parent_folder_name', 'position').values_list('name', 'kind')),
+            [('Smith', DriveFolder.KIND_ALBUM), ('Portraits', DriveFolder.KIND_GALLERY),
+             ('Weddings', DriveFolder.KIND_GALLERY)],
+        )
+
+    def test_changes_are_applied_once_seeded(self):
+        self.sync()
+        catalog, drive = self.sync(pages=[([{'fileId': 'img-1', 'removed': True}], 'next', True)])
+        self.assertEqual(drive.listed_folders, [])
+        self.assertFalse(Image.objects.filter(google_drive_id='img-1').exists())
+        self.assertEqual(DriveSyncState.objects.get(name=SYNC_STATE_NAME).page_token, 'next')
+
+    def test_seed_removes_folders_gone_from_drive(self):
+        DriveFolder.objects.create(google_drive_id='old', name='Old', parent_folder_name='Public_Portfolio',
+                                   kind=DriveFolder.KIND_GALLERY)
+        self.sync()
+        self.assertFalse(DriveFolder.objects.filter(google_drive_id='old').exists())
+
+
+class FakeAlbumDrive:
+    """Drive service with an album listing; fetching a name in ``failing`` raises"""
+
+    def __init__(self, images, failing=()):
+        self.images = images
+        self.failing = set(failing)
+
+    def get_private_album_files(self, folder_name):
+        return self.images
+
+    def fetch_image_content(self, file_id, file_name, folder_name, f, downloader=None):
+        if file_name in self.failing:
+            raise IOError('GCS and Drive both failed')
+        data = f'content of {file_name}'.encode('utf-8')
+        f.write(data)
+        return len(data)
+
+
+class AlbumArchiveTests(TestCase):
+    images = [
+        {'id': 'a', 'name': '1.jpg', 'mime_type': 'image/jpeg', 'md5_checksum': 'c1', 'modified_time': '2026-01-01T00:00:00Z'},
+        {'id': 'b', 'name': '2.jpg', 'mime_type': 'image/jpeg', 'md5_checksum': 'c2', 'modified_time': '2026-01-01T00:00:00Z'},
+    ]
+
+    def setUp(self):
+        self.archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive_root.cleanup)
+        settings = override_settings(ALBUM_ARCHIVE_DIR=self.archive_root.name, ALBUM_ARCHIVE_CACHE=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.album = ClientAlbum.objects.create(name='Wedding', date='2026-01-01', folder_name='wedding')
+
+    def test_hash_follows_drive_checksum_of_uncatalogued_images(self):
+        edited = [dict(self.images[0], md5_checksum='c1-edited', modified_time='2026-02-01T00:00:00Z'), self.images[1]]
+        self.assertNotEqual(content_hash(self.images, {}), content_hash(edited, {}))
+
+    def test_complete_archive_is_cached(self):
+        with redirect_stdout(io.StringIO()):
+            path = build_album_archive(self.album, FakeAlbumDrive(self.images))
+        self.assertEqual(zipfile.ZipFile(path).namelist(), ['1.jpg', '2.jpg'])
+
+    def test_archive_with_missing_files_is_not_cached(self):
+        with redirect_stdout(io.StringIO()), self.assertRaises(IncompleteArchive):
+            build_album_archive(self.album, FakeAlbumDrive(self.images, failing=['2.jpg']))
+        self.assertEqual(os.listdir(album_archive_dir(self.album)), [])
+
+
+class ResizeCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResizeCache(directory.name, max_bytes=250)
+        self.resizes = []
+        patcher = mock.patch('albums.resize_cache.resize_to_file', self.fake_resize)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_resize(self, source_path, width, format, dest_path):
+        self.resizes.append((source_path, width))
+        time.sleep(0.05)
+        with open(dest_path, 'wb') as f:
+            f.write(b'x' * 100)
+        return width, width
+
+    def image(self, checksum):
+        return SimpleNamespace(md5_checksum=checksum, google_drive_id=checksum, local_file_path=f'/photos/{checksum}.jpg')
+
+    def test_evicts_least_recently_used_entries(self):
+        a, b, c = self.image('a'), self.image('b'), self.image('c')
+        path_a, _ = self.cache.get(a, 400, 'webp')
+        path_b, _ = self.cache.get(b, 400, 'webp')
+        self.cache.get(a, 400, 'webp')  # a is now more recent than b
+        path_c, _ = self.cache.get(c, 400, 'webp')
+
+        self.assertTrue(os.path.exists(path_a))
+        self.assertFalse(os.path.exists(path_b))
+        self.assertTrue(os.path.exists(path_c))
+        self.assertEqual(self.cache.stats['evicted'], 1)
+        self.assertEqual(self.cache.stats['hits'], 1)
+
+    def test_concurrent_requests_share_one_resize(self):
+        image = self.image('a')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get(image, 400, 'webp'))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.resizes), 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.cache.stats['coalesced'], 3)
+
+    def test_key_changes_with_content_width_and_format(self):
+        keys = {
+            ResizeCache.cache_key(self.image('a'), 400, 'webp'),
+            ResizeCache.cache_key(self.image('b'), 400, 'webp'),
+            ResizeCache.cache_key(self.image('a'), 800, 'webp'),
+            ResizeCache.cache_key(self.image('a'), 400, 'jpeg'),
+        }
+        self.assertEqual(len(keys), 4)
+
+
+@override_settings(IMAGE_DERIVATIVES=True, IMAGE_RESIZE_WIDTHS=[400])
+class ResizedImageViewTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch('albums.views.resize_cache', ResizeCache(os.path.join(directory.name, 'resized')))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        source = os.path.join(directory.name, 'photo.jpg')
+        PILImage.new('RGB', (800, 600), 'white').save(source)
+        Image.objects.create(google_drive_id='public', name='photo.jpg', mime_type='image/jpeg', local_file_path=source,
+                             folder_name='landscapes', parent_folder_name='Public_Portfolio', md5_checksum='c1')
+        Image.objects.create(google_drive_id='private', name='photo.jpg', mime_type='image/jpeg', local_file_path=source,
+                             folder_name='wedding', parent_folder_name='Private_Albums', md5_checksum='c1')
+
+    def test_serves_resized_copy_and_revalidates_with_etag(self):
+        response = self.client.get('/img/public/w400.webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(PILImage.open(io.BytesIO(b''.join(response.streaming_content))).size, (400, 300))
+
+        response = self.client.get('/img/public/w400.webp', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_private_album_images_are_not_served(self):
+        self.assertEqual(self.client.get('/img/private/w400.webp').status_code, 404)
+
+    def test_unlisted_widths_are_rejected(self):
+        self.assertEqual(self.client.get('/img/public/w401.webp').status_code, 404)
@@ -1,14 +1,24 @@
-from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse, HttpResponse
-from django.views.decorators.cache import cache_page
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.urls import reverse
 from django.conf import settings
+from django.utils.http import parse_etags
+from .derivatives import derivatives_enabled
 from .models import ClientAlbum, Image
+from .resize_cache import FORMATS, resize_cache
+from .archives import (
+    album_members, archive_cache_enabled, archive_path, content_hash, enqueue_archive_build, local_images_for,
+)
+from .zip_stream import aprefetch, astream_zip, prefetch, stream_zip
+from core.async_services import AsyncGoogleDriveService
+from core.file_responses import ranged_file_response
+from core.page_cache import cached_page, mark_incomplete, page_timeout
 from core.services import GoogleDriveService
-import zipfile
-import io
+from core.signed_urls import signed_url_cache
+from core.time_budget import TimeBudget
 import os
 
 
@@ -17,20 +27,24 @@ def is_admin_user(user):
     return user.is_authenticated and user.is_staff
 
 
-@cache_page(60 * 15)  # Cache for 15 minutes
+# Cache for 15 minutes by default, but never longer than the signed image URLs in the page stay valid
+@cached_page('album_detail', timeout=signed_url_cache.page_timeout(page_timeout('album_detail')))
 def album_detail(request, album_id):
     """Display a private client album"""
     album = get_object_or_404(ClientAlbum, id=album_id)
     
     try:
-        drive_service = GoogleDriveService()
+        drive_service = GoogleDriveService(budget=TimeBudget())
         images = drive_service.get_private_album_files(album.folder_name)  # Use folder_name for Google Drive mapping
         
         context = {
             'album': album,
             'images': images,
         }
-        return render(request, 'albums/album_detail.html', context)
+        response = render(request, 'albums/album_detail.html', context)
+        if drive_service.errors:
+            mark_incomplete(response)
+        return response
     except Exception as e:
         context = {
             'album': album,
@@ -40,42 +54,114 @@ def album_detail(request, album_id):
         return render(request, 'albums/album_detail.html', context)
 
 
+@cached_page('album_detail', timeout=signed_url_cache.page_timeout(page_timeout('album_detail')))
+async def album_detail_async(request, album_id):
+    """Async album_detail (ASYNC_VIEWS)"""
+    album = await aget_object_or_404(ClientAlbum, id=album_id)
+    
+    drive_service = AsyncGoogleDriveService(budget=TimeBudget())
+    try:
+        images = await drive_service.get_private_album_files(album.folder_name)
+        
+        context = {
+            'album': album,
+            'images': images,
+        }
+    except Exception as e:
+        user = await request.auser()
+        context = {
+            'album': album,
+            'images': [],
+            'error': str(e) if user.is_staff else None,
+        }
+    # Context processors touch the session and user: render off the event loop
+    response = await sync_to_async(render)(request, 'albums/album_detail.html', context)
+    if drive_service.errors:
+        mark_incomplete(response)
+    return response
+
+
 def download_image(request, album_id, image_id):
     """Download a single image from an album"""
     album = get_object_or_404(ClientAlbum, id=album_id)
     
     try:
-        # Try to get the image from local storage first
-        image = Image.objects.filter(google_drive_id=image_id).first()
-        
-        if image and os.path.exists(image.local_file_path):
-            # Serve local file
-            with open(image.local_file_path, 'rb') as f:
-                response = HttpResponse(f.read(), content_type=image.mime_type)
-                response['Content-Disposition'] = f'attachment; filename="{image.name}"'
-                return response
-        else:
-            # Fallback to Google Drive service
-            drive_service = GoogleDriveService()
-            images = drive_service.get_private_album_files(album.folder_name)  # Use folder_name for Google Drive mapping
-            
-            # Find the specific image
-            image_data = next((img for img in images if img['id'] == image_id), None)
-            
-            if image_data:
-                # Redirect to local URL if available, otherwise Google Drive
-                return HttpResponse(
-                    f'<script>window.location.href="{image_data["download_url"]}";</script>',
-                    content_type='text/html'
-                )
-            else:
-                return HttpResponse("Image not found", status=404)
+        # Only images that belong to this album can be downloaded through it
+        image = Image.objects.filter(
+            google_drive_id=image_id, folder_name=album.folder_name, parent_folder_name='Private_Albums'
+        ).first()
+        
+        if image and image.local_file_path and os.path.exists(image.local_file_path):
+            # Serve local file without reading it into memory; the checksum is
+            # the ETag, falling back to the file's mtime for conditional requests
+            return ranged_file_response(
+                request, image.local_file_path, image.mime_type,
+                etag=image.md5_checksum or None, filename=image.name,
+            )
+        
+        # Look up just this image (catalog first) and redirect to its GCS or Drive URL
+        drive_service = GoogleDriveService()
+        image_data = drive_service.get_private_album_image(album.folder_name, image_id, image=image)
+        if image_data:
+            return HttpResponseRedirect(image_data['download_url'])
+        return HttpResponse("Image not found", status=404)
+    except Exception as e:
+        return HttpResponse(f"Error downloading image: {str(e)}", status=500)
+
+
+async def download_image_async(request, album_id, image_id):
+    """Async download_image (ASYNC_VIEWS)"""
+    album = await aget_object_or_404(ClientAlbum, id=album_id)
+    
+    try:
+        image = await Image.objects.filter(
+            google_drive_id=image_id, folder_name=album.folder_name, parent_folder_name='Private_Albums'
+        ).afirst()
+        
+        if image and image.local_file_path and os.path.exists(image.local_file_path):
+            return ranged_file_response(
+                request, image.local_file_path, image.mime_type,
+                etag=image.md5_checksum or None, filename=image.name,
+            )
+        
+        drive_service = AsyncGoogleDriveService()
+        image_data = await drive_service.get_private_album_image(album.folder_name, image_id, image=image)
+        if image_data:
+            return HttpResponseRedirect(image_data['download_url'])
+        return HttpResponse("Image not found", status=404)
     except Exception as e:
         return HttpResponse(f"Error downloading image: {str(e)}", status=500)
 
 
+def resized_image(request, image_id, width, fmt):
+    """Serve a resized copy of a local public portfolio image, creating it on first request"""
+    allowed_widths = getattr(settings, 'IMAGE_RESIZE_WIDTHS', [])
+    if fmt not in FORMATS or width not in allowed_widths or not derivatives_enabled():
+        raise Http404()
+    
+    # Responses are publicly cacheable, so private album images are never served here
+    image = Image.objects.filter(
+        google_drive_id=image_id, parent_folder_name='Public_Portfolio'
+    ).exclude(local_file_path='').first()
+    if not image or not os.path.exists(image.local_file_path):
+        raise Http404()
+    
+    format, content_type = FORMATS[fmt]
+    # The cache key hashes the source content and parameters, so it is a strong validator
+    etag = f'"{resize_cache.cache_key(image, width, format)}"'
+    cache_control = 'public, max-age=31536000, immutable'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        f, _ = resize_cache.open(image, width, format)
+        response = FileResponse(f, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
 def download_album_zip(request, album_id):
-    """Download entire album as ZIP file"""
+    """Download entire album as a ZIP file, from the archive cache when possible"""
     album = get_object_or_404(ClientAlbum, id=album_id)
     
     try:
@@ -85,24 +171,54 @@ def download_album_zip(request, album_id):
         if not images:
             return HttpResponse("No images found in album", status=404)
         
-        # Create ZIP file in memory
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for image_data in images:
-                # Try to get local file first
-                image = Image.objects.filter(google_drive_id=image_data['id']).first()
-                
-                if image and os.path.exists(image.local_file_path):
-                    # Add local file to ZIP
-                    with open(image.local_file_path, 'rb') as f:
-                        zip_file.writestr(image.name, f.read())
-                else:
-                    # Fallback: add placeholder (could implement Google Drive download here)
-                    zip_file.writestr(image_data['name'], '')
-        
-        # Prepare response
-        response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename="{album.name}.zip"'  # Use name for filename
+        # Look up every local file in one query
+        local_images = local_images_for(images)
+        filename = f'{album.name}.zip'  # Use name for filename
+        
+        if archive_cache_enabled():
+            archive_hash = content_hash(images, local_images)
+            path = archive_path(album, archive_hash)
+            if os.path.exists(path):
+                # Prebuilt archive: supports Range so interrupted downloads resume
+                return ranged_file_response(request, path, 'application/zip', etag=archive_hash, filename=filename)
+            # Build it in the background for next time and stream this one live
+            enqueue_archive_build(album)
+        
+        # Bytes are sent as soon as they're written; nothing is buffered.
+        # Images that aren't on disk are fetched from GCS or Drive while the ZIP streams
+        members = album_members(drive_service, album, images, local_images)
+        response = StreamingHttpResponse(stream_zip(prefetch(members)), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+        
+    except Exception as e:
+        return HttpResponse(f"Error creating ZIP: {str(e)}", status=500)
+
+
+async def download_album_zip_async(request, album_id):
+    """Async download_album_zip (ASYNC_VIEWS): remote images are fetched concurrently on the event loop"""
+    album = await aget_object_or_404(ClientAlbum, id=album_id)
+    
+    try:
+        drive_service = AsyncGoogleDriveService()
+        images = await drive_service.get_private_album_files(album.folder_name)
+        
+        if not images:
+            return HttpResponse("No images found in album", status=404)
+        
+        local_images = await sync_to_async(local_images_for)(images)
+        filename = f'{album.name}.zip'
+        
+        if archive_cache_enabled():
+            archive_hash = content_hash(images, local_images)
+            path = archive_path(album, archive_hash)
+            if os.path.exists(path):
+                return ranged_file_response(request, path, 'application/zip', etag=archive_hash, filename=filename)
+            await sync_to_async(enqueue_archive_build)(album)
+        
+        members = album_members(drive_service.sync, album, images, local_images, async_service=drive_service)
+        response = StreamingHttpResponse(astream_zip(aprefetch(members)), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
         
     except Exception as e:
@@ -0,0 +1,300 @@
+import asyncio
+import os
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+
+# Formats that are already compressed: deflating them costs CPU and saves nothing
+STORED_MIME_TYPES = {
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/heic', 'image/heif', 'image/avif',
+    'video/mp4', 'video/quicktime', 'application/zip',
+}
+
+# Entries at least this large (or of unknown size) get ZIP64 headers up front
+ZIP64_THRESHOLD = zipfile.ZIP64_LIMIT
+
+
+def chunk_size() -> int:
+    return int(getattr(settings, 'ZIP_STREAM_CHUNK_SIZE', 1024 * 1024))
+
+
+def iter_file_chunks(path: str, size: Optional[int] = None) -> Iterator[bytes]:
+    size = size or chunk_size()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_spooled_chunks(spool) -> Iterator[bytes]:
+    """Yield a prefetched member's bytes, closing (and deleting) the spool afterwards"""
+    try:
+        spool.seek(0)
+        size = chunk_size()
+        while True:
+            chunk = spool.read(size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        spool.close()
+
+
+class ZipMember:
+    """One file to add to a streamed archive.
+
+    Local members yield their bytes from ``chunks()``. Remote members instead
+    have a ``fetch(f)`` callable that writes their content to a file object
+    (``afetch(f)`` is its coroutine counterpart); ``prefetch`` and
+    ``aprefetch`` run those ahead of the writer.
+    """
+
+    def __init__(self, name: str, chunks: Callable[[], Iterable[bytes]] = None, mime_type: str = '',
+                 size: Optional[int] = None, modified: Optional[float] = None,
+                 fetch: Callable = None, afetch: Callable = None):
+        self.name = name
+        self.chunks = chunks
+        self.mime_type = mime_type
+        self.size = size
+        self.modified = modified
+        self.fetch = fetch
+        self.afetch = afetch
+
+    @classmethod
+    def from_path(cls, name: str, path: str, mime_type: str = ''):
+        stat = os.stat(path)
+        return cls(name, lambda: iter_file_chunks(path), mime_type, stat.st_size, stat.st_mtime)
+
+
+def _new_spool():
+    return tempfile.SpooledTemporaryFile(max_size=int(getattr(settings, 'ZIP_PREFETCH_SPOOL_BYTES', 16 * 1024 * 1024)))
+
+
+def _spool(member: ZipMember):
+    spool = _new_spool()
+    try:
+        member.fetch(spool)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+async def _aspool(member: ZipMember):
+    spool = _new_spool()
+    try:
+        await member.afetch(spool)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+def _spooled_member(member: ZipMember, spool) -> ZipMember:
+    spool.seek(0, os.SEEK_END)
+    size = spool.tell()
+    return ZipMember(member.name, lambda: iter_spooled_chunks(spool), member.mime_type, size, member.modified)
+
+
+def _missing_files_member(missing: List[str]) -> ZipMember:
+    report = 'These files could not be downloaded and are missing from this archive:\n' + '\n'.join(missing) + '\n'
+    return ZipMember('MISSING_FILES.txt', lambda: [report.encode('utf-8')], 'text/plain', len(report.encode('utf-8')))
+
+
+def prefetch(members: Iterable[ZipMember], workers: Optional[int] = None,
+             window: Optional[int] = None, missing: Optional[List[str]] = None) -> Iterator[ZipMember]:
+    """Yield ``members`` in order, fetching remote ones on a thread pool ahead of time.
+
+    Up to ``window`` members are in flight at once, so the archive takes
+    about as long as the total transfer rather than the sum of per-file
+    latencies, while memory stays bounded (each fetch spools to disk past
+    ZIP_PREFETCH_SPOOL_BYTES). Members that can't be fetched are left out
+    and listed in a MISSING_FILES.txt entry at the end of the archive;
+    their names are also appended to ``missing`` when the caller passes a list.
+    """
+    workers = workers or int(getattr(settings, 'ZIP_PREFETCH_WORKERS', 4))
+    window = window or workers * 2
+    missing = [] if missing is None else missing
+    pending = deque()
+    members = iter(members)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='zip-prefetch')
+
+    def fill():
+        while len(pending) < window:
+            member = next(members, None)
+            if member is None:
+                return
+            future = executor.submit(_spool, member) if member.fetch else None
+            pending.append((member, future))
+
+    try:
+        fill()
+        while pending:
+            member, future = pending.popleft()
+            fill()
+            if future is None:
+                yield member
+                continue
+            try:
+                spool = future.result()
+            except Exception as e:
+                print(f'Could not fetch {member.name} for ZIP: {e}')
+                missing.append(member.name)
+                continue
+            yield _spooled_member(member, spool)
+    finally:
+        # The client may have disconnected: drop queued fetches and spools
+        executor.shutdown(wait=False, cancel_futures=True)
+        for _, future in pending:
+            if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+                future.result().close()
+
+    if missing:
+        yield _missing_files_member(missing)
+
+
+async def aprefetch(members: Iterable[ZipMember], window: Optional[int] = None,
+                    missing: Optional[List[str]] = None) -> AsyncIterator[ZipMember]:
+    """Async ``prefetch``: runs up to ``window`` members' ``afetch`` concurrently on the event loop"""
+    window = window or int(getattr(settings, 'ZIP_PREFETCH_WORKERS', 4)) * 2
+    missing = [] if missing is None else missing
+    pending = deque()
+    members = iter(members)
+
+    def fill():
+        while len(pending) < window:
+            member = next(members, None)
+            if member is None:
+                return
+            task = asyncio.ensure_future(_aspool(member)) if member.afetch else None
+            pending.append((member, task))
+
+    try:
+        fill()
+        while pending:
+            member, task = pending.popleft()
+            fill()
+            if task is None:
+                yield member
+                continue
+            try:
+                spool = await task
+            except Exception as e:
+                print(f'Could not fetch {member.name} for ZIP: {e}')
+                missing.append(member.name)
+                continue
+            yield _spooled_member(member, spool)
+    finally:
+        # The client may have disconnected: cancel queued fetches and drop spools
+        for _, task in pending:
+            if task is None:
+                continue
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is None:
+                task.result().close()
+
+    if missing:
+        yield _missing_files_member(missing)
+
+
+class _StreamBuffer:
+    """Write-only file object that hands written bytes back to the generator.
+
+    It has no ``seek``/``tell``, so ``zipfile`` writes sizes and CRCs in data
+    descriptors after each entry instead of seeking back to patch headers.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def unique_names(names: Iterable[str]) -> List[str]:
+    """Rename duplicates the way file managers do: photo.jpg, photo (1).jpg, ..."""
+    seen = set()
+    result = []
+    for name in names:
+        candidate = name
+        counter = 1
+        while candidate.lower() in seen:
+            stem, extension = os.path.splitext(name)
+            candidate = f'{stem} ({counter}){extension}'
+            counter += 1
+        seen.add(candidate.lower())
+        result.append(candidate)
+    return result
+
+
+class _ZipStreamWriter:
+    """Writes members into a ZIP on a ``_StreamBuffer``, handing back the bytes as they're produced"""
+
+    def __init__(self):
+        self.buffer = _StreamBuffer()
+        self.archive = zipfile.ZipFile(self.buffer, mode='w', allowZip64=True)
+
+    def add(self, member: ZipMember) -> Iterator[bytes]:
+        info = zipfile.ZipInfo(member.name, time.localtime(member.modified or time.time())[:6])
+        if member.mime_type in STORED_MIME_TYPES:
+            info.compress_type = zipfile.ZIP_STORED
+        else:
+            info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        force_zip64 = member.size is None or member.size >= ZIP64_THRESHOLD
+        with self.archive.open(info, mode='w', force_zip64=force_zip64) as entry:
+            for chunk in member.chunks():
+                entry.write(chunk)
+                data = self.buffer.pop()
+                if data:
+                    yield data
+        data = self.buffer.pop()
+        if data:
+            yield data
+
+    def close(self) -> bytes:
+        """Finish the archive; returns the central directory"""
+        self.archive.close()
+        return self.buffer.pop()
+
+
+def stream_zip(members: Iterable[ZipMember]) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``members`` piece by piece.
+
+    Memory use is bounded by the chunk size whatever the archive size: each
+    member is read and written in chunks and the output is handed on as soon
+    as it's produced. Already-compressed formats are stored, everything else
+    is deflated, and ZIP64 records are used wherever sizes require them.
+    """
+    writer = _ZipStreamWriter()
+    for member in members:
+        yield from writer.add(member)
+    yield writer.close()
+
+
+async def astream_zip(members: AsyncIterable[ZipMember]) -> AsyncIterator[bytes]:
+    """``stream_zip`` for an async iterable of members, e.g. from ``aprefetch``"""
+    writer = _ZipStreamWriter()
+    async for member in members:
+        for data in writer.add(member):
+            yield data
+    yield writer.close()
@@ -20,4 +20,7 @@ python manage.py collectstatic --noinput --clear
 echo "🗄️ Running migrations..."
 python manage.py migrate --noinput
 
+# Table for CACHE_BACKEND=db (does nothing for other backends)
+python manage.py createcachetable
+
 echo "✅ Build completed!"
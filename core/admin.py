@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import Job
 
-# Register your models here.
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'key', 'status', 'attempts', 'run_after', 'locked_by', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'key', 'locked_by']
+    readonly_fields = ['attempts', 'locked_by', 'locked_until', 'last_error', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,310 @@
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core.drive_client import drive_client_registry
+from core.folder_cache import folder_id_cache, join_folder_path, split_folder_path
+from core.listing_cache import ListingUnavailable, listing_cache
+from core.services import GoogleDriveService
+from core.time_budget import TimeBudget
+
+try:
+    # Optional: only required for native async Drive/GCS calls (ASYNC_VIEWS)
+    import httpx  # type: ignore
+except Exception:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Failures that leave a listing incomplete rather than failing the page, as in core.services
+LISTING_ERRORS = (httpx.HTTPError, TimeoutError) if httpx is not None else (TimeoutError,)
+
+DRIVE_API_URL = 'https://www.googleapis.com/drive/v3'
+
+
+def is_not_found(error: Exception) -> bool:
+    return httpx is not None and isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 404
+
+# httpx clients are bound to the event loop they were created on; keep one
+# pooled client per loop (under ASGI that's one for the whole process)
+_clients = weakref.WeakKeyDictionary()
+
+
+def new_http_client():
+    max_connections = int(getattr(settings, 'ASYNC_HTTP_MAX_CONNECTIONS', 20))
+    return httpx.AsyncClient(
+        timeout=float(getattr(settings, 'ASYNC_HTTP_TIMEOUT', 10)),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+def get_http_client():
+    """Shared ``httpx.AsyncClient`` for the running event loop, reusing connections across requests.
+
+    Only for long-lived loops: work on a short-lived loop (e.g. one started by
+    ``async_to_sync``) should use its own ``async with new_http_client()``,
+    since nothing closes a pooled client when its loop goes away.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = new_http_client()
+    return client
+
+
+class AsyncGoogleDriveService:
+    """Async counterpart of GoogleDriveService's listing, signing and download paths.
+
+    Drive listings go straight to the Drive REST API over a pooled httpx
+    client, so many listings can be awaited concurrently on one worker.
+    They share the folder ID and listing caches (and their keys) with the
+    synchronous service. Everything that is database work, CPU work (URL
+    signing) or not a Drive listing (the catalog and local development
+    modes) is delegated to the wrapped GoogleDriveService in a thread.
+    Without httpx installed every call is delegated. Drive calls are bounded
+    by the time budget of the wrapped service.
+    """
+
+    def __init__(self, sync_service: Optional[GoogleDriveService] = None, client=None,
+                 budget: Optional[TimeBudget] = None):
+        self.sync = sync_service or GoogleDriveService(budget=budget)
+        self._client = client
+        # Drive errors swallowed while building the current result
+        self.errors: List[Exception] = self.sync.errors
+
+    @property
+    def budget(self) -> TimeBudget:
+        return self.sync.budget
+
+    @property
+    def client(self):
+        return self._client or get_http_client()
+
+    def _native(self) -> bool:
+        return httpx is not None and self.sync._drive_listings_enabled()
+
+    def _report_error(self, error: Exception):
+        logger.warning('Drive listing failed: %s', error)
+        self.errors.append(error)
+
+    # -------- Drive REST calls --------
+    async def _auth_headers(self) -> Dict[str, str]:
+        credentials_file = self.sync.credentials_file
+        if not credentials_file or not os.path.exists(credentials_file):
+            raise FileNotFoundError(f"Google Drive credentials file not found: {credentials_file}")
+        # May fetch a token; keep that off the event loop
+        creds = await sync_to_async(drive_client_registry.get_credentials, thread_sensitive=False)(credentials_file)
+        return {'Authorization': f'Bearer {creds.token}'}
+
+    async def _get_json(self, path: str, params: Dict) -> Dict:
+        timeout = self.budget.timeout(float(getattr(settings, 'ASYNC_HTTP_TIMEOUT', 10)))
+        response = await self.client.get(
+            f'{DRIVE_API_URL}/{path}', params=params, headers=await self._auth_headers(), timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def list_files(self, query: str, fields: str = 'id, name, mimeType', order_by: str = None) -> List[Dict]:
+        """Every file matching ``query``, following ``nextPageToken``"""
+        params = {
+            'q': query,
+            'spaces': 'drive',
+            'fields': f'nextPageToken, files({fields})',
+            'pageSize': GoogleDriveService.LIST_PAGE_SIZE,
+        }
+        if order_by:
+            params['orderBy'] = order_by
+
+        files = []
+        while True:
+            results = await self._get_json('files', params)
+            files.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return files
+            params['pageToken'] = page_token
+
+    async def resolve_folder_path(self, path: str, use_cache: bool = True) -> Optional[str]:
+        """Async ``GoogleDriveService.resolve_folder_path``, sharing its folder ID cache"""
+        segments = split_folder_path(path)
+        if not segments:
+            return None
+        prefixes = ['/'.join(segments[:i + 1]) for i in range(len(segments))]
+
+        cached = await sync_to_async(folder_id_cache.get_many)(prefixes) if use_cache else {}
+        if prefixes[-1] in cached:
+            return cached[prefixes[-1]]
+
+        parent_id = parent_prefix = None
+        resolved = {}
+        try:
+            for prefix, segment in zip(prefixes, segments):
+                folder_id = cached.get(prefix)
+                if folder_id is None:
+                    query = (
+                        f"name='{GoogleDriveService._escape_query_value(segment)}' "
+                        "and mimeType='application/vnd.google-apps.folder' and trashed=false"
+                    )
+                    if parent_id:
+                        query += f" and '{parent_id}' in parents"
+                    results = await self._get_json('files', {'q': query, 'spaces': 'drive', 'fields': 'files(id)', 'pageSize': 1})
+                    files = results.get('files', [])
+                    if not files:
+                        return None
+                    folder_id = resolved[prefix] = files[0]['id']
+                parent_id, parent_prefix = folder_id, prefix
+            return parent_id
+        except LISTING_ERRORS as error:
+            if parent_prefix in cached and is_not_found(error):
+                # The cached parent was deleted since; forget it and resolve the whole path again
+                await sync_to_async(folder_id_cache.invalidate)(parent_prefix)
+                return await self.resolve_folder_path(path, use_cache=False)
+            self._report_error(error)
+            return None
+        finally:
+            await sync_to_async(folder_id_cache.set_many)(resolved)
+
+    async def list_folder_images(self, folder_name: str, parent_folder_name: str = None, fields: str = None) -> List[Dict]:
+        """Drive metadata of a folder's images, uncached"""
+        path = join_folder_path(parent_folder_name, folder_name)
+        folder_id = await self.resolve_folder_path(path)
+        if not folder_id:
+            return []
+
+        def list_images(folder_id):
+            return self.list_files(
+                f"'{folder_id}' in parents and mimeType contains 'image/' and trashed=false",
+                fields=fields or GoogleDriveService.IMAGE_LIST_FIELDS,
+                order_by='name',
+            )
+        try:
+            try:
+                return await list_images(folder_id)
+            except LISTING_ERRORS as error:
+                if not is_not_found(error):
+                    raise
+                # The cached ID belongs to a folder deleted (or replaced) since
+                await sync_to_async(folder_id_cache.invalidate)(path)
+                folder_id = await self.resolve_folder_path(path, use_cache=False)
+                return await list_images(folder_id) if folder_id else []
+        except LISTING_ERRORS as error:
+            self._report_error(error)
+            return []
+
+    async def _cached_listing(self, key: str, load):
+        """Result of ``await load(service)`` through the listing cache (see GoogleDriveService._cached_listing)"""
+        caller = threading.current_thread()
+
+        async def load_with(service):
+            result = await load(service)
+            if service.errors:
+                self.errors.extend(service.errors)
+                raise ListingUnavailable(service.errors[-1], partial=result)
+            return result
+
+        async def loader():
+            if threading.current_thread() is caller:
+                return await load_with(type(self)(client=self._client, budget=self.budget))
+            # Stale entries are refreshed on another thread's short-lived loop,
+            # outside this request's budget; its client is closed with it
+            if self._client is not None or httpx is None:
+                return await load_with(type(self)(client=self._client))
+            async with new_http_client() as client:
+                return await load_with(type(self)(client=client))
+        return await listing_cache.aget(key, loader, wait_seconds=self.budget.remaining())
+
+    # -------- listings --------
+    async def get_files_in_folder(self, folder_name: str, parent_folder_name: str = None) -> List[Dict]:
+        if not self._native():
+            return await sync_to_async(self.sync.get_files_in_folder)(folder_name, parent_folder_name)
+        files = await self._cached_listing(
+            f'folder:{join_folder_path(parent_folder_name, folder_name)}',
+            lambda service: service.list_folder_images(folder_name, parent_folder_name),
+        )
+        return await sync_to_async(self.sync._folder_image_entries)(folder_name, parent_folder_name, files)
+
+    async def get_private_album_files(self, folder_name: str) -> List[Dict]:
+        return await self.get_files_in_folder(folder_name, 'Private_Albums')
+
+    async def get_private_album_image(self, folder_name: str, file_id: str, image=None) -> Optional[Dict]:
+        return await sync_to_async(self.sync.get_private_album_image)(folder_name, file_id, image=image)
+
+    async def get_public_carousel_images(self) -> List[Dict]:
+        if not self._native():
+            return await sync_to_async(self.sync.get_public_carousel_images)()
+        return await self._cached_listing('public-carousel', lambda service: service._load_public_carousel())
+
+    async def _load_public_carousel(self) -> List[Dict]:
+        files = await self.list_folder_images('public', 'Public_Portfolio', fields=GoogleDriveService.IMAGE_METADATA_FIELDS)
+        return await sync_to_async(self.sync._carousel_image_entries)(files)
+
+    async def get_public_portfolio_galleries(self) -> Dict[str, List[Dict]]:
+        if not self._native() or self.sync._tree_fetch_enabled():
+            # DRIVE_TREE_FETCH lists every gallery in a few calls, cached with the home page
+            return await sync_to_async(self.sync.get_public_portfolio_galleries)()
+        return await self._cached_listing('public-galleries', lambda service: service._load_public_galleries())
+
+    async def _load_public_galleries(self) -> Dict[str, List[Dict]]:
+        """List the gallery folders, then every gallery concurrently"""
+        portfolio_folder_id = await self.resolve_folder_path('Public_Portfolio')
+        if not portfolio_folder_id:
+            return {}
+        try:
+            subfolders = await self.list_files(
+                f"'{portfolio_folder_id}' in parents and mimeType='application/vnd.google-apps.folder' "
+                "and trashed=false and name!='public'",
+                fields='id, name', order_by='name',
+            )
+        except LISTING_ERRORS as error:
+            self._report_error(error)
+            return {}
+        await sync_to_async(folder_id_cache.set_many)({
+            join_folder_path('Public_Portfolio', subfolder['name']): subfolder['id']
+            for subfolder in subfolders
+        })
+        listings = await asyncio.gather(*(
+            self.get_files_in_folder(subfolder['name'], 'Public_Portfolio') for subfolder in subfolders
+        ))
+        return {subfolder['name']: files for subfolder, files in zip(subfolders, listings) if files}
+
+    async def get_public_portfolio(self) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+        """Galleries and carousel for the home page, listed concurrently"""
+        if self._native() and self.sync._tree_fetch_enabled():
+            # One tree listing covers both; don't list each gallery separately
+            return await sync_to_async(self.sync.get_public_portfolio)()
+        galleries, carousel_images = await asyncio.gather(
+            self.get_public_portfolio_galleries(), self.get_public_carousel_images()
+        )
+        return galleries, carousel_images
+
+    # -------- signing / downloads --------
+    async def sign_private_urls(self, folder_name: str, file_names: List[str]) -> Dict[str, str]:
+        """Signed GCS URLs for files of a private album (cached; misses signed in a thread)"""
+        return await sync_to_async(self.sync._build_gcs_private_signed_urls)(folder_name, file_names)
+
+    async def _download(self, url: str, f, headers: Dict[str, str] = None) -> int:
+        f.seek(0)
+        f.truncate()
+        async with self.client.stream('GET', url, headers=headers) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                f.write(chunk)
+        return f.tell()
+
+    async def fetch_image_content(self, file_id: str, file_name: str, folder_name: str, f) -> int:
+        """Async ``GoogleDriveService.fetch_image_content``: GCS mirror first, then the Drive API"""
+        if httpx is None:
+            return await sync_to_async(self.sync.fetch_image_content, thread_sensitive=False)(file_id, file_name, folder_name, f)
+        url = (await self.sign_private_urls(folder_name, [file_name])).get(file_name)
+        if url:
+            try:
+                return await self._download(url, f)
+            except httpx.HTTPError as e:
+                logger.warning('GCS download failed for %s/%s, using Google Drive: %s', folder_name, file_name, e)
+        return await self._download(f'{DRIVE_API_URL}/files/{file_id}?alt=media', f, await self._auth_headers())
@@ -0,0 +1,224 @@
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# L1 stores are per process, not per thread: Django builds a cache backend
+# instance for every thread, so they are shared by name like LocMemCache's
+_stores: Dict[str, '_LRUStore'] = {}
+_stores_lock = threading.Lock()
+
+
+class _LRUStore:
+    """Bounded in-process key -> (expiry, pickled value) map, least recently used evicted first"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.stats = {'l1': {'hits': 0, 'misses': 0}, 'l2': {'hits': 0, 'misses': 0}}
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, pickled = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.stats['l1']['hits'] += 1
+                    # Copies, so callers can't mutate what others get
+                    return pickle.loads(pickled)
+                del self.entries[key]
+            self.stats['l1']['misses'] += 1
+            return _MISSING
+
+    def set(self, key: str, value, ttl: float):
+        if ttl <= 0 or self.max_entries <= 0:
+            self.delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, pickled)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TieredCache(BaseCache):
+    """Small in-process LRU (L1) in front of a shared cache backend (L2).
+
+    LOCATION names the L2 entry in CACHES (file, database or Redis), which
+    every worker and serverless instance shares, so a page rendered by one
+    process is a hit for all of them. Reads that L1 answers cost no I/O at
+    all. L1 keeps an entry for at most L1_TIMEOUT seconds (and never past its
+    own timeout), which bounds how long a delete or update made by another
+    process can go unnoticed here. Writes and deletes go to both tiers.
+
+    If L2 fails (unreachable Redis, read-only cache directory, missing cache
+    table) the error is logged and the operation falls back to L1 alone, so
+    the cache degrades to per-process instead of failing the request.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location or 'shared'
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 30))
+        with _stores_lock:
+            self._store = _stores.setdefault(
+                self._l2_alias, _LRUStore(int(options.get('L1_MAX_ENTRIES', 256)))
+            )
+
+    @property
+    def _l2(self) -> BaseCache:
+        return caches[self._l2_alias]
+
+    def _timeout(self, timeout):
+        # Resolve the default here so both tiers use this cache's TIMEOUT
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _l1_ttl(self, timeout) -> float:
+        expires_at = self.get_backend_timeout(timeout)
+        if expires_at is None:
+            return self._l1_timeout
+        if expires_at == -1:
+            return 0
+        return min(self._l1_timeout, expires_at - time.time())
+
+    def _l2_call(self, operation: str, default, *args, **kwargs):
+        """``self._l2.<operation>(...)``, or ``default`` if the backend fails"""
+        try:
+            return getattr(self._l2, operation)(*args, **kwargs)
+        except Exception as e:
+            logger.warning('Shared cache %s failed, using the in-process cache only: %s', operation, e)
+            return default
+
+    def _record(self, tier: str, hit: bool, count: int = 1):
+        with self._store.lock:
+            self._store.stats[tier]['hits' if hit else 'misses'] += count
+
+    def get(self, key, default=None, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        value = self._store.get(l1_key)
+        if value is not _MISSING:
+            return value
+        value = self._l2_call('get', _MISSING, key, _MISSING, version=version)
+        if value is _MISSING:
+            self._record('l2', False)
+            return default
+        self._record('l2', True)
+        self._store.set(l1_key, value, self._l1_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remaining = []
+        for key in keys:
+            value = self._store.get(self.make_and_validate_key(key, version=version))
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = value
+        if remaining:
+            from_l2 = self._l2_call('get_many', {}, remaining, version=version)
+            self._record('l2', True, len(from_l2))
+            self._record('l2', False, len(remaining) - len(from_l2))
+            for key, value in from_l2.items():
+                self._store.set(self.make_and_validate_key(key, version=version), value, self._l1_timeout)
+            found.update(from_l2)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self._l2_call('set', None, key, value, timeout, version=version)
+        self._store.set(self.make_and_validate_key(key, version=version), value, self._l1_ttl(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        failed = self._l2_call('set_many', [], data, timeout, version=version)
+        ttl = self._l1_ttl(timeout)
+        for key, value in data.items():
+            if key not in failed:
+                self._store.set(self.make_and_validate_key(key, version=version), value, ttl)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        l1_key = self.make_and_validate_key(key, version=version)
+        added = self._l2_call('add', _MISSING, key, value, timeout, version=version)
+        if added is _MISSING:
+            # No L2: only this process can be checked
+            added = self._store.get(l1_key) is _MISSING
+        if added:
+            self._store.set(l1_key, value, self._l1_ttl(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self._store.delete(self.make_and_validate_key(key, version=version))
+        return self._l2_call('touch', False, key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        value = self._store.get(l1_key)
+        self._store.delete(l1_key)
+        try:
+            return self._l2.incr(key, delta, version=version)
+        except ValueError:
+            # Missing key: not a backend failure
+            raise
+        except Exception as e:
+            logger.warning('Shared cache incr failed, using the in-process cache only: %s', e)
+        if value is _MISSING:
+            raise ValueError(f"Key '{key}' not found")
+        self._store.set(l1_key, value + delta, self._l1_timeout)
+        return value + delta
+
+    def has_key(self, key, version=None):
+        if self._store.get(self.make_and_validate_key(key, version=version)) is not _MISSING:
+            return True
+        return self._l2_call('has_key', False, key, version=version)
+
+    def delete(self, key, version=None):
+        self._store.delete(self.make_and_validate_key(key, version=version))
+        return self._l2_call('delete', False, key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._store.delete(self.make_and_validate_key(key, version=version))
+        self._l2_call('delete_many', None, keys, version=version)
+
+    def clear(self):
+        self._store.clear()
+        self._l2_call('clear', None)
+
+    def stats(self) -> Dict:
+        """Hit/miss counts per tier for this process, plus the L1 size and L2 backend"""
+        try:
+            backend = type(self._l2).__name__
+        except Exception:
+            backend = 'unavailable'
+        with self._store.lock:
+            return {
+                'l1': {**self._store.stats['l1'], 'entries': len(self._store.entries),
+                       'max_entries': self._store.max_entries},
+                'l2': {**self._store.stats['l2'], 'backend': backend},
+            }
@@ -0,0 +1,129 @@
+import json
+import threading
+from typing import Dict
+
+import google_auth_httplib2
+from google.auth.credentials import TokenState
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import build_http
+from django.conf import settings
+
+
+class DriveClientRegistry:
+    """Process-wide cache of Google Drive credentials and API clients.
+
+    Credentials and the Drive discovery document are loaded once per process.
+    ``googleapiclient`` resources (and the ``httplib2`` connection pool behind
+    them) are not thread-safe, so each thread gets its own client which is then
+    reused for every request that thread serves.
+    """
+
+    SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._local = threading.local()
+        self._credentials = None
+        self._credentials_file = None
+        self._discovery_doc = None
+        self._generation = 0
+        self._stats = {
+            'credential_builds': 0,
+            'client_builds': 0,
+            'blocking_refreshes': 0,
+        }
+
+    # -------- discovery / credentials --------
+    def _load_discovery_doc(self) -> Dict:
+        """Load the Drive v3 discovery document without a network round-trip"""
+        override = getattr(settings, 'GOOGLE_DRIVE_DISCOVERY_DOC', '')
+        if override:
+            with open(override) as f:
+                return json.load(f)
+        # googleapiclient ships a static copy of every discovery document
+        return json.loads(get_static_doc('drive', 'v3'))
+
+    def _get_credentials(self, credentials_file: str):
+        if self._credentials is not None and self._credentials_file == credentials_file:
+            return self._credentials
+
+        with self._lock:
+            if self._credentials is None or self._credentials_file != credentials_file:
+                print(f"Building Google Drive credentials from {credentials_file}")
+                creds = service_account.Credentials.from_service_account_file(
+                    credentials_file, scopes=self.SCOPES
+                )
+                # Refresh stale tokens in a background thread instead of
+                # blocking every request that notices the token is about to expire
+                creds.with_non_blocking_refresh()
+                if self._discovery_doc is None:
+                    self._discovery_doc = self._load_discovery_doc()
+                self._credentials = creds
+                self._credentials_file = credentials_file
+                self._generation += 1
+                self._stats['credential_builds'] += 1
+        return self._credentials
+
+    def _ensure_token(self, creds):
+        """Fetch a token once when none is usable, instead of once per thread"""
+        if creds.token_state != TokenState.INVALID:
+            return
+        with self._refresh_lock:
+            if creds.token_state == TokenState.INVALID:
+                creds.refresh(Request())
+                self._stats['blocking_refreshes'] += 1
+
+    def get_credentials(self, credentials_file: str):
+        """Shared credentials with a usable token, e.g. for HTTP clients other than googleapiclient"""
+        creds = self._get_credentials(credentials_file)
+        self._ensure_token(creds)
+        return creds
+
+    # -------- clients --------
+    def get_service(self, credentials_file: str):
+        """Return the Drive client for the current thread, building it if needed"""
+        creds = self._get_credentials(credentials_file)
+        self._ensure_token(creds)
+
+        service = getattr(self._local, 'service', None)
+        if service is None or getattr(self._local, 'generation', None) != self._generation:
+            http = google_auth_httplib2.AuthorizedHttp(creds, http=build_http())
+            service = build_from_document(self._discovery_doc, http=http)
+            self._local.service = service
+            self._local.generation = self._generation
+            with self._lock:
+                self._stats['client_builds'] += 1
+        return service
+
+    def set_timeout(self, timeout: float):
+        """Socket timeout for this thread's next Drive calls, including on pooled connections"""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            return
+        http = service._http.http
+        http.timeout = timeout
+        for conn in http.connections.values():
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+
+    def reset(self):
+        """Drop cached credentials so the next call rebuilds everything"""
+        with self._lock:
+            self._credentials = None
+            self._credentials_file = None
+            self._generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Counters describing how often clients had to be (re)built"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['rebuilds'] = stats['credential_builds'] + stats['client_builds']
+        return stats
+
+
+drive_client_registry = DriveClientRegistry()
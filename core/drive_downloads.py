@@ -0,0 +1,194 @@
+import hashlib
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+from django.conf import settings
+from googleapiclient.errors import HttpError
+from googleapiclient.http import DEFAULT_HTTP_TIMEOUT_SEC, MediaIoBaseDownload
+
+from core.drive_client import drive_client_registry
+
+
+# Statuses Drive uses for rate limiting and transient failures
+RETRYABLE_STATUSES = {403, 429, 500, 502, 503, 504}
+
+
+class ChecksumMismatch(Exception):
+    """Downloaded bytes don't match the md5Checksum Drive reported"""
+
+
+class _HashingWriter:
+    """File wrapper that computes an MD5 of everything written through it"""
+
+    def __init__(self, f):
+        self.f = f
+        self.md5 = hashlib.md5()
+
+    def write(self, data):
+        self.md5.update(data)
+        return self.f.write(data)
+
+
+class DriveDownloader:
+    """Stream Google Drive files to disk, optionally on a thread pool.
+
+    Each file is written in chunks to a temporary file next to its destination
+    and renamed into place once complete, so readers never see partial files
+    and memory use doesn't depend on file size. Rate-limit and server errors
+    are retried with jittered exponential backoff, and the number of
+    simultaneous downloads per host is capped.
+    """
+
+    def __init__(self, drive_service, workers: int = 1, host_concurrency: Optional[int] = None,
+                 max_retries: Optional[int] = None, chunk_size: Optional[int] = None):
+        self.drive_service = drive_service
+        self.workers = max(1, workers)
+        self.host_concurrency = host_concurrency or int(getattr(settings, 'DRIVE_DOWNLOAD_HOST_CONCURRENCY', 0)) or self.workers
+        self.max_retries = max_retries if max_retries is not None else int(getattr(settings, 'DRIVE_DOWNLOAD_MAX_RETRIES', 5))
+        self.chunk_size = chunk_size or int(getattr(settings, 'DRIVE_DOWNLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self.files = 0
+        self.bytes = 0
+        self.retries = 0
+        self.failures = 0
+        self._started = None
+        self._finished = None
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.host_concurrency)
+            return self._host_slots[host]
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, HttpError):
+            return error.resp.status in RETRYABLE_STATUSES
+        return isinstance(error, (socket.timeout, TimeoutError, ConnectionError, ChecksumMismatch))
+
+    def _backoff(self, attempt: int):
+        # Full jitter keeps parallel workers from retrying in lockstep
+        time.sleep(random.uniform(0, min(32.0, 2 ** attempt)))
+
+    def _stream(self, file_id: str, f, expected_md5: Optional[str] = None):
+        """Write the file's content to ``f`` in chunks, checking its MD5 if given"""
+        if not self.drive_service.service:
+            self.drive_service.authenticate()
+        # Downloads aren't bound by a request's time budget: undo any shorter
+        # timeout a budgeted listing left on this thread's client
+        drive_client_registry.set_timeout(DEFAULT_HTTP_TIMEOUT_SEC)
+        request = self.drive_service.service.files().get_media(fileId=file_id)
+        with self._host_slot(request.uri):
+            writer = _HashingWriter(f)
+            downloader = MediaIoBaseDownload(writer, request, chunksize=self.chunk_size)
+            done = False
+            while not done:
+                _, done = downloader.next_chunk()
+        if expected_md5 and writer.md5.hexdigest() != expected_md5:
+            raise ChecksumMismatch(f'{file_id}: expected md5 {expected_md5}, got {writer.md5.hexdigest()}')
+
+    def _stream_to_file(self, file_id: str, dest_path: str, expected_md5: Optional[str] = None) -> int:
+        directory = os.path.dirname(dest_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self._stream(file_id, f, expected_md5)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, dest_path)
+            return size
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _stream_to_fileobj(self, file_id: str, f, expected_md5: Optional[str] = None) -> int:
+        # Start over on retries
+        f.seek(0)
+        f.truncate()
+        self._stream(file_id, f, expected_md5)
+        return f.tell()
+
+    def download(self, file_id: str, dest_path: str, expected_md5: Optional[str] = None) -> int:
+        """Download one file to ``dest_path``; returns the number of bytes written.
+
+        When ``expected_md5`` is given, the file is only moved into place if
+        its content matches (a mismatch is retried like a transient error).
+        """
+        return self._with_retries(self._stream_to_file, file_id, dest_path, expected_md5)
+
+    def download_to_fileobj(self, file_id: str, f, expected_md5: Optional[str] = None) -> int:
+        """Download one file into the seekable file object ``f``; returns its size"""
+        return self._with_retries(self._stream_to_fileobj, file_id, f, expected_md5)
+
+    def _with_retries(self, stream, file_id: str, target, expected_md5: Optional[str]) -> int:
+        with self._lock:
+            if self._started is None:
+                self._started = time.monotonic()
+
+        attempt = 0
+        while True:
+            try:
+                size = stream(file_id, target, expected_md5)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                self._backoff(attempt)
+
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+            self._finished = time.monotonic()
+        return size
+
+    def download_many(self, jobs: Iterable[Tuple[str, str, Optional[str]]]) -> Iterator[Tuple[str, str, Optional[Exception]]]:
+        """Download ``(file_id, dest_path, expected_md5)`` jobs, yielding ``(file_id, dest_path, error)`` as each completes.
+
+        Results are yielded on the calling thread so callers can safely write
+        to the database while downloads continue in the background.
+        """
+        if self.workers == 1:
+            for file_id, dest_path, expected_md5 in jobs:
+                try:
+                    self.download(file_id, dest_path, expected_md5)
+                    yield file_id, dest_path, None
+                except Exception as e:
+                    yield file_id, dest_path, e
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='drive-download') as executor:
+            futures = {
+                executor.submit(self.download, file_id, dest_path, expected_md5): (file_id, dest_path)
+                for file_id, dest_path, expected_md5 in jobs
+            }
+            for future in as_completed(futures):
+                file_id, dest_path = futures[future]
+                yield file_id, dest_path, future.exception()
+
+    def summary(self) -> str:
+        elapsed = (self._finished - self._started) if self._started and self._finished else 0.0
+        megabytes = self.bytes / (1024 * 1024)
+        if elapsed > 0:
+            rates = f'{self.files / elapsed:.1f} files/s, {megabytes / elapsed:.2f} MB/s'
+        else:
+            rates = 'n/a'
+        return (
+            f'{self.files} files, {megabytes:.1f} MB in {elapsed:.1f}s ({rates}); '
+            f'{self.retries} retries, {self.failures} failures'
+        )
@@ -0,0 +1,139 @@
+import os
+import re
+from typing import Iterator, Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_etags, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _iter_range(f, length: int, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    try:
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def parse_range(header: str, size: int):
+    """``(start, end)`` (inclusive) for a single ``bytes=`` range, or None to send everything.
+
+    Raises ValueError for a range that can't be satisfied. Multi-range
+    requests are answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def _not_modified(request, etag: Optional[str], mtime: float) -> bool:
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        return bool(etag) and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*')
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def _offload_response(path: str, content_type: str, filename: Optional[str], as_attachment: bool):
+    """Let the web server send the file (X-Accel-Redirect / X-Sendfile), or None if not configured"""
+    mode = getattr(settings, 'FILE_OFFLOAD', '').lower()
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = os.path.abspath(path)
+    elif mode == 'x-accel':
+        root = str(getattr(settings, 'FILE_OFFLOAD_ROOT', settings.BASE_DIR))
+        relative_path = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+        if relative_path.startswith('..'):
+            return None
+        prefix = getattr(settings, 'FILE_OFFLOAD_PREFIX', '/protected/').rstrip('/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{prefix}/{quote(relative_path.replace(os.sep, '/'))}"
+    else:
+        return None
+    if filename:
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
+
+
+def ranged_file_response(request, path: str, content_type: str, etag: Optional[str] = None,
+                         filename: Optional[str] = None, as_attachment: bool = True):
+    """Serve a file with ``Accept-Ranges``, ``Content-Length`` and conditional request support.
+
+    A matching ``If-None-Match`` (or, without an ETag, ``If-Modified-Since``)
+    gets a 304. With FILE_OFFLOAD set, nginx (X-Accel-Redirect) or Apache
+    (X-Sendfile) sends the bytes and handles ranges itself. Otherwise a full
+    response is a FileResponse, which WSGI servers send with ``sendfile``,
+    and a single ``Range`` gets a 206 (honouring ``If-Range``) streamed in
+    chunks, so interrupted downloads can resume.
+    """
+    stat = os.stat(path)
+    etag = quote_etag(etag) if etag else None
+    last_modified = http_date(stat.st_mtime)
+
+    if request.method in ('GET', 'HEAD') and _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        response['Last-Modified'] = last_modified
+        if etag:
+            response['ETag'] = etag
+        return response
+
+    offloaded = _offload_response(path, content_type, filename, as_attachment)
+    if offloaded is not None:
+        offloaded['Last-Modified'] = last_modified
+        if etag:
+            offloaded['ETag'] = etag
+        return offloaded
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.method in ('GET', 'HEAD'):
+        if_range = request.headers.get('If-Range')
+        # Only resume if the client's partial copy is of this exact version
+        if not if_range or if_range in (etag, last_modified):
+            try:
+                byte_range = parse_range(range_header, stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type,
+                                as_attachment=as_attachment, filename=filename)
+    else:
+        start, end = byte_range
+        f = open(path, 'rb')
+        f.seek(start)
+        response = StreamingHttpResponse(_iter_range(f, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        if filename:
+            response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = last_modified
+    if etag:
+        response['ETag'] = etag
+    return response
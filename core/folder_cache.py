@@ -0,0 +1,98 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = 'drive-folder:generation'
+
+
+def split_folder_path(path: str) -> List[str]:
+    """Split 'Public_Portfolio/Weddings' into its non-empty segments"""
+    return [segment for segment in path.split('/') if segment]
+
+
+def join_folder_path(*segments: Optional[str]) -> str:
+    return '/'.join(segment.strip('/') for segment in segments if segment)
+
+
+class FolderIdCache:
+    """Folder path -> Drive folder ID mapping stored in the Django cache.
+
+    Entries are keyed by the full path, i.e. by (parent path, name), so the same
+    folder name under different parents never collides. Bumping the generation
+    number invalidates every entry at once without having to enumerate keys.
+    Each path also has a subtree version that is part of the keys of the path
+    and everything below it, so one folder's subtree can be dropped the same
+    way (``invalidate``).
+    """
+
+    def __init__(self, timeout: Optional[int] = None):
+        self.timeout = timeout if timeout is not None else int(
+            getattr(settings, 'DRIVE_FOLDER_CACHE_SECONDS', 6 * 60 * 60)
+        )
+
+    @staticmethod
+    def _subtree_key(path: str) -> str:
+        digest = hashlib.md5(path.encode('utf-8')).hexdigest()
+        return f'drive-folder:subtree:{digest}'
+
+    @staticmethod
+    def _ancestors(path: str) -> List[str]:
+        """'a/b/c' -> ['a', 'a/b', 'a/b/c']"""
+        segments = split_folder_path(path)
+        return [join_folder_path(*segments[:depth]) for depth in range(1, len(segments) + 1)]
+
+    def _versions(self, paths: Iterable[str]) -> Tuple[int, Dict[str, int]]:
+        """The generation and the subtree versions of ``paths`` and their ancestors, in one cache call"""
+        subtree_keys = {
+            self._subtree_key(ancestor): ancestor for path in paths for ancestor in self._ancestors(path)
+        }
+        found = cache.get_many([GENERATION_KEY, *subtree_keys])
+        generation = found.pop(GENERATION_KEY, None)
+        if generation is None:
+            generation = 1
+            cache.add(GENERATION_KEY, generation, None)
+        return generation, {subtree_keys[key]: version for key, version in found.items()}
+
+    def _key(self, path: str, generation: int, versions: Dict[str, int]) -> str:
+        subtree = '.'.join(str(versions.get(ancestor, 0)) for ancestor in self._ancestors(path))
+        digest = hashlib.md5(f'{path}\0{subtree}'.encode('utf-8')).hexdigest()
+        return f'drive-folder:{generation}:{digest}'
+
+    def get_many(self, paths: Iterable[str]) -> Dict[str, str]:
+        """Return the cached IDs for whichever of ``paths`` are known"""
+        paths = list(paths)
+        generation, versions = self._versions(paths)
+        keys = {self._key(path, generation, versions): path for path in paths}
+        found = cache.get_many(list(keys))
+        return {keys[key]: folder_id for key, folder_id in found.items()}
+
+    def set_many(self, mapping: Dict[str, str]):
+        if not mapping:
+            return
+        generation, versions = self._versions(mapping)
+        cache.set_many(
+            {self._key(path, generation, versions): folder_id for path, folder_id in mapping.items()},
+            self.timeout,
+        )
+
+    def invalidate(self, path: str):
+        """Forget a folder path and every path below it, e.g. after it was renamed or deleted"""
+        key = self._subtree_key(join_folder_path(path))
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted in between
+            cache.set(key, 1, None)
+
+    def clear(self):
+        """Forget every cached folder path"""
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, 2, None)
+
+
+folder_id_cache = FolderIdCache()
@@ -0,0 +1,245 @@
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Job
+
+ACTIVE_STATUSES = [Job.STATUS_PENDING, Job.STATUS_RUNNING]
+
+
+class Reschedule(Exception):
+    """Raised by a handler that stopped early (e.g. out of time) to be run again right away.
+
+    The job goes back to pending without counting as a failed attempt.
+    """
+
+
+class JobHandler:
+    def __init__(self, name: str, func: Callable[[Dict], None], interval: Optional[int] = None, cron: bool = False):
+        self.name = name
+        self.func = func
+        # Seconds between runs for jobs that re-schedule themselves
+        self.interval = interval
+        # Fits in a serverless function's time limit (see ``register``)
+        self.cron = cron
+
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def register(name: str, interval: Optional[int] = None, cron: bool = False):
+    """Register ``func(payload)`` as the handler for jobs called ``name``.
+
+    Handlers given an ``interval`` are scheduled automatically by
+    ``schedule_periodic_jobs`` that many seconds after their last run.
+    Only ``cron`` handlers are run by the /jobs/run/ endpoint: they must do a
+    bounded amount of work per run (raising Reschedule to continue later),
+    since the function running them is killed after its time limit.
+    Everything else needs a ``run_jobs`` worker.
+    """
+    def decorator(func):
+        _handlers[name] = JobHandler(name, func, interval or None, cron)
+        return func
+    return decorator
+
+
+def get_handlers() -> Dict[str, JobHandler]:
+    return dict(_handlers)
+
+
+def is_active(key: str) -> bool:
+    """Whether a job with this key is pending or running"""
+    return Job.objects.filter(key=key, status__in=ACTIVE_STATUSES).exists()
+
+
+def cron_handler_names() -> List[str]:
+    return [handler.name for handler in _handlers.values() if handler.cron]
+
+
+def default_worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def lease_seconds() -> int:
+    return int(getattr(settings, 'JOB_LEASE_SECONDS', 300))
+
+
+def enqueue(name: str, payload: Optional[Dict] = None, key: Optional[str] = None,
+            run_after=None, max_attempts: int = 3) -> Job:
+    """Queue a job, or return the pending/running job that already has ``key``"""
+    key = key or name
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return Job.objects.create(
+                    name=name,
+                    key=key,
+                    payload=payload or {},
+                    run_after=run_after or timezone.now(),
+                    max_attempts=max_attempts,
+                )
+        except IntegrityError:
+            existing = Job.objects.filter(key=key, status__in=ACTIVE_STATUSES).first()
+            if existing is not None:
+                return existing
+            # The other job finished in the meantime; try once more
+    # Still conflicting: the active job must exist now (raises if it doesn't)
+    return Job.objects.get(key=key, status__in=ACTIVE_STATUSES)
+
+
+def claim_next(worker_id: str, names: Optional[Iterable[str]] = None) -> Optional[Job]:
+    """Take a lease on the next due job (or one whose worker's lease expired), optionally only jobs called ``names``"""
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        Q(status=Job.STATUS_PENDING, run_after__lte=now)
+        | Q(status=Job.STATUS_RUNNING, locked_until__lt=now)
+    )
+    if names is not None:
+        candidates = candidates.filter(name__in=list(names))
+    candidates = candidates.order_by('run_after', 'id')[:10]
+
+    for job in candidates:
+        # Compare-and-swap on the fields we read, so two workers can never
+        # both win the same job, whatever the database backend
+        claimed = Job.objects.filter(
+            pk=job.pk, status=job.status, locked_until=job.locked_until, attempts=job.attempts,
+        ).update(
+            status=Job.STATUS_RUNNING,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=lease_seconds()),
+            attempts=F('attempts') + 1,
+            started_at=now,
+        )
+        if not claimed:
+            continue
+        job.refresh_from_db()
+        if job.attempts > job.max_attempts:
+            # Its workers keep dying mid-run; stop retrying it
+            _finish(job, worker_id, Job.STATUS_FAILED, error=job.last_error or 'Lease expired too many times')
+            continue
+        return job
+    return None
+
+
+class _LeaseKeeper(threading.Thread):
+    """Extends a job's lease while its handler runs"""
+
+    def __init__(self, job: Job, worker_id: str):
+        super().__init__(name=f'job-lease-{job.pk}', daemon=True)
+        self.job_id = job.pk
+        self.worker_id = worker_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        interval = max(1, lease_seconds() // 3)
+        try:
+            while not self.stopped.wait(interval):
+                Job.objects.filter(pk=self.job_id, locked_by=self.worker_id, status=Job.STATUS_RUNNING).update(
+                    locked_until=timezone.now() + timedelta(seconds=lease_seconds())
+                )
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def _finish(job: Job, worker_id: str, status: str, error: str = '', retry_at=None, reset_attempts: bool = False):
+    values = {
+        'status': status,
+        'locked_until': None,
+        'last_error': error,
+        'finished_at': timezone.now(),
+    }
+    if retry_at is not None:
+        values['run_after'] = retry_at
+        values['finished_at'] = None
+    if reset_attempts:
+        values['attempts'] = 0
+    # Only the lease holder may record the outcome
+    Job.objects.filter(pk=job.pk, locked_by=worker_id, status=Job.STATUS_RUNNING).update(**values)
+    for field, value in values.items():
+        setattr(job, field, value)
+
+
+def run_job(job: Job, worker_id: str) -> bool:
+    """Run a claimed job; returns True if it succeeded"""
+    handler = _handlers.get(job.name)
+    if handler is None:
+        _finish(job, worker_id, Job.STATUS_FAILED, error=f'No handler registered for {job.name}')
+        return False
+
+    print(f'Running job {job.name} (#{job.pk}, attempt {job.attempts})')
+    started = time.monotonic()
+    keeper = _LeaseKeeper(job, worker_id)
+    keeper.start()
+    try:
+        handler.func(job.payload)
+    except Reschedule as e:
+        print(f'Job {job.name} (#{job.pk}) will continue: {e}')
+        _finish(job, worker_id, Job.STATUS_PENDING, retry_at=timezone.now(), reset_attempts=True)
+        return True
+    except Exception:
+        error = traceback.format_exc()
+        print(f'Job {job.name} (#{job.pk}) failed: {error.strip().splitlines()[-1]}')
+        if job.attempts < job.max_attempts:
+            retry_at = timezone.now() + timedelta(seconds=60 * 2 ** (job.attempts - 1))
+            _finish(job, worker_id, Job.STATUS_PENDING, error=error, retry_at=retry_at)
+        else:
+            _finish(job, worker_id, Job.STATUS_FAILED, error=error)
+        return False
+    finally:
+        keeper.stop()
+
+    _finish(job, worker_id, Job.STATUS_DONE)
+    print(f'Job {job.name} (#{job.pk}) finished in {time.monotonic() - started:.1f}s')
+    return True
+
+
+def schedule_periodic_jobs(names: Optional[Iterable[str]] = None):
+    """Queue the next run of every periodic handler (or those called ``names``) that isn't already queued"""
+    names = None if names is None else set(names)
+    for handler in _handlers.values():
+        if not handler.interval or (names is not None and handler.name not in names):
+            continue
+        if is_active(handler.name):
+            continue
+        last = Job.objects.filter(key=handler.name, finished_at__isnull=False).order_by('-finished_at').first()
+        run_after = last.finished_at + timedelta(seconds=handler.interval) if last else timezone.now()
+        enqueue(handler.name, run_after=run_after)
+
+
+def prune_finished_jobs(days: Optional[int] = None) -> int:
+    """Delete finished jobs older than ``JOB_RETENTION_DAYS``"""
+    days = days if days is not None else int(getattr(settings, 'JOB_RETENTION_DAYS', 7))
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.STATUS_DONE, Job.STATUS_FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def run_pending(worker_id: Optional[str] = None, max_jobs: Optional[int] = None,
+                names: Optional[Iterable[str]] = None) -> int:
+    """Run due jobs (optionally only those called ``names``) until none are left or ``max_jobs`` ran; returns how many ran"""
+    worker_id = worker_id or default_worker_id()
+    names = None if names is None else list(names)
+    ran = 0
+    while max_jobs is None or ran < max_jobs:
+        close_old_connections()
+        job = claim_next(worker_id, names)
+        if job is None:
+            break
+        run_job(job, worker_id)
+        ran += 1
+    return ran
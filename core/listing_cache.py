@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+class ListingUnavailable(Exception):
+    """A Drive listing failed or came back incomplete; ``partial`` holds what was fetched"""
+
+    def __init__(self, message, partial=None):
+        super().__init__(message)
+        self.partial = partial
+
+
+class ListingCache:
+    """Stale-while-revalidate cache for Google Drive listings.
+
+    An entry is fresh for LISTING_CACHE_FRESH_SECONDS. After that it is still
+    served, for up to LISTING_CACHE_STALE_SECONDS more, while a single
+    background thread reloads it (a lock in the shared cache keeps other
+    processes from refreshing the same key too). If the reload fails the stale
+    copy stays in use and the next attempt waits LISTING_CACHE_RETRY_SECONDS.
+    Concurrent misses for a key within a process wait for one load instead of
+    all calling Drive.
+    """
+
+    def __init__(self, fresh_seconds: Optional[int] = None, stale_seconds: Optional[int] = None,
+                 retry_seconds: Optional[int] = None, lock_seconds: Optional[int] = None):
+        self.fresh_seconds = fresh_seconds if fresh_seconds is not None else int(
+            getattr(settings, 'LISTING_CACHE_FRESH_SECONDS', 5 * 60))
+        self.stale_seconds = stale_seconds if stale_seconds is not None else int(
+            getattr(settings, 'LISTING_CACHE_STALE_SECONDS', 24 * 60 * 60))
+        self.retry_seconds = retry_seconds if retry_seconds is not None else int(
+            getattr(settings, 'LISTING_CACHE_RETRY_SECONDS', 60))
+        self.lock_seconds = lock_seconds if lock_seconds is not None else int(
+            getattr(settings, 'LISTING_CACHE_LOCK_SECONDS', 60))
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Event] = {}
+        # (event loop, key) -> future of the load in progress, for ``aget``
+        self._afutures: Dict[tuple, asyncio.Future] = {}
+        self.stats = {'fresh': 0, 'stale': 0, 'misses': 0, 'coalesced': 0, 'refreshes': 0, 'errors': 0}
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(getattr(settings, 'LISTING_CACHE', True))
+
+    @staticmethod
+    def cache_key(key: str) -> str:
+        return f"drive-listing:{hashlib.md5(key.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str, loader: Callable[[], Any], wait_seconds: Optional[float] = None) -> Any:
+        """Cached value for ``key``, calling ``loader()`` to (re)load it.
+
+        A miss while another thread loads ``key`` waits for that load for at
+        most ``wait_seconds`` (LISTING_CACHE_LOCK_SECONDS by default).
+        """
+        if not self.enabled():
+            return self._call(loader)
+
+        entry = cache.get(self.cache_key(key))
+        if entry is not None:
+            if entry['fresh_until'] > time.time():
+                self._count('fresh')
+            else:
+                self._count('stale')
+                self._refresh_in_background(key, loader)
+            return entry['value']
+
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            # Another thread is already loading this listing
+            self._count('coalesced')
+            event.wait(self._wait_seconds(wait_seconds))
+            entry = cache.get(self.cache_key(key))
+            if entry is not None:
+                return entry['value']
+            return self._call(loader)
+
+        try:
+            self._count('misses')
+            return self._load(key, loader)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    async def aget(self, key: str, loader: Callable[[], Awaitable[Any]], wait_seconds: Optional[float] = None) -> Any:
+        """Async ``get``: ``loader`` is a coroutine function.
+
+        Concurrent misses on the same event loop await one load. Stale
+        entries are refreshed on the same background threads as ``get``.
+        """
+        if not self.enabled():
+            return await self._acall(loader)
+
+        entry = await cache.aget(self.cache_key(key))
+        if entry is not None:
+            if entry['fresh_until'] > time.time():
+                self._count('fresh')
+            else:
+                self._count('stale')
+                await sync_to_async(self._refresh_in_background)(key, async_to_sync(loader))
+            return entry['value']
+
+        flight_key = (id(asyncio.get_running_loop()), key)
+        future = self._afutures.get(flight_key)
+        if future is not None:
+            self._count('coalesced')
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self._wait_seconds(wait_seconds))
+            except asyncio.TimeoutError:
+                return await self._acall(loader)
+
+        future = self._afutures[flight_key] = asyncio.get_running_loop().create_future()
+        try:
+            self._count('misses')
+            value = await self._aload(key, loader)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; don't warn when there are none
+            future.exception()
+            raise
+        finally:
+            del self._afutures[flight_key]
+
+    def _count(self, stat: str):
+        # Called from request and refresh threads alike
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _wait_seconds(self, wait_seconds: Optional[float]) -> float:
+        return self.lock_seconds if wait_seconds is None else min(wait_seconds, self.lock_seconds)
+
+    def delete(self, key: str):
+        cache.delete(self.cache_key(key))
+
+    @staticmethod
+    def _call(loader: Callable[[], Any]) -> Any:
+        try:
+            return loader()
+        except ListingUnavailable as e:
+            return e.partial
+
+    @staticmethod
+    async def _acall(loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await loader()
+        except ListingUnavailable as e:
+            return e.partial
+
+    async def _aload(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+        except ListingUnavailable as e:
+            self._count('errors')
+            print(f"Listing {key} is incomplete: {e}")
+            return e.partial
+        except Exception:
+            self._count('errors')
+            raise
+        await sync_to_async(self._store)(key, value, self.fresh_seconds)
+        return value
+
+    def _store(self, key: str, value: Any, fresh_seconds: int):
+        entry = {'value': value, 'fresh_until': time.time() + fresh_seconds}
+        cache.set(self.cache_key(key), entry, fresh_seconds + self.stale_seconds)
+
+    def _load(self, key: str, loader: Callable[[], Any], stale: Optional[dict] = None) -> Any:
+        try:
+            value = loader()
+        except Exception as e:
+            self._count('errors')
+            if stale is not None:
+                print(f"Refreshing listing {key} failed, serving stale copy: {e}")
+                self._store(key, stale['value'], self.retry_seconds)
+                return stale['value']
+            if isinstance(e, ListingUnavailable):
+                # Nothing better to serve; don't cache an incomplete listing
+                print(f"Listing {key} is incomplete: {e}")
+                return e.partial
+            raise
+        self._store(key, value, self.fresh_seconds)
+        return value
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any]):
+        with self._lock:
+            if key in self._inflight:
+                return
+            event = self._inflight[key] = threading.Event()
+
+        # One refresh across all processes sharing the cache. This is a call
+        # to the shared cache, so it's made without holding the thread lock
+        if not cache.add(f'{self.cache_key(key)}:refreshing', 1, self.lock_seconds):
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+            return
+
+        def refresh():
+            try:
+                stale = cache.get(self.cache_key(key))
+                self._count('refreshes')
+                self._load(key, loader, stale)
+            except Exception as e:
+                print(f"Refreshing listing {key} failed: {e}")
+            finally:
+                cache.delete(f'{self.cache_key(key)}:refreshing')
+                with self._lock:
+                    del self._inflight[key]
+                event.set()
+                connections.close_all()
+
+        threading.Thread(target=refresh, name='listing-refresh', daemon=True).start()
+
+
+listing_cache = ListingCache()
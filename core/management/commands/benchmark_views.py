@@ -0,0 +1,106 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.utils import override_settings
+from django.urls import Resolver404, resolve
+
+from albums import views as album_views
+from portfolio import views as portfolio_views
+
+# URL name -> (sync view, async view)
+VIEW_PAIRS = {
+    'portfolio:home': (portfolio_views.portfolio_home, portfolio_views.portfolio_home_async),
+    'albums:album_detail': (album_views.album_detail, album_views.album_detail_async),
+}
+
+
+async def _anonymous_user():
+    return AnonymousUser()
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/s of the sync and async versions of a page under concurrent load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='/', help='Page to request, e.g. / or /album/<id>/')
+        parser.add_argument('--requests', type=int, default=100, help='Requests per mode')
+        parser.add_argument('--concurrency', type=int, default=10, help='Requests in flight at once')
+        parser.add_argument(
+            '--mode', choices=['both', 'sync', 'async'], default='both',
+            help='Which view versions to run',
+        )
+        parser.add_argument(
+            '--listing-cache', action='store_true',
+            help='Keep the Drive listing cache on (by default every request calls Drive)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            match = resolve(options['path'])
+        except Resolver404:
+            raise CommandError(f"No page at {options['path']}")
+        if match.view_name not in VIEW_PAIRS:
+            raise CommandError(f"Can benchmark {', '.join(VIEW_PAIRS)}, not {match.view_name}")
+        sync_view, async_view = VIEW_PAIRS[match.view_name]
+
+        # A query string bypasses the page cache, so every request renders
+        with override_settings(LISTING_CACHE=options['listing_cache']):
+            if options['mode'] in ('both', 'sync'):
+                self._report('sync', options, self._run_sync(sync_view, match, options))
+            if options['mode'] in ('both', 'async'):
+                self._report('async', options, asyncio.run(self._run_async(async_view, match, options)))
+
+    def _run_sync(self, view, match, options):
+        factory = RequestFactory()
+
+        def one(i):
+            request = factory.get(options['path'], {'benchmark': i})
+            request.user = AnonymousUser()
+            started = time.perf_counter()
+            try:
+                response = view(request, *match.args, **match.kwargs)
+                return time.perf_counter() - started, response.status_code
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(one, range(options['requests'])))
+        return time.perf_counter() - started, results
+
+    async def _run_async(self, view, match, options):
+        if not iscoroutinefunction(view):
+            raise CommandError('Async view is not a coroutine function')
+        factory = AsyncRequestFactory()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def one(i):
+            async with semaphore:
+                request = factory.get(options['path'], {'benchmark': i})
+                request.user = AnonymousUser()
+                request.auser = _anonymous_user
+                started = time.perf_counter()
+                response = await view(request, *match.args, **match.kwargs)
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(options['requests'])))
+        return time.perf_counter() - started, results
+
+    def _report(self, mode, options, outcome):
+        elapsed, results = outcome
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status in results if status != 200)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"{mode:>5}: {len(results) / elapsed:8.1f} req/s  "
+            f"(concurrency {options['concurrency']}, {len(results)} requests, {errors} non-200)  "
+            f"latency p50 {statistics.median(latencies) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms"
+        )
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.jobs import default_worker_id, enqueue, get_handlers, prune_finished_jobs, run_pending, schedule_periodic_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (e.g. the scheduled Google Drive sync)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for jobs instead of exiting once the queue is empty',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when looping',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=None,
+            help='Stop after running this many jobs',
+        )
+        parser.add_argument(
+            '--enqueue',
+            metavar='NAME',
+            help='Queue a job with this name before running',
+        )
+        parser.add_argument(
+            '--no-schedule',
+            action='store_true',
+            help="Don't queue the next run of periodic jobs",
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            if options['enqueue'] not in get_handlers():
+                raise CommandError(f"Unknown job {options['enqueue']}; known jobs: {', '.join(sorted(get_handlers()))}")
+            job = enqueue(options['enqueue'])
+            self.stdout.write(f'Queued {job}')
+
+        worker_id = default_worker_id()
+        total = 0
+        while True:
+            if not options['no_schedule']:
+                schedule_periodic_jobs()
+            remaining = None if options['max_jobs'] is None else options['max_jobs'] - total
+            total += run_pending(worker_id, max_jobs=remaining)
+
+            if not options['loop'] or (options['max_jobs'] is not None and total >= options['max_jobs']):
+                break
+            time.sleep(options['interval'])
+
+        pruned = prune_finished_jobs()
+        if pruned:
+            self.stdout.write(f'Removed {pruned} old jobs')
+        self.stdout.write(self.style.SUCCESS(f'Ran {total} jobs'))
@@ -1,3 +1,50 @@
 from django.db import models
 
-# Create your models here.
+
+class Job(models.Model):
+    """Background work queued in the database and run by ``manage.py run_jobs``.
+
+    A worker claims a job by taking a time-limited lease on it; if the worker
+    dies, the lease expires and another worker can pick the job up again.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)  # Registered handler name
+    key = models.CharField(max_length=200)  # At most one pending/running job per key
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    run_after = models.DateTimeField()
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(blank=True, null=True)  # Lease expiry while running
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['name', 'status']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_job_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,131 @@
+import hashlib
+from functools import wraps
+from typing import Callable, Iterable, Optional
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_response_headers
+
+DEFAULT_PAGE_TIMEOUT = 60 * 15
+
+
+def page_timeout(view_name: str, default: int = DEFAULT_PAGE_TIMEOUT) -> int:
+    """Page cache lifetime for a view, overridable per view with CACHE_VIEW_TIMEOUTS"""
+    return int(getattr(settings, 'CACHE_VIEW_TIMEOUTS', {}).get(view_name, default))
+
+
+def cache_stats() -> dict:
+    """Per-tier hit/miss counts of the default cache, if it keeps them"""
+    stats = getattr(cache, 'stats', None)
+    return stats() if callable(stats) else {}
+
+
+def page_cache_key(path: str) -> str:
+    return f"page:{hashlib.md5(path.encode('utf-8')).hexdigest()}"
+
+
+def mark_incomplete(response):
+    """Flag a page rendered from incomplete listings, so it's only cached briefly"""
+    response.incomplete = True
+    return response
+
+
+def cached_page(view_name: str, timeout: Optional[int] = None) -> Callable:
+    """Cache a view's rendered page for anonymous visitors, keyed by URL path.
+
+    Unlike ``cache_page`` the key doesn't depend on the host or request
+    headers, so the sync can delete a page's entry and render it again
+    (``refresh_pages``) without having seen a request for it. Logged-in
+    users, whose pages differ, always get a fresh render. Pages flagged with
+    ``mark_incomplete`` are kept for LISTING_CACHE_RETRY_SECONDS at most, so
+    the listings that failed or ran out of time are soon tried again.
+    """
+    ttl = timeout if timeout is not None else page_timeout(view_name)
+
+    def cacheable(response) -> bool:
+        return response.status_code == 200 and not response.streaming and not response.cookies
+
+    def response_ttl(response) -> int:
+        if getattr(response, 'incomplete', False):
+            return min(ttl, int(getattr(settings, 'LISTING_CACHE_RETRY_SECONDS', 60)))
+        return ttl
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def awrapped(request, *args, **kwargs):
+                user = await request.auser()
+                if request.method not in ('GET', 'HEAD') or request.GET or user.is_authenticated:
+                    return await view(request, *args, **kwargs)
+
+                key = page_cache_key(request.path)
+                if not getattr(request, 'refresh_page_cache', False):
+                    response = await cache.aget(key)
+                    if response is not None:
+                        return response
+
+                response = await view(request, *args, **kwargs)
+                if cacheable(response):
+                    patch_response_headers(response, response_ttl(response))
+                    await cache.aset(key, response, response_ttl(response))
+                return response
+            return awrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.GET or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            key = page_cache_key(request.path)
+            if not getattr(request, 'refresh_page_cache', False):
+                response = cache.get(key)
+                if response is not None:
+                    return response
+
+            response = view(request, *args, **kwargs)
+            if cacheable(response):
+                patch_response_headers(response, response_ttl(response))
+                cache.set(key, response, response_ttl(response))
+            return response
+        return wrapped
+    return decorator
+
+
+async def _anonymous_user():
+    return AnonymousUser()
+
+
+def refresh_pages(paths: Iterable[str]) -> int:
+    """Drop the cached copies of ``paths`` and render them into the cache again.
+
+    Returns the number of pages rendered. A page that fails to render is
+    left uncached, so the next visitor renders it as usual.
+    """
+    paths = list(dict.fromkeys(paths))
+    factory = RequestFactory()
+    # Keys are built from the decoded path, as for incoming requests
+    cache.delete_many([page_cache_key(factory.get(path).path) for path in paths])
+
+    refreshed = 0
+    for path in paths:
+        request = factory.get(path)
+        try:
+            match = resolve(request.path)
+        except Resolver404:
+            continue
+        request.user = AnonymousUser()
+        request.auser = _anonymous_user
+        request.refresh_page_cache = True
+        view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+        try:
+            response = view(request, *match.args, **match.kwargs)
+        except Exception as e:
+            print(f'Could not refresh cached page {path}: {e}')
+            continue
+        if response.status_code == 200:
+            refreshed += 1
+    return refreshed
@@ -1,16 +1,28 @@
 import os
 import json
-from typing import List, Dict, Optional
+import re
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import timedelta
 from urllib.parse import quote
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google.oauth2 import service_account
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import DEFAULT_HTTP_TIMEOUT_SEC
 from django.conf import settings
-from albums.models import Image
+from django.db import connections
+from albums.derivatives import DerivativeGenerator, derivative_widths
+from albums.models import DriveFolder, Image
+from core.drive_client import DriveClientRegistry, drive_client_registry
+from core.drive_downloads import DriveDownloader
+from core.folder_cache import folder_id_cache, join_folder_path, split_folder_path
+from core.listing_cache import ListingUnavailable, listing_cache
+from core.signed_urls import signed_url_cache
+from core.time_budget import TimeBudget
+from django.utils.dateparse import parse_datetime
 from django.utils.functional import cached_property
 
 try:
@@ -19,71 +31,291 @@ try:
 except Exception:
     storage = None
 
+logger = logging.getLogger(__name__)
+
+# Drive failures that leave a listing incomplete rather than failing the page.
+# TimeoutError covers socket timeouts and a used-up request time budget
+LISTING_ERRORS = (HttpError, TimeoutError)
+
+# One pool per process, so its threads (and the Drive client each keeps)
+# are reused by every request's fan-out
+_fan_out_executor: Optional[ThreadPoolExecutor] = None
+_fan_out_executor_lock = threading.Lock()
+
+
+def fan_out_executor() -> ThreadPoolExecutor:
+    global _fan_out_executor
+    with _fan_out_executor_lock:
+        if _fan_out_executor is None:
+            _fan_out_executor = ThreadPoolExecutor(
+                max_workers=int(getattr(settings, 'DRIVE_FANOUT_WORKERS', 8)), thread_name_prefix='drive-fanout'
+            )
+        return _fan_out_executor
+
 
 class GoogleDriveService:
     """Service for interacting with Google Drive API"""
     
-    SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+    SCOPES = DriveClientRegistry.SCOPES
+    # Largest page size files.list accepts
+    LIST_PAGE_SIZE = 1000
+    # Field masks: only request what the listing code actually reads
+    IMAGE_LIST_FIELDS = 'id, name, mimeType, md5Checksum, modifiedTime, thumbnailLink'
+    IMAGE_METADATA_FIELDS = 'id, name, mimeType, size, thumbnailLink, imageMediaMetadata(width, height)'
+    # Adds what's needed to skip unchanged files and share identical ones on disk
+    DOWNLOAD_FIELDS = 'id, name, mimeType, size, md5Checksum, modifiedTime, imageMediaMetadata(width, height)'
+    # Most sub-requests Drive accepts in one batch request
+    BATCH_LIMIT = 100
     
-    def __init__(self):
+    def __init__(self, budget: Optional[TimeBudget] = None):
         self.credentials_file = settings.GOOGLE_DRIVE_CREDENTIALS_FILE
         self.token_file = settings.GOOGLE_DRIVE_TOKEN_FILE
-        self.service = None
+        self._authenticated = False
+        # Drive errors swallowed while building the current result; a listing
+        # with errors is incomplete and isn't cached as fresh
+        self.errors: List[Exception] = []
+        # Time left for the current request; every Drive call is bounded by it
+        self.budget = budget or TimeBudget.unlimited()
+    
+    @property
+    def service(self):
+        """Drive client for the current thread, shared through the process-wide registry"""
+        if not self._authenticated:
+            return None
+        return drive_client_registry.get_service(self.credentials_file)
     
     def authenticate(self):
         """Authenticate with Google Drive API using service account"""
         try:
-            print("Starting Google Drive authentication...")
-            
             # Check if credentials file exists
             if not self.credentials_file or not os.path.exists(self.credentials_file):
-                print(f"ERROR: Google Drive credentials file not found: {self.credentials_file}")
-                print(f"Available environment variables: {[k for k in os.environ.keys() if 'GOOGLE' in k]}")
+                logger.error('Google Drive credentials file not found: %s', self.credentials_file)
+                logger.error('Available environment variables: %s', [k for k in os.environ.keys() if 'GOOGLE' in k])
                 raise FileNotFoundError(
                     f"Google Drive credentials file not found: {self.credentials_file}"
                 )
             
-            print(f"Using credentials file: {self.credentials_file}")
-            
-            # Use service account credentials
-            creds = service_account.Credentials.from_service_account_file(
-                self.credentials_file, scopes=self.SCOPES
-            )
-            
-            print("Building Google Drive service...")
-            self.service = build('drive', 'v3', credentials=creds)
-            print("Google Drive authentication successful")
-            return self.service
+            # Credentials, discovery document and HTTP connections are built once
+            # per process (per thread for the client) and reused across requests
+            service = drive_client_registry.get_service(self.credentials_file)
+            self._authenticated = True
+            return service
             
         except Exception as e:
-            print(f"ERROR in Google Drive authentication: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Google Drive authentication failed: %s', e)
             raise
     
-    def get_folder_id(self, folder_name: str, parent_folder_name: str = None) -> Optional[str]:
+    @staticmethod
+    def _escape_query_value(value: str) -> str:
+        """Escape a value for use inside a quoted Drive query string"""
+        return value.replace('\\', '\\\\').replace("'", "\\'")
+    
+    def _execute(self, request):
+        """``request.execute()`` with the time left in the budget as its timeout"""
+        drive_client_registry.set_timeout(self.budget.timeout(DEFAULT_HTTP_TIMEOUT_SEC))
+        return request.execute()
+    
+    def _find_folder_id(self, folder_name: str, parent_id: str = None) -> Optional[str]:
+        """Look up a single folder by name (and optional parent ID) on Drive"""
+        query = (
+            f"name='{self._escape_query_value(folder_name)}' "
+            "and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        )
+        if parent_id:
+            query += f" and '{parent_id}' in parents"
+        
+        results = self._execute(self.service.files().list(
+            q=query,
+            spaces='drive',
+            fields='files(id)',
+            pageSize=1
+        ))
+        
+        files = results.get('files', [])
+        return files[0]['id'] if files else None
+    
+    @staticmethod
+    def _is_not_found(error: Exception) -> bool:
+        return isinstance(error, HttpError) and error.resp.status == 404
+    
+    def resolve_folder_path(self, path: str, use_cache: bool = True) -> Optional[str]:
+        """Resolve a folder path such as 'Public_Portfolio/Weddings' to a Drive ID.
+        
+        Every prefix of the path is looked up in the folder cache in one call and
+        only the segments below the deepest cached prefix are queried on Drive,
+        each exactly once. Resolved prefixes are written back to the cache. If
+        Drive no longer knows a cached ID (404), the entry is dropped and the
+        path is resolved again without the cache.
+        """
+        segments = split_folder_path(path)
+        if not segments:
+            return None
+        prefixes = ['/'.join(segments[:i + 1]) for i in range(len(segments))]
+        
+        cached = folder_id_cache.get_many(prefixes) if use_cache else {}
+        if prefixes[-1] in cached:
+            return cached[prefixes[-1]]
+        
+        if not self.service:
+            self.authenticate()
+        
+        parent_id = parent_prefix = None
+        resolved = {}
+        try:
+            for prefix, segment in zip(prefixes, segments):
+                folder_id = cached.get(prefix)
+                if folder_id is None:
+                    folder_id = self._find_folder_id(segment, parent_id)
+                    if folder_id is None:
+                        return None
+                    resolved[prefix] = folder_id
+                parent_id, parent_prefix = folder_id, prefix
+            return parent_id
+        except LISTING_ERRORS as error:
+            if parent_prefix in cached and self._is_not_found(error):
+                # The cached parent was deleted since; forget it and resolve the whole path again
+                folder_id_cache.invalidate(parent_prefix)
+                return self.resolve_folder_path(path, use_cache=False)
+            self._report_error(error)
+            return None
+        finally:
+            folder_id_cache.set_many(resolved)
+    
+    def get_folder_id(self, folder_name: str, parent_folder_name: str = None, use_cache: bool = True) -> Optional[str]:
         """Get folder ID by name"""
+        return self.resolve_folder_path(join_folder_path(parent_folder_name, folder_name), use_cache=use_cache)
+    
+    def iter_files(self, query: str, fields: str = 'id, name, mimeType', order_by: str = None,
+                   page_size: int = None) -> Iterator[Dict]:
+        """Yield every file matching ``query``, following ``nextPageToken``.
+        
+        Pages are requested with the largest page size Drive allows and a
+        field mask limited to ``fields``, and files are yielded as each page
+        arrives so callers never hold more than one page in memory.
+        """
         if not self.service:
             self.authenticate()
         
-        query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'"
-        if parent_folder_name:
-            parent_id = self.get_folder_id(parent_folder_name)
-            if parent_id:
-                query += f" and '{parent_id}' in parents"
+        params = {
+            'q': query,
+            'spaces': 'drive',
+            'fields': f'nextPageToken, files({fields})',
+            'pageSize': page_size or self.LIST_PAGE_SIZE,
+        }
+        if order_by:
+            params['orderBy'] = order_by
         
-        try:
-            results = self.service.files().list(
-                q=query,
+        while True:
+            results = self._execute(self.service.files().list(**params))
+            yield from results.get('files', [])
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+            params['pageToken'] = page_token
+    
+    def iter_images_in_folder(self, folder_id: str, fields: str = None) -> Iterator[Dict]:
+        """Yield the images directly inside a folder, ordered by name"""
+        return self.iter_files(
+            f"'{folder_id}' in parents and mimeType contains 'image/' and trashed=false",
+            fields=fields or self.IMAGE_LIST_FIELDS,
+            order_by='name',
+        )
+    
+    def iter_images_in_folders(self, folder_ids: List[str], fields: str = None) -> Iterator[Dict]:
+        """Yield the images inside any of ``folder_ids`` with as few listings as possible.
+        
+        Folders are queried ``DRIVE_TREE_FETCH_CHUNK`` at a time with an
+        ``'<id>' in parents or ...`` query; each file includes its ``parents``
+        so callers can group the results in memory.
+        """
+        chunk_size = int(getattr(settings, 'DRIVE_TREE_FETCH_CHUNK', 50))
+        for start in range(0, len(folder_ids), chunk_size):
+            parents_clause = ' or '.join(
+                f"'{folder_id}' in parents" for folder_id in folder_ids[start:start + chunk_size]
+            )
+            yield from self.iter_files(
+                f"({parents_clause}) and mimeType contains 'image/' and trashed=false",
+                fields=f'{fields or self.IMAGE_LIST_FIELDS}, parents',
+                order_by='name',
+            )
+    
+    def iter_subfolders(self, folder_id: str, exclude: str = None) -> Iterator[Dict]:
+        """Yield the subfolders of a folder, ordered by name"""
+        query = f"'{folder_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        if exclude:
+            query += f" and name!='{self._escape_query_value(exclude)}'"
+        return self.iter_files(query, fields='id, name', order_by='name')
+    
+    def get_start_page_token(self) -> str:
+        """Changes API cursor for 'now'; later changes are listed from it"""
+        if not self.service:
+            self.authenticate()
+        return self._execute(self.service.changes().getStartPageToken())['startPageToken']
+    
+    def list_changes(self, page_token: str, file_fields: str = 'id, name, mimeType, parents, trashed') -> Tuple[List[Dict], str]:
+        """List every change since ``page_token``.
+        
+        Returns the changes and the cursor to pass next time. When nothing
+        changed this costs a single ``changes.list`` call.
+        """
+        changes = []
+        for page, token, last in self.iter_change_pages(page_token, file_fields):
+            changes.extend(page)
+            if last:
+                return changes, token
+    
+    def iter_change_pages(self, page_token: str, file_fields: str = 'id, name, mimeType, parents, trashed') -> Iterator[Tuple[List[Dict], str, bool]]:
+        """Yield ``(changes, token, last)`` for each page of changes since ``page_token``.
+        
+        ``token`` lists the changes after this page, so a caller that stops
+        early can store it and resume from there; on the ``last`` page it is
+        the cursor for the next sync. Pages are fetched as they're consumed.
+        """
+        if not self.service:
+            self.authenticate()
+        
+        while True:
+            results = self._execute(self.service.changes().list(
+                pageToken=page_token,
                 spaces='drive',
-                fields='files(id, name)'
-            ).execute()
-            
-            files = results.get('files', [])
-            return files[0]['id'] if files else None
-        except HttpError as error:
-            print(f'An error occurred: {error}')
-            return None
+                includeRemoved=True,
+                pageSize=self.LIST_PAGE_SIZE,
+                fields=f'nextPageToken, newStartPageToken, changes(fileId, removed, file({file_fields}))',
+            ))
+            if results.get('newStartPageToken'):
+                yield results.get('changes', []), results['newStartPageToken'], True
+                return
+            page_token = results['nextPageToken']
+            yield results.get('changes', []), page_token, False
+    
+    def batch_get_files(self, file_ids: List[str], fields: str = 'id, name') -> Dict[str, Optional[Dict]]:
+        """Fetch metadata for many files with Drive batch requests.
+        
+        Sends up to ``BATCH_LIMIT`` ``files.get`` calls per HTTP round-trip.
+        Failures are handled per item: a file that could not be fetched maps
+        to ``None`` instead of failing the whole batch.
+        """
+        if not self.service:
+            self.authenticate()
+        
+        service = self.service
+        results = {}
+        
+        def callback(request_id, response, exception):
+            if exception is not None:
+                logger.warning('Batch request for %s failed: %s', request_id, exception)
+                results[request_id] = None
+            else:
+                results[request_id] = response
+        
+        unique_ids = list(dict.fromkeys(file_ids))
+        for start in range(0, len(unique_ids), self.BATCH_LIMIT):
+            batch = service.new_batch_http_request(callback=callback)
+            for file_id in unique_ids[start:start + self.BATCH_LIMIT]:
+                batch.add(service.files().get(fileId=file_id, fields=fields), request_id=file_id)
+            self._execute(batch)
+        
+        return results
     
     def _is_production(self):
         """Check if we're in production (Vercel) environment"""
@@ -102,10 +334,85 @@ class GoogleDriveService:
             not debug_setting
         )
         
-        print(f"Production detection: VERCEL={vercel_env}, VERCEL_URL={vercel_url}, VERCEL_ENV={vercel_environment}, DEBUG={debug_setting}, Is Production={is_prod}")
+        logger.debug(
+            'Production detection: VERCEL=%s, VERCEL_URL=%s, VERCEL_ENV=%s, DEBUG=%s, Is Production=%s',
+            vercel_env, vercel_url, vercel_environment, debug_setting, is_prod,
+        )
         
         return is_prod
 
+    def _report_error(self, error: Exception):
+        logger.warning('Drive listing failed: %s', error)
+        self.errors.append(error)
+    
+    def _cached_listing(self, key: str, load):
+        """Result of ``load(service)`` through the stale-while-revalidate listing cache.
+        
+        ``load`` runs on a fresh service instance, possibly in a background
+        thread. A result produced with Drive errors raises ListingUnavailable
+        so a stale copy is served (or, with none, the partial result is
+        returned uncached); the errors are also recorded on this instance.
+        A load made while this request waits shares its time budget, and
+        waiting for another thread's load stops when the budget does; a
+        background refresh isn't bound by it.
+        """
+        caller = threading.current_thread()
+        
+        def loader():
+            budget = self.budget if threading.current_thread() is caller else None
+            service = type(self)(budget=budget)
+            result = load(service)
+            if service.errors:
+                self.errors.extend(service.errors)
+                raise ListingUnavailable(service.errors[-1], partial=result)
+            return result
+        return listing_cache.get(key, loader, wait_seconds=self.budget.remaining())
+    
+    def _fan_out(self, calls: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """Run independent calls concurrently and return ``{key: result}``.
+        
+        Calls run on the process-wide pool of DRIVE_FANOUT_WORKERS threads
+        (1 runs them in turn on this thread), so a batch of listings takes about as long as the
+        slowest one. Calls that raise, or haven't finished
+        DRIVE_FANOUT_TIMEOUT seconds after the batch started (or by the end
+        of the time budget, if sooner), are recorded in ``self.errors`` and
+        left out of the result: callers get what was listed in time, and the
+        incomplete result isn't cached as fresh.
+        """
+        workers = min(int(getattr(settings, 'DRIVE_FANOUT_WORKERS', 8)), len(calls))
+        results = {}
+        if workers <= 1:
+            for key, call in calls.items():
+                try:
+                    results[key] = call()
+                except Exception as e:
+                    self._report_error(e)
+            return results
+        
+        def run(call):
+            try:
+                return call()
+            finally:
+                # Worker threads may have opened connections (database cache backend)
+                connections.close_all()
+        
+        futures = {fan_out_executor().submit(run, call): key for key, call in calls.items()}
+        try:
+            timeout = min(float(getattr(settings, 'DRIVE_FANOUT_TIMEOUT', 20)), self.budget.remaining())
+            done, not_done = wait(futures, timeout=timeout)
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    self._report_error(e)
+            for future in not_done:
+                self._report_error(TimeoutError(f'{futures[future]} did not finish in time'))
+        finally:
+            # Don't wait for stragglers; calls still queued are dropped
+            for future in futures:
+                future.cancel()
+        return results
+    
     # -------- GCS helpers --------
     @cached_property
     def _gcs_enabled_public(self) -> bool:
@@ -124,7 +431,7 @@ class GoogleDriveService:
         try:
             return storage.Client.from_service_account_info(json.loads(settings.GCP_SERVICE_ACCOUNT_JSON))
         except Exception as e:
-            print(f"Failed to init GCS client: {e}")
+            logger.error('Failed to init GCS client: %s', e)
             return None
 
     def _build_gcs_public_url(self, folder_name: str, file_name: str) -> Optional[str]:
@@ -136,83 +443,164 @@ class GoogleDriveService:
         path = f"{quote(prefix)}/{quote(folder_name)}/{quote(file_name)}"
         return f"{base}/{path}"
 
+    def _gcs_private_blob_path(self, folder_name: str, file_name: str) -> str:
+        prefix = getattr(settings, 'GCS_PRIVATE_PREFIX', 'Private_Albums').strip('/')
+        return f"{prefix}/{folder_name}/{file_name}"
+
     def _build_gcs_private_signed_url(self, folder_name: str, file_name: str) -> Optional[str]:
+        return self._build_gcs_private_signed_urls(folder_name, [file_name]).get(file_name)
+
+    def _build_gcs_private_signed_urls(self, folder_name: str, file_names: List[str]) -> Dict[str, str]:
+        """Map file name -> signed URL for several files of one private folder.
+        
+        URLs are reused from the shared signed URL cache; all misses are
+        signed in one pass with a single bucket handle.
+        """
+        if not self._gcs_client or not file_names:
+            return {}
+        bucket_name = settings.GCS_PRIVATE_BUCKET
+        bucket = self._gcs_client.bucket(bucket_name)
+
+        def sign(blob_path):
+            try:
+                return bucket.blob(blob_path).generate_signed_url(
+                    version='v4',
+                    expiration=signed_url_cache.lifetime,
+                    method='GET',
+                )
+            except Exception as e:
+                logger.error('Failed to sign GCS URL: %s', e)
+                return None
+
+        paths = {self._gcs_private_blob_path(folder_name, file_name): file_name for file_name in file_names}
+        urls = signed_url_cache.sign_many(bucket_name, paths, sign)
+        return {paths[path]: url for path, url in urls.items()}
+    
+    def _gcs_private_blob(self, folder_name: str, file_name: str):
         if not self._gcs_client:
             return None
-        try:
-            bucket_name = settings.GCS_PRIVATE_BUCKET
-            prefix = getattr(settings, 'GCS_PRIVATE_PREFIX', 'Private_Albums').strip('/')
-            blob_path = f"{prefix}/{folder_name}/{file_name}"
-            bucket = self._gcs_client.bucket(bucket_name)
-            blob = bucket.blob(blob_path)
-            url = blob.generate_signed_url(
-                version='v4',
-                expiration=timedelta(hours=int(getattr(settings, 'GCS_SIGNED_URL_HOURS', 6))),
-                method='GET',
-            )
-            return url
-        except Exception as e:
-            print(f"Failed to sign GCS URL: {e}")
-            return None
+        return self._gcs_client.bucket(settings.GCS_PRIVATE_BUCKET).blob(self._gcs_private_blob_path(folder_name, file_name))
+    
+    def fetch_image_content(self, file_id: str, file_name: str, folder_name: str, f, downloader: DriveDownloader = None) -> int:
+        """Write an image's bytes to the seekable file ``f``; returns the size.
+        
+        Reads the GCS mirror when one is configured and falls back to the
+        Drive API, so it works for images that were never downloaded locally.
+        """
+        blob = self._gcs_private_blob(folder_name, file_name)
+        if blob is not None:
+            try:
+                blob.download_to_file(f)
+                return f.tell()
+            except Exception as e:
+                logger.warning('GCS download failed for %s/%s, using Google Drive: %s', folder_name, file_name, e)
+        return (downloader or DriveDownloader(self)).download_to_fileobj(file_id, f)
+    
+    @staticmethod
+    def _drive_download_url(file_id: str) -> str:
+        return f"https://drive.google.com/uc?id={file_id}&export=download"
     
     def _get_high_quality_image_url(self, file_id: str) -> str:
         """Get high-quality image URL from Google Drive"""
-        try:
-            # Always try the direct download URL first (don't test it with requests in production)
-            original_url = f"https://drive.google.com/uc?id={file_id}&export=download"
-            
-            # In production, just return the direct URL without testing it
-            # Testing URLs with requests.head() can cause timeouts on Vercel
-            if self._is_production():
-                return original_url
-            
-            # In development, we can afford to test the URL
-            import requests
+        return self._get_high_quality_image_urls([file_id])[file_id]
+    
+    def _get_high_quality_image_urls(self, file_ids: List[str]) -> Dict[str, str]:
+        """Get high-quality image URLs for many files at once.
+        
+        Files whose direct download URL doesn't respond fall back to
+        ``webContentLink`` and then an enlarged ``thumbnailLink``; both are
+        fetched together for every such file through Drive batch requests.
+        """
+        # Always try the direct download URL first (don't test it with requests in production)
+        urls = {file_id: self._drive_download_url(file_id) for file_id in file_ids}
+        
+        # In production, just return the direct URLs without testing them
+        # Testing URLs with requests.head() can cause timeouts on Vercel
+        if not file_ids or self._is_production():
+            return urls
+        
+        # In development, we can afford to test the URLs, time budget permitting
+        import requests
+        unreachable = []
+        for checked, file_id in enumerate(file_ids):
+            if self.budget.low():
+                # Probing is optional: keep the direct URLs of the rest
+                logger.info('Time budget low, not checking %d image URLs', len(file_ids) - checked)
+                break
             try:
-                response = requests.head(original_url, timeout=3)
+                response = requests.head(urls[file_id], timeout=self.budget.timeout(3))
                 if response.status_code in [200, 303]:  # 303 is redirect which is normal
-                    return original_url
-            except:
+                    continue
+            except Exception:
                 pass  # Continue to fallbacks if HEAD request fails
-            
-            # Fallback to webContentLink if available
-            if not self.service:
-                self.authenticate()
-            
-            try:
-                file_info = self.service.files().get(fileId=file_id, fields='webContentLink').execute()
-                if file_info.get('webContentLink'):
-                    return file_info['webContentLink']
-            except:
-                pass
-            
-            # Final fallback to thumbnailLink but with larger size
-            try:
-                file_info = self.service.files().get(fileId=file_id, fields='thumbnailLink').execute()
-                if file_info.get('thumbnailLink'):
-                    # Replace s220 with s1200 for higher quality
-                    return file_info['thumbnailLink'].replace('=s220', '=s1200')
-            except:
-                pass
-            
-            return original_url
-            
+            unreachable.append(file_id)
+        
+        if not unreachable or self.budget.low():
+            return urls
+        
+        try:
+            metadata = self.batch_get_files(unreachable, fields='webContentLink, thumbnailLink')
         except Exception as e:
-            print(f"Error getting high-quality URL for {file_id}: {e}")
-            return f"https://drive.google.com/uc?id={file_id}&export=download"
+            logger.warning('Error getting high-quality URLs for %d files: %s', len(unreachable), e)
+            return urls
+        
+        for file_id, file_info in metadata.items():
+            if not file_info:
+                continue
+            if file_info.get('webContentLink'):
+                urls[file_id] = file_info['webContentLink']
+            elif file_info.get('thumbnailLink'):
+                # Replace s220 with s1200 for higher quality
+                urls[file_id] = file_info['thumbnailLink'].replace('=s220', '=s1200')
+        
+        return urls
+    
+    @staticmethod
+    def _thumbnail_urls(file: Dict) -> Dict[str, str]:
+        """Grid tile URLs for an image listed from Drive, which has no local derivatives.
+        
+        Drive's ``thumbnailLink`` serves any width when its ``=s220`` suffix is
+        replaced by ``=w<width>``. The link stops working after a few hours,
+        so tiles fall back to ``download_url`` if it fails to load.
+        """
+        link = file.get('thumbnailLink')
+        if not link:
+            return {}
+        base = re.sub(r'=s\d+$', '', link)
+        widths = derivative_widths()
+        return {
+            'thumbnail_url': f'{base}=w{widths[0]}',
+            'srcset_webp': '',
+            'srcset_jpeg': ', '.join(f'{base}=w{width} {width}w' for width in widths),
+        }
+    
+    def _resolve_image_urls(self, files: List[Dict], build_url) -> Dict[str, str]:
+        """Map file ID -> URL, preferring ``build_url(file)`` (GCS) and batching Drive fallbacks"""
+        urls = {}
+        missing = []
+        for file in files:
+            url = build_url(file)
+            if url:
+                urls[file['id']] = url
+            else:
+                missing.append(file['id'])
+        urls.update(self._get_high_quality_image_urls(missing))
+        return urls
     
     def get_public_carousel_images(self) -> List[Dict]:
         """Get images from the 'public' folder for carousel display"""
+        if self._catalog_enabled():
+            return self._get_files_in_folder_from_catalog('public', 'Public_Portfolio')
         if self._is_production():
             # In production, prefer GCS URLs if configured; fallback to Drive
-            return self._get_public_carousel_images_from_drive()
+            return self._cached_listing('public-carousel', lambda service: service._get_public_carousel_images_from_drive())
         else:
             # In development, use local images
             return self._get_public_carousel_images_local()
     
     def _get_public_carousel_images_local(self) -> List[Dict]:
         """Get local images from database"""
-        local_images = Image.objects.filter(folder_name='public', parent_folder_name='Public_Portfolio')
+        local_images = Image.objects.filter(folder_name='public', parent_folder_name='Public_Portfolio').prefetch_related('derivatives')
         
         image_files = []
         for image in local_images:
@@ -223,7 +611,8 @@ class GoogleDriveService:
                     'mime_type': image.mime_type,
                     'download_url': image.local_url,
                     'size': image.size,
-                    'dimensions': image.width
+                    'dimensions': image.width,
+                    **image.responsive_urls(),
                 })
         
         return image_files
@@ -232,61 +621,59 @@ class GoogleDriveService:
         """Get images via Drive listing; prefer GCS URLs when available"""
         try:
             if not self.service:
-                print("Authenticating with Google Drive...")
                 self.authenticate()
             
             # Get Public_Portfolio folder ID
             portfolio_folder_id = self.get_folder_id('Public_Portfolio')
             if not portfolio_folder_id:
-                print("ERROR: Public_Portfolio folder not found")
+                logger.error('Public_Portfolio folder not found')
                 return []
             
             # Get 'public' folder ID
             public_folder_id = self.get_folder_id('public', 'Public_Portfolio')
             if not public_folder_id:
-                print("ERROR: public folder not found")
+                logger.error('public folder not found')
                 return []
             
-            print(f"Found folders: Public_Portfolio={portfolio_folder_id}, public={public_folder_id}")
+            logger.debug('Found folders: Public_Portfolio=%s, public=%s', portfolio_folder_id, public_folder_id)
             
-            results = self.service.files().list(
-                q=f"'{public_folder_id}' in parents and trashed=false",
-                spaces='drive',
-                fields='files(id, name, mimeType, webViewLink, webContentLink, thumbnailLink, size, imageMediaMetadata)',
-                orderBy='name'
-            ).execute()
-            
-            files = results.get('files', [])
-            print(f"Found {len(files)} files in public folder")
-            
-            image_files = []
-            for file in files:
-                if file['mimeType'].startswith('image/'):
-                    # Prefer GCS public URL if configured; else Drive HQ URL
-                    gcs_url = self._build_gcs_public_url('public', file['name'])
-                    image_url = gcs_url or self._get_high_quality_image_url(file['id'])
-                    
-                    print(f"Image {file['name']}: {image_url}")
-                    
-                    image_files.append({
-                        'id': file['id'],
-                        'name': file['name'],
-                        'mime_type': file['mimeType'],
-                        'download_url': image_url,
-                        'size': file.get('size', ''),
-                        'dimensions': file.get('imageMediaMetadata', {}).get('width', 0) if file.get('imageMediaMetadata') else 0
-                    })
-            
-            print(f"Returning {len(image_files)} image files")
+            files = list(self.iter_images_in_folder(public_folder_id, fields=self.IMAGE_METADATA_FIELDS))
+            image_files = self._carousel_image_entries(files)
+            logger.debug('Returning %d image files', len(image_files))
             return image_files
         except Exception as e:
-            print(f'ERROR in _get_public_carousel_images_from_drive: {e}')
-            import traceback
-            traceback.print_exc()
+            logger.exception('Listing the carousel images failed: %s', e)
+            self.errors.append(e)
             return []
     
+    def _carousel_image_entries(self, files: List[Dict]) -> List[Dict]:
+        """Page entries for the 'public' folder's Drive listing"""
+        # Prefer GCS public URL if configured; else Drive HQ URL
+        urls = self._resolve_image_urls(files, lambda file: self._build_gcs_public_url('public', file['name']))
+        
+        image_files = []
+        for file in files:
+            image_url = urls[file['id']]
+            
+            image_files.append({
+                'id': file['id'],
+                'name': file['name'],
+                'mime_type': file['mimeType'],
+                'download_url': image_url,
+                **self._thumbnail_urls(file),
+                'size': file.get('size', ''),
+                'dimensions': file.get('imageMediaMetadata', {}).get('width', 0) if file.get('imageMediaMetadata') else 0
+            })
+        return image_files
+    
+    def _drive_listings_enabled(self) -> bool:
+        """Whether listings come from the Drive API (rather than the catalog or local files)"""
+        return not self._catalog_enabled() and self._is_production()
+    
     def get_files_in_folder(self, folder_name: str, parent_folder_name: str = None) -> List[Dict]:
         """Get all files in a folder"""
+        if self._catalog_enabled():
+            return self._get_files_in_folder_from_catalog(folder_name, parent_folder_name)
         if self._is_production():
             # In production, use Google Drive URLs directly
             return self._get_files_in_folder_from_drive(folder_name, parent_folder_name)
@@ -296,7 +683,7 @@ class GoogleDriveService:
     
     def _get_files_in_folder_local(self, folder_name: str, parent_folder_name: str = None) -> List[Dict]:
         """Get local images from database"""
-        local_images = Image.objects.filter(folder_name=folder_name, parent_folder_name=parent_folder_name)
+        local_images = Image.objects.filter(folder_name=folder_name, parent_folder_name=parent_folder_name).prefetch_related('derivatives')
         
         if local_images.exists():
             # Use local images
@@ -307,7 +694,8 @@ class GoogleDriveService:
                         'id': image.google_drive_id,
                         'name': image.name,
                         'mime_type': image.mime_type,
-                        'download_url': image.local_url
+                        'download_url': image.local_url,
+                        **image.responsive_urls(),
                     })
             return image_files
         else:
@@ -316,43 +704,61 @@ class GoogleDriveService:
     
     def _get_files_in_folder_from_drive(self, folder_name: str, parent_folder_name: str = None) -> List[Dict]:
         """Get images via Drive listing; prefer GCS URLs"""
+        files = self._cached_listing(
+            f'folder:{join_folder_path(parent_folder_name, folder_name)}',
+            lambda service: service._list_folder_images(folder_name, parent_folder_name),
+        )
+        return self._folder_image_entries(folder_name, parent_folder_name, files)
+    
+    def _folder_image_entries(self, folder_name: str, parent_folder_name: str, files: List[Dict]) -> List[Dict]:
+        """Page entries for a folder's Drive listing"""
+        if not files:
+            return []
+        
+        # URLs are built per request: signed URLs expire, cached listings outlive them
+        # Public portfolio uses public bucket; private albums use signed URLs
+        if parent_folder_name == 'Public_Portfolio':
+            urls = self._resolve_image_urls(files, lambda file: self._build_gcs_public_url(folder_name, file['name']))
+        else:
+            signed_urls = self._build_gcs_private_signed_urls(folder_name, [file['name'] for file in files])
+            urls = self._resolve_image_urls(files, lambda file: signed_urls.get(file['name']))
+        
+        image_files = []
+        for file in files:
+            image_files.append({
+                'id': file['id'],
+                'name': file['name'],
+                'mime_type': file['mimeType'],
+                'download_url': urls[file['id']],
+                **self._thumbnail_urls(file),
+                'md5_checksum': file.get('md5Checksum', ''),
+                'modified_time': file.get('modifiedTime', ''),
+            })
+        
+        return image_files
+    
+    def _list_folder_images(self, folder_name: str, parent_folder_name: str = None) -> List[Dict]:
+        """Drive metadata of a folder's images, uncached"""
         if not self.service:
             self.authenticate()
         
-        folder_id = self.get_folder_id(folder_name, parent_folder_name)
+        path = join_folder_path(parent_folder_name, folder_name)
+        folder_id = self.resolve_folder_path(path)
         if not folder_id:
             return []
         
         try:
-            results = self.service.files().list(
-                q=f"'{folder_id}' in parents and trashed=false",
-                spaces='drive',
-                fields='files(id, name, mimeType, webViewLink, webContentLink, thumbnailLink)',
-                orderBy='name'
-            ).execute()
-            
-            files = results.get('files', [])
-            image_files = []
-            for file in files:
-                if file['mimeType'].startswith('image/'):
-                    # Public portfolio uses public bucket; private albums use signed URLs
-                    if parent_folder_name == 'Public_Portfolio':
-                        gcs_url = self._build_gcs_public_url(folder_name, file['name'])
-                        image_url = gcs_url or self._get_high_quality_image_url(file['id'])
-                    else:
-                        signed = self._build_gcs_private_signed_url(folder_name, file['name'])
-                        image_url = signed or self._get_high_quality_image_url(file['id'])
-                    
-                    image_files.append({
-                        'id': file['id'],
-                        'name': file['name'],
-                        'mime_type': file['mimeType'],
-                        'download_url': image_url
-                    })
-            
-            return image_files
-        except HttpError as error:
-            print(f'An error occurred: {error}')
+            try:
+                return list(self.iter_images_in_folder(folder_id))
+            except HttpError as error:
+                if not self._is_not_found(error):
+                    raise
+                # The cached ID belongs to a folder deleted (or replaced) since
+                folder_id_cache.invalidate(path)
+                folder_id = self.resolve_folder_path(path, use_cache=False)
+                return list(self.iter_images_in_folder(folder_id)) if folder_id else []
+        except LISTING_ERRORS as error:
+            self._report_error(error)
             return []
     
     def _download_folder_images(self, folder_name: str, parent_folder_name: str = None) -> List[Dict]:
@@ -369,48 +775,37 @@ class GoogleDriveService:
             media_dir = os.path.join(settings.MEDIA_ROOT, 'images')
             os.makedirs(media_dir, exist_ok=True)
             
-            results = self.service.files().list(
-                q=f"'{folder_id}' in parents and trashed=false",
-                spaces='drive',
-                fields='files(id, name, mimeType, size, imageMediaMetadata)',
-                orderBy='name'
-            ).execute()
-            
-            files = results.get('files', [])
             image_files = []
             
-            for file in files:
-                if file['mimeType'].startswith('image/'):
-                    # Download and store the image
-                    success = self._download_and_store_image(file, media_dir, folder_name, parent_folder_name)
-                    if success:
-                        # Get the stored image
-                        stored_image = Image.objects.get(google_drive_id=file['id'])
-                        image_files.append({
-                            'id': stored_image.google_drive_id,
-                            'name': stored_image.name,
-                            'mime_type': stored_image.mime_type,
-                            'download_url': stored_image.local_url
-                        })
+            for file in self.iter_images_in_folder(folder_id, fields=self.DOWNLOAD_FIELDS):
+                # Download and store the image
+                success = self._download_and_store_image(file, media_dir, folder_name, parent_folder_name)
+                if success:
+                    # Get the stored image
+                    stored_image = Image.objects.get(google_drive_id=file['id'])
+                    image_files.append({
+                        'id': stored_image.google_drive_id,
+                        'name': stored_image.name,
+                        'mime_type': stored_image.mime_type,
+                        'download_url': stored_image.local_url,
+                        **stored_image.responsive_urls(),
+                    })
             
             return image_files
             
         except HttpError as error:
-            print(f'An error occurred: {error}')
+            self._report_error(error)
             return []
     
     def _download_and_store_image(self, file_data, media_dir, folder_name, parent_folder_name=None):
         """Download a single image and store it locally (development only)"""
         try:
-            # Generate local file path
-            file_extension = os.path.splitext(file_data['name'])[1]
-            local_filename = f"{file_data['id']}{file_extension}"
-            local_path = os.path.join(media_dir, local_filename)
-            
-            # Download file from Google Drive
-            request = self.service.files().get_media(fileId=file_data['id'])
-            with open(local_path, 'wb') as f:
-                f.write(request.execute())
+            # Files are stored by checksum; identical content is only fetched once
+            local_path = Image.local_path_for(file_data, media_dir)
+            checksum = file_data.get('md5Checksum')
+            if not (checksum and os.path.exists(local_path)):
+                # Stream the file from Google Drive to disk
+                DriveDownloader(self).download(file_data['id'], local_path, checksum)
             
             # Get image dimensions
             width = 0
@@ -432,25 +827,70 @@ class GoogleDriveService:
                     'size': int(file_data.get('size', 0)),
                     'width': width,
                     'height': height,
+                    'md5_checksum': checksum or '',
+                    'modified_time': parse_datetime(file_data['modifiedTime']) if file_data.get('modifiedTime') else None,
                 }
             )
             
-            print(f'Downloaded image: {file_data["name"]}')
+            # Resized copies for grid tiles
+            DerivativeGenerator().generate(image)
+            
+            logger.info('Downloaded image: %s', file_data['name'])
             return True
             
         except Exception as e:
-            print(f'Error downloading {file_data["name"]}: {e}')
+            logger.error('Error downloading %s: %s', file_data['name'], e)
             return False
     
+    def get_public_portfolio(self) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+        """Get all galleries and the carousel images for the home page"""
+        if self._catalog_enabled():
+            return self._get_public_portfolio_from_catalog()
+        if self._is_production():
+            return self._cached_listing('public-portfolio', lambda service: service._get_public_portfolio_from_drive())
+        else:
+            return self._get_public_portfolio_galleries_local(), self._get_public_carousel_images_local()
+    
     def get_public_portfolio_galleries(self) -> Dict[str, List[Dict]]:
         """Get all galleries from Public_Portfolio folder"""
+        if self._catalog_enabled():
+            galleries, _ = self._get_public_portfolio_from_catalog()
+            return galleries
         if self._is_production():
             # In production, get galleries directly from Google Drive
-            return self._get_public_portfolio_galleries_from_drive()
+            if self._tree_fetch_enabled():
+                # The home page's cached tree already has every gallery
+                galleries, _ = self._cached_listing('public-portfolio', lambda service: service._get_public_portfolio_from_drive())
+                return galleries
+            return self._cached_listing('public-galleries', lambda service: service._get_public_portfolio_galleries_from_drive())
         else:
             # In development, use local images
             return self._get_public_portfolio_galleries_local()
     
+    def get_public_gallery(self, gallery_name: str) -> List[Dict]:
+        """Get the images of a single gallery in Public_Portfolio.
+        
+        Only that gallery is resolved and listed (and cached, under its own
+        folder listing key), whatever the number of other galleries.
+        """
+        if gallery_name == 'public':
+            # The carousel folder isn't a gallery
+            return []
+        if self._catalog_enabled():
+            return self._get_files_in_folder_from_catalog(gallery_name, 'Public_Portfolio')
+        if self._is_production():
+            return self._get_files_in_folder_from_drive(gallery_name, 'Public_Portfolio')
+        else:
+            return self._get_public_gallery_local(gallery_name)
+    
+    def _get_public_portfolio_from_drive(self) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+        if self._tree_fetch_enabled():
+            return self._get_public_portfolio_tree_from_drive()
+        return self._list_public_portfolio_from_drive(include_carousel=True)
+    
+    def _tree_fetch_enabled(self) -> bool:
+        return bool(getattr(settings, 'DRIVE_TREE_FETCH', True))
+    
     def _get_public_portfolio_galleries_local(self) -> Dict[str, List[Dict]]:
         """Get local galleries from database"""
         galleries = {}
@@ -463,104 +903,312 @@ class GoogleDriveService:
         ).values_list('folder_name', flat=True).distinct()
         
         for gallery_name in gallery_names:
-            local_images = Image.objects.filter(folder_name=gallery_name, parent_folder_name='Public_Portfolio')
-            gallery_files = []
-            
-            for image in local_images:
-                if image.local_url and os.path.exists(image.local_file_path):
-                    gallery_files.append({
-                        'id': image.google_drive_id,
-                        'name': image.name,
-                        'mime_type': image.mime_type,
-                        'download_url': image.local_url
-                    })
-            
+            gallery_files = self._get_public_gallery_local(gallery_name)
             if gallery_files:
                 galleries[gallery_name] = gallery_files
         
         return galleries
     
+    def _get_public_gallery_local(self, gallery_name: str) -> List[Dict]:
+        """Get one gallery's local images from database"""
+        local_images = Image.objects.filter(folder_name=gallery_name, parent_folder_name='Public_Portfolio').prefetch_related('derivatives')
+        gallery_files = []
+        
+        for image in local_images:
+            if image.local_url and os.path.exists(image.local_file_path):
+                gallery_files.append({
+                    'id': image.google_drive_id,
+                    'name': image.name,
+                    'mime_type': image.mime_type,
+                    'download_url': image.local_url,
+                    **image.responsive_urls(),
+                })
+        
+        return gallery_files
+    
     def _get_public_portfolio_galleries_from_drive(self) -> Dict[str, List[Dict]]:
         """Get galleries directly from Google Drive"""
+        galleries, _ = self._list_public_portfolio_from_drive(include_carousel=False)
+        return galleries
+    
+    def _list_public_portfolio_from_drive(self, include_carousel: bool) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+        """List the gallery folders, then every gallery (and the carousel) concurrently"""
         galleries = {}
         
         # Get Public_Portfolio folder ID
         portfolio_folder_id = self.get_folder_id('Public_Portfolio')
         if not portfolio_folder_id:
-            return galleries
+            return galleries, []
         
         try:
             # Get all subfolders in Public_Portfolio (excluding 'public' folder)
-            results = self.service.files().list(
-                q=f"'{portfolio_folder_id}' in parents and mimeType='application/vnd.google-apps.folder' and name!='public' and trashed=false",
-                spaces='drive',
-                fields='files(id, name)',
-                orderBy='name'
-            ).execute()
+            subfolders = list(self.iter_subfolders(portfolio_folder_id, exclude='public'))
+            # The listing already tells us every gallery ID; remember them so the
+            # per-gallery listings below don't have to resolve the folders again
+            folder_id_cache.set_many({
+                join_folder_path('Public_Portfolio', subfolder['name']): subfolder['id']
+                for subfolder in subfolders
+            })
+        except LISTING_ERRORS as error:
+            self._report_error(error)
+            return galleries, []
+        
+        calls = {
+            subfolder['name']: (lambda name=subfolder['name']: self._get_files_in_folder_from_drive(name, 'Public_Portfolio'))
+            for subfolder in subfolders
+        }
+        if include_carousel:
+            # 'public' is never a gallery name, so it can't clash
+            calls['public'] = self._get_public_carousel_images_from_drive
+        listings = self._fan_out(calls)
+        
+        for subfolder in subfolders:
+            gallery_files = listings.get(subfolder['name'])
+            if gallery_files:
+                galleries[subfolder['name']] = gallery_files
+        
+        return galleries, listings.get('public', [])
+    
+    def _get_public_portfolio_tree_from_drive(self, include_carousel: bool = True) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+        """Get every gallery (and the carousel) under Public_Portfolio in a few queries.
+        
+        Lists the subfolders once, then fetches the images of many folders per
+        files.list call with an ``'<id>' in parents or ...`` query and groups
+        them by parent in memory, so the number of Drive calls does not grow
+        with the number of galleries.
+        """
+        galleries = {}
+        carousel_images = []
+        
+        portfolio_folder_id = self.get_folder_id('Public_Portfolio')
+        if not portfolio_folder_id:
+            logger.error('Public_Portfolio folder not found')
+            return galleries, carousel_images
+        
+        try:
+            subfolders = list(self.iter_subfolders(
+                portfolio_folder_id, exclude=None if include_carousel else 'public'
+            ))
+            folder_id_cache.set_many({
+                join_folder_path('Public_Portfolio', subfolder['name']): subfolder['id']
+                for subfolder in subfolders
+            })
+            if not subfolders:
+                return galleries, carousel_images
+            
+            files_by_parent = {subfolder['id']: [] for subfolder in subfolders}
+            folder_of = {}
+            # Results are ordered by name, so each group stays sorted
+            for file in self.iter_images_in_folders(list(files_by_parent), fields=self.IMAGE_METADATA_FIELDS):
+                for parent_id in file.get('parents', []):
+                    if parent_id in files_by_parent:
+                        files_by_parent[parent_id].append(file)
+                        folder_of[file['id']] = parent_id
             
-            subfolders = results.get('files', [])
+            # Parent folder name of every file, for building its GCS URL
+            folder_names = {subfolder['id']: subfolder['name'] for subfolder in subfolders}
+            urls = self._resolve_image_urls(
+                [file for files in files_by_parent.values() for file in files],
+                lambda file: self._build_gcs_public_url(folder_names[folder_of[file['id']]], file['name'])
+            )
             
             for subfolder in subfolders:
-                gallery_name = subfolder['name']
-                gallery_files = self._get_files_in_folder_from_drive(gallery_name, 'Public_Portfolio')
-                if gallery_files:
-                    galleries[gallery_name] = gallery_files
+                folder_name = subfolder['name']
+                files = files_by_parent[subfolder['id']]
+                if folder_name == 'public':
+                    for file in files:
+                        carousel_images.append({
+                            'id': file['id'],
+                            'name': file['name'],
+                            'mime_type': file['mimeType'],
+                            'download_url': urls[file['id']],
+                            **self._thumbnail_urls(file),
+                            'size': file.get('size', ''),
+                            'dimensions': file.get('imageMediaMetadata', {}).get('width', 0) if file.get('imageMediaMetadata') else 0
+                        })
+                elif files:
+                    galleries[folder_name] = [
+                        {
+                            'id': file['id'],
+                            'name': file['name'],
+                            'mime_type': file['mimeType'],
+                            'download_url': urls[file['id']],
+                            **self._thumbnail_urls(file),
+                        }
+                        for file in files
+                    ]
             
-            return galleries
-        except HttpError as error:
-            print(f'An error occurred: {error}')
-            return galleries
+            return galleries, carousel_images
+        except LISTING_ERRORS as error:
+            self._report_error(error)
+            return galleries, carousel_images
+    
+    # -------- Image catalog --------
+    def _catalog_enabled(self) -> bool:
+        """Render pages from the DriveFolder/Image catalog instead of calling Drive"""
+        return bool(getattr(settings, 'IMAGE_CATALOG', False))
+    
+    def _catalog_image_url(self, image: Image, signed_urls: Optional[Dict[str, str]] = None) -> str:
+        """URL for a catalogued image, built without any Drive calls.
+        
+        ``signed_urls`` (file name -> URL) holds private URLs already signed
+        for the image's folder by ``_sign_catalog_images``.
+        """
+        local_url = image.local_url
+        if local_url:
+            return local_url
+        if image.parent_folder_name == 'Public_Portfolio':
+            gcs_url = self._build_gcs_public_url(image.folder_name, image.name)
+        elif signed_urls is not None:
+            gcs_url = signed_urls.get(image.name)
+        else:
+            gcs_url = self._build_gcs_private_signed_url(image.folder_name, image.name)
+        return gcs_url or self._drive_download_url(image.google_drive_id)
+    
+    def _sign_catalog_images(self, folder_name: str, images: List[Image]) -> Dict[str, str]:
+        """Sign URLs for every private image of a folder that isn't served locally, in one pass"""
+        return self._build_gcs_private_signed_urls(folder_name, [
+            image.name for image in images
+            if image.parent_folder_name != 'Public_Portfolio' and not image.local_url
+        ])
+    
+    def _catalog_image_entry(self, image: Image, signed_urls: Optional[Dict[str, str]] = None) -> Dict:
+        return {
+            'id': image.google_drive_id,
+            'name': image.name,
+            'mime_type': image.mime_type,
+            'download_url': self._catalog_image_url(image, signed_urls),
+            'size': image.size,
+            'dimensions': image.width,
+            'width': image.width,
+            'height': image.height,
+            'md5_checksum': image.md5_checksum,
+            'modified_time': image.modified_time.isoformat() if image.modified_time else '',
+            **image.responsive_urls(),
+        }
+    
+    def _get_public_portfolio_from_catalog(self) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+        """Get every gallery and the carousel with a single database query"""
+        galleries = {}
+        carousel_images = []
+        
+        images = Image.objects.filter(
+            folder__parent_folder_name='Public_Portfolio'
+        ).select_related('folder').prefetch_related('derivatives').order_by('folder__position', 'folder__name', 'position')
+        
+        for image in images:
+            if image.folder.kind == DriveFolder.KIND_CAROUSEL:
+                carousel_images.append(self._catalog_image_entry(image))
+            else:
+                galleries.setdefault(image.folder.name, []).append(self._catalog_image_entry(image))
+        
+        return galleries, carousel_images
+    
+    def _get_files_in_folder_from_catalog(self, folder_name: str, parent_folder_name: str = None) -> List[Dict]:
+        """Get a folder's images from the catalog, in Drive name order"""
+        images = Image.objects.filter(
+            folder__name=folder_name, folder__parent_folder_name=parent_folder_name
+        ).prefetch_related('derivatives').order_by('position')
+        signed_urls = self._sign_catalog_images(folder_name, images)
+        return [self._catalog_image_entry(image, signed_urls) for image in images]
     
     def get_files_in_folder_by_id(self, folder_id: str) -> List[Dict]:
         """Get all files in a folder by ID"""
+        return self.get_files_in_folders_by_id([folder_id]).get(folder_id, [])
+    
+    def get_files_in_folders_by_id(self, folder_ids: List[str]) -> Dict[str, List[Dict]]:
+        """Get all files in several folders by ID"""
         if self._is_production():
             # In production, get files directly from Google Drive
-            return self._get_files_in_folder_by_id_from_drive(folder_id)
+            return self._get_files_in_folders_by_id_from_drive(folder_ids)
         else:
-            # In development, use folder-based approach
-            if not self.service:
-                self.authenticate()
-            
+            # In development, use folder-based approach; folder names are
+            # looked up for every folder together in batch requests
             try:
-                folder_info = self.service.files().get(fileId=folder_id).execute()
-                folder_name = folder_info['name']
-                
-                # Use the folder-based method
-                return self.get_files_in_folder(folder_name, 'Public_Portfolio')
-                
+                folders = self.batch_get_files(folder_ids, fields='id, name')
             except HttpError as error:
-                print(f'An error occurred: {error}')
-                return []
+                self._report_error(error)
+                return {}
+            
+            files_by_folder = {}
+            for folder_id, folder_info in folders.items():
+                if folder_info:
+                    # Use the folder-based method
+                    files_by_folder[folder_id] = self.get_files_in_folder(folder_info['name'], 'Public_Portfolio')
+            return files_by_folder
     
-    def _get_files_in_folder_by_id_from_drive(self, folder_id: str) -> List[Dict]:
-        """Get files directly from Google Drive by folder ID"""
+    def _get_files_in_folders_by_id_from_drive(self, folder_ids: List[str]) -> Dict[str, List[Dict]]:
+        """Get files directly from Google Drive for several folders, many folders per listing"""
+        files_by_folder = {folder_id: [] for folder_id in folder_ids}
         try:
-            results = self.service.files().list(
-                q=f"'{folder_id}' in parents and trashed=false",
-                spaces='drive',
-                fields='files(id, name, mimeType, webViewLink, webContentLink, thumbnailLink)',
-                orderBy='name'
-            ).execute()
-            
-            files = results.get('files', [])
-            image_files = []
-            for file in files:
-                if file['mimeType'].startswith('image/'):
-                    # Use high-quality image URL instead of thumbnail
-                    image_url = self._get_high_quality_image_url(file['id'])
-                    
-                    image_files.append({
-                        'id': file['id'],
-                        'name': file['name'],
-                        'mime_type': file['mimeType'],
-                        'download_url': image_url
-                    })
-            
-            return image_files
-        except HttpError as error:
-            print(f'An error occurred: {error}')
-            return []
+            files = []
+            # Results are ordered by name, so each folder's files stay sorted
+            for file in self.iter_images_in_folders(list(files_by_folder)):
+                files.append(file)
+                for parent_id in file.get('parents', []):
+                    if parent_id in files_by_folder:
+                        files_by_folder[parent_id].append(file)
+            # Use high-quality image URL instead of thumbnail
+            urls = self._get_high_quality_image_urls([file['id'] for file in files])
+        except LISTING_ERRORS as error:
+            self._report_error(error)
+            return {folder_id: [] for folder_id in folder_ids}
+        
+        return {
+            folder_id: [
+                {
+                    'id': file['id'],
+                    'name': file['name'],
+                    'mime_type': file['mimeType'],
+                    'download_url': urls[file['id']],
+                    **self._thumbnail_urls(file),
+                    'md5_checksum': file.get('md5Checksum', ''),
+                    'modified_time': file.get('modifiedTime', ''),
+                }
+                for file in folder_files
+            ]
+            for folder_id, folder_files in files_by_folder.items()
+        }
     
     def get_private_album_files(self, folder_name: str) -> List[Dict]:
         """Get all files from a private album folder"""
-        return self.get_files_in_folder(folder_name, 'Private_Albums') 
+        return self.get_files_in_folder(folder_name, 'Private_Albums')
+    
+    def get_private_album_image(self, folder_name: str, file_id: str, image: Optional[Image] = None) -> Optional[Dict]:
+        """Look up one image of a private album and build its URL, without listing the album.
+        
+        Catalogued images cost no Drive calls at all (just one URL signature);
+        otherwise a single files.get confirms the file is in the album folder.
+        Returns None if the image isn't part of the album.
+        """
+        if image is None:
+            image = Image.objects.filter(
+                google_drive_id=file_id, folder_name=folder_name, parent_folder_name='Private_Albums'
+            ).first()
+        if image is not None:
+            return {
+                'id': image.google_drive_id,
+                'name': image.name,
+                'mime_type': image.mime_type,
+                'download_url': self._catalog_image_url(image),
+            }
+        
+        if not self.service:
+            self.authenticate()
+        folder_id = self.get_folder_id(folder_name, 'Private_Albums')
+        if not folder_id:
+            return None
+        try:
+            file = self._execute(self.service.files().get(fileId=file_id, fields='id, name, mimeType, parents, trashed'))
+        except HttpError as error:
+            if error.resp.status == 404:
+                return None
+            raise
+        if file.get('trashed') or folder_id not in file.get('parents', []):
+            return None
+        return {
+            'id': file['id'],
+            'name': file['name'],
+            'mime_type': file['mimeType'],
+            'download_url': self._build_gcs_private_signed_url(folder_name, file['name']) or self._drive_download_url(file['id']),
+        }
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class SignedUrlCache:
+    """Blob path -> V4 signed URL stored in the Django cache, shared by every process.
+
+    A URL is signed for GCS_SIGNED_URL_HOURS and reused until
+    GCS_SIGNED_URL_REUSE_MARGIN_SECONDS before it expires, so any URL handed
+    out is still valid for at least the margin. Pages containing signed URLs
+    must therefore not be cached for longer than the margin; see
+    ``page_timeout``.
+    """
+
+    def __init__(self, hours: Optional[int] = None, margin: Optional[int] = None):
+        self.hours = hours if hours is not None else int(getattr(settings, 'GCS_SIGNED_URL_HOURS', 6))
+        self.margin = margin if margin is not None else int(
+            getattr(settings, 'GCS_SIGNED_URL_REUSE_MARGIN_SECONDS', 60 * 60)
+        )
+
+    @property
+    def lifetime(self) -> timedelta:
+        return timedelta(hours=self.hours)
+
+    @property
+    def timeout(self) -> int:
+        """How long a signed URL is reused; 0 means sign every time"""
+        return max(0, int(self.lifetime.total_seconds()) - self.margin)
+
+    def page_timeout(self, timeout: int) -> int:
+        """Cap a page cache timeout so cached pages never outlive the URLs in them"""
+        return min(timeout, self.margin)
+
+    def _key(self, bucket_name: str, blob_path: str) -> str:
+        # The lifetime is part of the key: changing it must not reuse old URLs
+        digest = hashlib.md5(f'{bucket_name}/{blob_path}'.encode('utf-8')).hexdigest()
+        return f'gcs-signed:{self.hours}:{digest}'
+
+    def get_many(self, bucket_name: str, blob_paths: Iterable[str]) -> Dict[str, str]:
+        """Return the cached URLs for whichever of ``blob_paths`` have one"""
+        if not self.timeout:
+            return {}
+        keys = {self._key(bucket_name, path): path for path in blob_paths}
+        found = cache.get_many(list(keys))
+        return {keys[key]: url for key, url in found.items()}
+
+    def set_many(self, bucket_name: str, mapping: Dict[str, str]):
+        if not mapping or not self.timeout:
+            return
+        cache.set_many({self._key(bucket_name, path): url for path, url in mapping.items()}, self.timeout)
+
+    def sign_many(self, bucket_name: str, blob_paths: Iterable[str],
+                  sign: Callable[[str], Optional[str]]) -> Dict[str, str]:
+        """Signed URLs for ``blob_paths``: one cache round trip, then ``sign(path)`` for each miss.
+
+        Paths ``sign`` fails for (returns None) are left out of the result.
+        """
+        blob_paths = list(dict.fromkeys(blob_paths))
+        urls = self.get_many(bucket_name, blob_paths)
+        signed = {}
+        for path in blob_paths:
+            if path not in urls:
+                url = sign(path)
+                if url:
+                    signed[path] = url
+        self.set_many(bucket_name, signed)
+        urls.update(signed)
+        return urls
+
+
+signed_url_cache = SignedUrlCache()
@@ -1,3 +1,805 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import httplib2
+from django.core.cache import cache, caches
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from googleapiclient.errors import HttpError
+
+from core import jobs
+from core.cache_backends import TieredCache, _stores
+from core.file_responses import parse_range, ranged_file_response
+from core.folder_cache import FolderIdCache, folder_id_cache
+from core.listing_cache import ListingCache, ListingUnavailable
+from core.models import Job
+from core.services import GoogleDriveService
+from core.signed_urls import SignedUrlCache
+from core.time_budget import DeadlineExceeded, TimeBudget
+
+# Tests that don't use the database can't use the db cache either
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'core.cache_backends.TieredCache', 'LOCATION': 'shared'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FolderIdCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.folders = FolderIdCache()
+        self.folders.set_many({
+            'Public_Portfolio': 'portfolio',
+            'Public_Portfolio/Weddings': 'weddings',
+            'Public_Portfolio/Weddings/2024': 'weddings-2024',
+            'Public_Portfolio/Weddings 2': 'weddings-2',
+            'Private_Albums/Weddings': 'private-weddings',
+        })
+
+    def test_same_name_under_different_parents_does_not_collide(self):
+        found = self.folders.get_many(['Public_Portfolio/Weddings', 'Private_Albums/Weddings'])
+        self.assertEqual(found, {
+            'Public_Portfolio/Weddings': 'weddings',
+            'Private_Albums/Weddings': 'private-weddings',
+        })
+
+    def test_unknown_paths_are_left_out(self):
+        self.assertEqual(self.folders.get_many(['Public_Portfolio/Portraits']), {})
+
+    def test_clear_bumps_the_generation(self):
+        self.folders.clear()
+        self.assertEqual(self.folders.get_many(['Public_Portfolio', 'Private_Albums/Weddings']), {})
+        self.folders.set_many({'Public_Portfolio': 'portfolio-new'})
+        self.assertEqual(self.folders.get_many(['Public_Portfolio']), {'Public_Portfolio': 'portfolio-new'})
+
+    def test_invalidate_drops_the_subtree_only(self):
+        self.folders.invalidate('Public_Portfolio/Weddings')
+        found = self.folders.get_many([
+            'Public_Portfolio',
+            'Public_Portfolio/Weddings',
+            'Public_Portfolio/Weddings/2024',
+            'Public_Portfolio/Weddings 2',
+            'Private_Albums/Weddings',
+        ])
+        self.assertEqual(found, {
+            'Public_Portfolio': 'portfolio',
+            'Public_Portfolio/Weddings 2': 'weddings-2',
+            'Private_Albums/Weddings': 'private-weddings',
+        })
+
+    def test_invalidated_path_can_be_cached_again(self):
+        self.folders.invalidate('/Public_Portfolio/Weddings/')
+        self.folders.set_many({'Public_Portfolio/Weddings': 'weddings-renamed'})
+        found = self.folders.get_many(['Public_Portfolio/Weddings', 'Public_Portfolio/Weddings/2024'])
+        self.assertEqual(found, {'Public_Portfolio/Weddings': 'weddings-renamed'})
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.failures = 0
+        self.register('test-ok', lambda payload: self.calls.append(payload))
+        self.register('test-fail', self.failing_handler)
+        self.register('test-resume', self.resuming_handler, cron=True)
+
+    def register(self, name, func, **kwargs):
+        jobs.register(name, **kwargs)(func)
+        self.addCleanup(jobs._handlers.pop, name, None)
+
+    def failing_handler(self, payload):
+        raise RuntimeError('Drive is down')
+
+    def resuming_handler(self, payload):
+        self.calls.append(payload)
+        if len(self.calls) == 1:
+            raise jobs.Reschedule('more to do')
+
+    def run_job(self, job, worker_id):
+        with redirect_stdout(io.StringIO()):
+            return jobs.run_job(job, worker_id)
+
+    def test_enqueue_returns_the_active_job_with_the_same_key(self):
+        first = jobs.enqueue('test-ok', {'n': 1}, key='same')
+        self.assertEqual(jobs.enqueue('test-ok', {'n': 2}, key='same').pk, first.pk)
+        Job.objects.filter(pk=first.pk).update(status=Job.STATUS_DONE)
+        self.assertNotEqual(jobs.enqueue('test-ok', key='same').pk, first.pk)
+
+    def test_claim_takes_a_lease_once(self):
+        job = jobs.enqueue('test-ok')
+        claimed = jobs.claim_next('worker-a')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.locked_by, claimed.attempts), (Job.STATUS_RUNNING, 'worker-a', 1))
+        self.assertGreater(claimed.locked_until, timezone.now())
+        self.assertIsNone(jobs.claim_next('worker-b'))
+
+    def test_jobs_are_not_claimed_before_run_after(self):
+        jobs.enqueue('test-ok', run_after=timezone.now() + timedelta(minutes=5))
+        self.assertIsNone(jobs.claim_next('worker-a'))
+
+    def test_claim_can_be_limited_to_names(self):
+        jobs.enqueue('test-ok')
+        self.assertIsNone(jobs.claim_next('worker-a', names=['test-resume']))
+        self.assertIsNotNone(jobs.claim_next('worker-a', names=['test-ok']))
+
+    def test_expired_lease_is_taken_over(self):
+        job = jobs.enqueue('test-ok')
+        jobs.claim_next('worker-a')
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        claimed = jobs.claim_next('worker-b')
+        self.assertEqual((claimed.pk, claimed.locked_by, claimed.attempts), (job.pk, 'worker-b', 2))
+        # The worker that lost its lease can't record an outcome any more
+        stale = Job.objects.get(pk=job.pk)
+        jobs._finish(stale, 'worker-a', Job.STATUS_DONE)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.STATUS_RUNNING)
+
+    def test_job_whose_leases_keep_expiring_fails(self):
+        job = jobs.enqueue('test-ok', max_attempts=1)
+        jobs.claim_next('worker-a')
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(jobs.claim_next('worker-b'))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.STATUS_FAILED)
+
+    def test_successful_job_is_done(self):
+        jobs.enqueue('test-ok', {'album': 'a'})
+        self.assertTrue(self.run_job(jobs.claim_next('worker-a'), 'worker-a'))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.locked_until), (Job.STATUS_DONE, None))
+        self.assertEqual(self.calls, [{'album': 'a'}])
+
+    def test_failed_job_is_retried_with_backoff_then_fails(self):
+        jobs.enqueue('test-fail', max_attempts=2)
+        self.assertFalse(self.run_job(jobs.claim_next('worker-a'), 'worker-a'))
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertIn('Drive is down', job.last_error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=30))
+
+        Job.objects.update(run_after=timezone.now())
+        self.assertFalse(self.run_job(jobs.claim_next('worker-a'), 'worker-a'))
+        self.assertEqual(Job.objects.get().status, Job.STATUS_FAILED)
+
+    def test_rescheduled_job_runs_again_without_using_up_attempts(self):
+        jobs.enqueue('test-resume', max_attempts=1)
+        self.assertTrue(self.run_job(jobs.claim_next('worker-a'), 'worker-a'))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_PENDING, 0))
+
+        self.assertTrue(self.run_job(jobs.claim_next('worker-a'), 'worker-a'))
+        self.assertEqual(Job.objects.get().status, Job.STATUS_DONE)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_run_pending_only_runs_the_given_names(self):
+        jobs.enqueue('test-ok')
+        jobs.enqueue('test-resume')
+        with redirect_stdout(io.StringIO()):
+            ran = jobs.run_pending('worker-a', max_jobs=5, names=jobs.cron_handler_names())
+        # Run once, rescheduled, then finished on the second claim
+        self.assertEqual(ran, 2)
+        self.assertEqual(Job.objects.get(name='test-ok').status, Job.STATUS_PENDING)
+        self.assertEqual(Job.objects.get(name='test-resume').status, Job.STATUS_DONE)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_byte_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=500-', 1000), (500, 999))
+        self.assertEqual(parse_range('bytes=900-5000', 1000), (900, 999))
+        self.assertEqual(parse_range(' bytes=10-10 ', 1000), (10, 10))
+
+    def test_suffix_ranges(self):
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_whole_file_for_unsupported_ranges(self):
+        self.assertIsNone(parse_range('bytes=0-1,5-9', 1000))
+        self.assertIsNone(parse_range('items=0-1', 1000))
+        self.assertIsNone(parse_range('bytes=-', 1000))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=20-10', 'bytes=-0'):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                parse_range(header, 1000)
+
+
+@override_settings(FILE_OFFLOAD='')
+class RangedFileResponseTests(SimpleTestCase):
+    content = bytes(range(256)) * 8
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.content)
+        self.addCleanup(os.remove, self.path)
+        self.factory = RequestFactory()
+
+    def respond(self, **headers):
+        request = self.factory.get('/download/', headers=headers)
+        response = ranged_file_response(request, self.path, 'image/jpeg', etag='abc', filename='photo.jpg')
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_response(self):
+        response = self.respond()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], '"abc"')
+        self.assertIn('photo.jpg', response['Content-Disposition'])
+
+    def test_partial_response(self):
+        response = self.respond(Range='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.content[100:200])
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+
+    def test_unsatisfiable_range(self):
+        response = self.respond(Range=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_if_range_must_match_to_resume(self):
+        self.assertEqual(self.respond(Range='bytes=0-9', **{'If-Range': '"abc"'}).status_code, 206)
+        stale = self.respond(Range='bytes=0-9', **{'If-Range': '"older"'})
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(self.body(stale), self.content)
+
+    def test_conditional_requests(self):
+        self.assertEqual(self.respond(**{'If-None-Match': '"abc"'}).status_code, 304)
+        self.assertEqual(self.respond(**{'If-None-Match': '"other"'}).status_code, 200)
+        modified = http_date(os.path.getmtime(self.path))
+        self.assertEqual(self.respond(**{'If-Modified-Since': modified}).status_code, 304)
+
+    def test_offload_to_nginx(self):
+        offload = {'FILE_OFFLOAD': 'x-accel', 'FILE_OFFLOAD_PREFIX': '/protected/',
+                   'FILE_OFFLOAD_ROOT': os.path.dirname(self.path)}
+        with override_settings(**offload):
+            response = self.respond(Range='bytes=0-9')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{os.path.basename(self.path)}')
+        self.assertEqual(response.content, b'')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SignedUrlCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.signed = []
+
+    def sign(self, path):
+        self.signed.append(path)
+        return None if path.endswith('broken.jpg') else f'https://signed.example/{path}?n={len(self.signed)}'
+
+    def test_page_timeout_never_outlives_the_urls(self):
+        urls = SignedUrlCache(hours=6, margin=3600)
+        self.assertEqual(urls.page_timeout(300), 300)
+        self.assertEqual(urls.page_timeout(24 * 3600), 3600)
+        # Any URL handed out stays valid for at least the margin, so a page
+        # cached for page_timeout never serves an expired URL
+        self.assertLessEqual(urls.timeout + urls.page_timeout(24 * 3600), 6 * 3600)
+
+    def test_urls_are_reused_within_the_reuse_window(self):
+        urls = SignedUrlCache(hours=6, margin=3600)
+        self.assertEqual(urls.timeout, 5 * 3600)
+        first = urls.sign_many('bucket', ['a/1.jpg', 'a/2.jpg', 'a/1.jpg'], self.sign)
+        second = urls.sign_many('bucket', ['a/1.jpg', 'a/2.jpg', 'a/3.jpg'], self.sign)
+        self.assertEqual(self.signed, ['a/1.jpg', 'a/2.jpg', 'a/3.jpg'])
+        self.assertEqual(second['a/1.jpg'], first['a/1.jpg'])
+
+    def test_failed_signatures_are_left_out_and_retried(self):
+        urls = SignedUrlCache(hours=6, margin=3600)
+        self.assertEqual(list(urls.sign_many('bucket', ['a/broken.jpg'], self.sign)), [])
+        urls.sign_many('bucket', ['a/broken.jpg'], self.sign)
+        self.assertEqual(self.signed, ['a/broken.jpg', 'a/broken.jpg'])
+
+    def test_buckets_and_lifetimes_have_separate_entries(self):
+        SignedUrlCache(hours=6, margin=3600).sign_many('bucket', ['a/1.jpg'], self.sign)
+        SignedUrlCache(hours=6, margin=3600).sign_many('other-bucket', ['a/1.jpg'], self.sign)
+        SignedUrlCache(hours=12, margin=3600).sign_many('bucket', ['a/1.jpg'], self.sign)
+        self.assertEqual(len(self.signed), 3)
+
+    def test_margin_longer_than_lifetime_disables_reuse(self):
+        urls = SignedUrlCache(hours=1, margin=3600)
+        self.assertEqual(urls.timeout, 0)
+        urls.sign_many('bucket', ['a/1.jpg'], self.sign)
+        urls.sign_many('bucket', ['a/1.jpg'], self.sign)
+        self.assertEqual(len(self.signed), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ListingCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.listings = ListingCache(fresh_seconds=60, stale_seconds=600, retry_seconds=30, lock_seconds=5)
+        self.loads = 0
+
+    def loader(self, value):
+        def load():
+            self.loads += 1
+            return value
+        return load
+
+    def make_stale(self, key):
+        entry = cache.get(ListingCache.cache_key(key))
+        entry['fresh_until'] = time.time() - 1
+        cache.set(ListingCache.cache_key(key), entry, 600)
+
+    def wait_for_refresh(self, key):
+        event = self.listings._inflight.get(key)
+        if event is not None:
+            self.assertTrue(event.wait(5))
+
+    def test_fresh_entries_are_served_from_the_cache(self):
+        self.assertEqual(self.listings.get('folder:a', self.loader(['1.jpg'])), ['1.jpg'])
+        self.assertEqual(self.listings.get('folder:a', self.loader(['2.jpg'])), ['1.jpg'])
+        self.assertEqual(self.loads, 1)
+        self.assertEqual((self.listings.stats['misses'], self.listings.stats['fresh']), (1, 1))
+
+    def test_stale_entries_are_served_while_refreshing_in_the_background(self):
+        self.listings.get('folder:a', self.loader(['1.jpg']))
+        self.make_stale('folder:a')
+
+        self.assertEqual(self.listings.get('folder:a', self.loader(['2.jpg'])), ['1.jpg'])
+        self.wait_for_refresh('folder:a')
+        self.assertEqual(self.listings.get('folder:a', self.loader(['3.jpg'])), ['2.jpg'])
+        self.assertEqual(self.listings.stats['refreshes'], 1)
+
+    def test_failed_refresh_keeps_the_stale_copy_for_the_retry_interval(self):
+        self.listings.get('folder:a', self.loader(['1.jpg']))
+        self.make_stale('folder:a')
+
+        def failing():
+            raise ListingUnavailable('Drive is down', partial=[])
+        with redirect_stdout(io.StringIO()):
+            self.listings.get('folder:a', failing)
+            self.wait_for_refresh('folder:a')
+
+        entry = cache.get(ListingCache.cache_key('folder:a'))
+        self.assertEqual(entry['value'], ['1.jpg'])
+        self.assertAlmostEqual(entry['fresh_until'], time.time() + 30, delta=5)
+        self.assertEqual(self.listings.stats['errors'], 1)
+
+    def test_another_process_holding_the_refresh_lock_skips_the_refresh(self):
+        self.listings.get('folder:a', self.loader(['1.jpg']))
+        self.make_stale('folder:a')
+        cache.add(f"{ListingCache.cache_key('folder:a')}:refreshing", 1, 60)
+
+        self.assertEqual(self.listings.get('folder:a', self.loader(['2.jpg'])), ['1.jpg'])
+        self.assertNotIn('folder:a', self.listings._inflight)
+        self.assertEqual(self.loads, 1)
+
+    def test_incomplete_listings_are_returned_but_not_cached(self):
+        def incomplete():
+            self.loads += 1
+            raise ListingUnavailable('timed out', partial=['1.jpg'])
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(self.listings.get('folder:a', incomplete), ['1.jpg'])
+        self.assertIsNone(cache.get(ListingCache.cache_key('folder:a')))
+
+    def test_concurrent_misses_share_one_load(self):
+        release = threading.Event()
+
+        def slow_load():
+            self.loads += 1
+            release.wait(5)
+            return ['1.jpg']
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.listings.get('folder:a', slow_load)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        # Let every thread reach the cache before the load finishes
+        deadline = time.monotonic() + 5
+        while self.listings.stats['coalesced'] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, [['1.jpg']] * 4)
+        self.assertEqual(self.loads, 1)
+
+    def test_concurrent_async_misses_share_one_load(self):
+        async def slow_load():
+            self.loads += 1
+            await asyncio.sleep(0.05)
+            return ['1.jpg']
+
+        async def main():
+            return await asyncio.gather(*(self.listings.aget('folder:a', slow_load) for _ in range(4)))
+
+        self.assertEqual(asyncio.run(main()), [['1.jpg']] * 4)
+        self.assertEqual(self.loads, 1)
+
+
+class TimeBudgetTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('core.time_budget.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_remaining_time_and_low(self):
+        budget = TimeBudget(seconds=25, low_seconds=5)
+        self.assertEqual(budget.remaining(), 25)
+        self.assertFalse(budget.low())
+        self.now += 21
+        self.assertEqual(budget.remaining(), 4)
+        self.assertTrue(budget.low())
+        self.assertFalse(budget.expired())
+        self.now += 10
+        self.assertEqual(budget.remaining(), 0)
+        self.assertTrue(budget.expired())
+
+    def test_timeout_is_capped_by_the_time_left(self):
+        budget = TimeBudget(seconds=25, low_seconds=5)
+        self.assertEqual(budget.timeout(10), 10)
+        self.now += 22
+        self.assertEqual(budget.timeout(10), 3)
+        self.now += 3
+        with self.assertRaises(DeadlineExceeded):
+            budget.timeout(10)
+
+    def test_deadline_exceeded_is_a_timeout(self):
+        # Listing code treats TimeoutError as a partial result, not a failure
+        self.assertTrue(issubclass(DeadlineExceeded, TimeoutError))
+
+    @override_settings(REQUEST_TIME_BUDGET_SECONDS=12, REQUEST_TIME_BUDGET_LOW_SECONDS=3)
+    def test_defaults_come_from_settings(self):
+        budget = TimeBudget()
+        self.assertEqual((budget.seconds, budget.low_seconds), (12, 3))
+
+    def test_unlimited(self):
+        budget = TimeBudget.unlimited()
+        self.now += 10 ** 6
+        self.assertFalse(budget.low())
+        self.assertEqual(budget.timeout(10), 10)
+
+
+@override_settings(DRIVE_FANOUT_WORKERS=4, DRIVE_FANOUT_TIMEOUT=0.2)
+class FanOutTests(SimpleTestCase):
+    def test_results_of_failed_and_slow_calls_are_left_out(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def fail():
+            raise IOError('Drive is down')
+
+        service = GoogleDriveService()
+        results = service._fan_out({'ok': lambda: [1], 'error': fail, 'slow': lambda: release.wait(5)})
+
+        self.assertEqual(results, {'ok': [1]})
+        self.assertEqual(len(service.errors), 2)
+        self.assertTrue(any(isinstance(error, TimeoutError) for error in service.errors))
+        self.assertTrue(any(isinstance(error, IOError) and 'Drive is down' in str(error) for error in service.errors))
+
+    def test_time_budget_cuts_the_wait_short(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        service = GoogleDriveService(budget=TimeBudget(0.05))
+        started = time.monotonic()
+        results = service._fan_out({'ok': lambda: 1, 'slow': lambda: release.wait(5)})
+        self.assertEqual(results, {'ok': 1})
+        self.assertLess(time.monotonic() - started, 0.2)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'tiered-l2': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-l2'},
+})
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        # L1 stores are shared per L2 alias; start each test with an empty one
+        _stores.pop('tiered-l2', None)
+        self.cache = TieredCache('tiered-l2', {'OPTIONS': {'L1_TIMEOUT': 0.1}})
+        self.l2 = caches['tiered-l2']
+        self.l2.clear()
+
+    def test_l1_serves_reads_until_l1_timeout(self):
+        self.cache.set('key', 'old', 300)
+        self.l2.set('key', 'new', 300)  # e.g. another process's write
+        self.assertEqual(self.cache.get('key'), 'old')
+        time.sleep(0.15)
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_l1_entry_never_outlives_its_timeout(self):
+        self.cache = TieredCache('tiered-l2', {'OPTIONS': {'L1_TIMEOUT': 30}})
+        self.cache.set('key', 'value', 0.1)
+        self.l2.delete('key')
+        self.assertEqual(self.cache.get('key'), 'value')
+        time.sleep(0.15)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_timeout_zero_stores_nothing(self):
+        self.cache.set('key', 'value', 0)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertIsNone(self.l2.get('key'))
+
+    def test_delete_goes_to_both_tiers(self):
+        self.cache.set('key', 'value')
+        self.cache.delete('key')
+        self.assertIsNone(self.l2.get('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_incr_goes_to_l2_and_drops_l1(self):
+        self.cache.set('count', 1)
+        self.assertEqual(self.cache.incr('count'), 2)
+        self.assertEqual(self.l2.get('count'), 2)
+        self.assertEqual(self.cache.get('count'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_reads_fill_l1_from_l2(self):
+        self.l2.set('key', 'shared')
+        self.assertEqual(self.cache.get('key'), 'shared')
+        self.l2.delete('key')
+        self.assertEqual(self.cache.get('key'), 'shared')
+        self.assertEqual(self.cache.stats()['l2']['hits'], 1)
+
+
+def http_error(status: int) -> HttpError:
+    return HttpError(httplib2.Response({'status': status}), b'{}')
+
+
+class FakeRequest:
+    def __init__(self, respond):
+        self.respond = respond
+
+    def execute(self, **kwargs):
+        return self.respond()
+
+
+class FakeDrive:
+    """Drive client whose files().list/get results come from ``handler(method, params)``"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+        self.batches = []
+
+    def files(self):
+        return self
+
+    def list(self, **params):
+        return self._request('list', params)
+
+    def get(self, **params):
+        return self._request('get', params)
+
+    def new_batch_http_request(self, callback):
+        batch = FakeBatch(callback)
+        self.batches.append(batch)
+        return batch
+
+    def _request(self, method, params):
+        def respond():
+            self.calls.append((method, params))
+            return self.handler(method, params)
+        return FakeRequest(respond)
+
+
+class FakeBatch:
+    """Runs its requests one by one on execute, reporting each to the callback like a Drive batch"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self, **kwargs):
+        for request_id, request in self.requests:
+            try:
+                response = request.execute()
+            except HttpError as error:
+                self.callback(request_id, None, error)
+            else:
+                self.callback(request_id, response, None)
+
+
+class FakeDriveTestCase(SimpleTestCase):
+    def use_drive(self, handler) -> FakeDrive:
+        drive = FakeDrive(handler)
+        patcher = mock.patch.object(GoogleDriveService, 'service', new_callable=mock.PropertyMock, return_value=drive)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return drive
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResolveFolderPathTests(FakeDriveTestCase):
+    def setUp(self):
+        cache.clear()
+        self.folders = {('Public_Portfolio', None): 'portfolio', ('Weddings', 'portfolio'): 'weddings-new'}
+
+    def handler(self, method, params):
+        if "'weddings-old' in parents" in params['q']:
+            raise http_error(404)
+        for (name, parent), folder_id in self.folders.items():
+            if f"name='{name}'" in params['q'] and (parent is None or f"'{parent}' in parents" in params['q']):
+                return {'files': [{'id': folder_id}]}
+        return {'files': []}
+
+    def test_deleted_cached_parent_is_resolved_again(self):
+        self.folders[('2024', 'weddings-new')] = 'weddings-2024'
+        folder_id_cache.set_many({'Public_Portfolio': 'portfolio', 'Public_Portfolio/Weddings': 'weddings-old'})
+        self.use_drive(self.handler)
+
+        service = GoogleDriveService()
+        self.assertEqual(service.resolve_folder_path('Public_Portfolio/Weddings/2024'), 'weddings-2024')
+        self.assertEqual(service.errors, [])
+        self.assertEqual(folder_id_cache.get_many(['Public_Portfolio/Weddings']), {'Public_Portfolio/Weddings': 'weddings-new'})
+
+    def test_listing_a_deleted_cached_folder_lists_its_replacement(self):
+        folder_id_cache.set_many({'Public_Portfolio': 'portfolio', 'Public_Portfolio/Weddings': 'weddings-old'})
+
+        def handler(method, params):
+            if "'weddings-new' in parents" in params['q']:
+                return {'files': [{'id': 'image', 'name': 'a.jpg', 'mimeType': 'image/jpeg'}]}
+            return self.handler(method, params)
+        self.use_drive(handler)
+
+        service = GoogleDriveService()
+        self.assertEqual([file['id'] for file in service._list_folder_images('Weddings', 'Public_Portfolio')], ['image'])
+        self.assertEqual(service.errors, [])
+
+
+@override_settings(IMAGE_DERIVATIVE_WIDTHS=[800, 400])
+class ThumbnailUrlsTests(SimpleTestCase):
+    def test_drive_thumbnail_link_is_resized_to_each_width(self):
+        urls = GoogleDriveService._thumbnail_urls({'thumbnailLink': 'https://lh3.googleusercontent.com/abc=s220'})
+        self.assertEqual(urls, {
+            'thumbnail_url': 'https://lh3.googleusercontent.com/abc=w400',
+            'srcset_webp': '',
+            'srcset_jpeg': 'https://lh3.googleusercontent.com/abc=w400 400w, https://lh3.googleusercontent.com/abc=w800 800w',
+        })
+
+    def test_files_without_a_thumbnail_link_keep_their_original(self):
+        self.assertEqual(GoogleDriveService._thumbnail_urls({'id': 'a'}), {})
+
+
+class IterFilesTests(FakeDriveTestCase):
+    def test_follows_next_page_token_past_one_page(self):
+        files = [{'id': f'file-{n}', 'name': f'{n}.jpg', 'mimeType': 'image/jpeg'} for n in range(2500)]
+
+        def handler(method, params):
+            start = int(params.get('pageToken', 0))
+            page = {'files': files[start:start + params['pageSize']]}
+            if start + params['pageSize'] < len(files):
+                page['nextPageToken'] = str(start + params['pageSize'])
+            return page
+        drive = self.use_drive(handler)
+
+        listed = list(GoogleDriveService().iter_files("'folder' in parents", fields='id, name'))
+        self.assertEqual(listed, files)
+        self.assertEqual([params.get('pageToken') for _, params in drive.calls], [None, '1000', '2000'])
+        self.assertEqual({params['pageSize'] for _, params in drive.calls}, {GoogleDriveService.LIST_PAGE_SIZE})
+        self.assertEqual(drive.calls[0][1]['fields'], 'nextPageToken, files(id, name)')
+
+    def test_pages_are_fetched_as_they_are_consumed(self):
+        drive = self.use_drive(lambda method, params: {'files': [{'id': 'a'}], 'nextPageToken': 'more'})
+        files = GoogleDriveService().iter_files("'folder' in parents")
+        next(files)
+        self.assertEqual(len(drive.calls), 1)
+
+
+@override_settings(DRIVE_TREE_FETCH_CHUNK=2)
+class IterImagesInFoldersTests(FakeDriveTestCase):
+    def test_folders_are_listed_a_chunk_at_a_time(self):
+        def handler(method, params):
+            folder_ids = re.findall(r"'([^']+)' in parents", params['q'])
+            return {'files': [{'id': f'{folder_id}-image', 'parents': [folder_id]} for folder_id in folder_ids]}
+        drive = self.use_drive(handler)
+
+        files = list(GoogleDriveService().iter_images_in_folders(['a', 'b', 'c', 'd', 'e']))
+        self.assertEqual([file['id'] for file in files], ['a-image', 'b-image', 'c-image', 'd-image', 'e-image'])
+        self.assertEqual(
+            [params['q'] for _, params in drive.calls],
+            [
+                "('a' in parents or 'b' in parents) and mimeType contains 'image/' and trashed=false",
+                "('c' in parents or 'd' in parents) and mimeType contains 'image/' and trashed=false",
+                "('e' in parents) and mimeType contains 'image/' and trashed=false",
+            ],
+        )
+        self.assertTrue(all(params['fields'].endswith(', parents)') for _, params in drive.calls))
+
+    def test_no_folders_no_calls(self):
+        drive = self.use_drive(lambda method, params: {'files': []})
+        self.assertEqual(list(GoogleDriveService().iter_images_in_folders([])), [])
+        self.assertEqual(drive.calls, [])
+
+
+class BatchGetFilesTests(FakeDriveTestCase):
+    def test_splits_into_batches_and_maps_failed_items_to_none(self):
+        def handler(method, params):
+            if params['fileId'] == 'file-7':
+                raise http_error(404)
+            return {'id': params['fileId'], 'name': f"{params['fileId']}.jpg"}
+        drive = self.use_drive(handler)
+
+        file_ids = [f'file-{n}' for n in range(250)]
+        with self.assertLogs('core.services', 'WARNING'):
+            results = GoogleDriveService().batch_get_files(file_ids + ['file-1'], fields='id, name')
+
+        self.assertEqual([len(batch.requests) for batch in drive.batches], [100, 100, 50])
+        self.assertEqual(len(results), 250)
+        self.assertIsNone(results['file-7'])
+        self.assertEqual(results['file-249'], {'id': 'file-249', 'name': 'file-249.jpg'})
+        self.assertEqual({params['fields'] for _, params in drive.calls}, {'id, name'})
+
+
+@override_settings(CACHES=LOCMEM_CACHES, GCS_PRIVATE_BUCKET='')
+class PrivateAlbumImageTests(FakeDriveTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        cache.clear()
+        folder_id_cache.set_many({'Private_Albums': 'albums', 'Private_Albums/Smith': 'smith'})
+        self.files = {
+            'in-album': {'id': 'in-album', 'name': 'a.jpg', 'mimeType': 'image/jpeg', 'parents': ['smith']},
+            'elsewhere': {'id': 'elsewhere', 'name': 'b.jpg', 'mimeType': 'image/jpeg', 'parents': ['jones']},
+            'trashed': {'id': 'trashed', 'name': 'c.jpg', 'mimeType': 'image/jpeg', 'parents': ['smith'], 'trashed': True},
+        }
+
+        def handler(method, params):
+            if params['fileId'] not in self.files:
+                raise http_error(404)
+            return self.files[params['fileId']]
+        self.drive = self.use_drive(handler)
+
+    def test_file_in_the_album_folder_is_found(self):
+        image = GoogleDriveService().get_private_album_image('Smith', 'in-album')
+        self.assertEqual((image['id'], image['name']), ('in-album', 'a.jpg'))
+        self.assertEqual([method for method, _ in self.drive.calls], ['get'])
+
+    def test_file_outside_the_album_folder_is_rejected(self):
+        self.assertIsNone(GoogleDriveService().get_private_album_image('Smith', 'elsewhere'))
+
+    def test_trashed_or_unknown_files_are_rejected(self):
+        self.assertIsNone(GoogleDriveService().get_private_album_image('Smith', 'trashed'))
+        self.assertIsNone(GoogleDriveService().get_private_album_image('Smith', 'missing'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DEBUG=False, IMAGE_CATALOG=False, GCS_PUBLIC_BASE_URL='')
+class PublicGalleryTests(FakeDriveTestCase):
+    def setUp(self):
+        cache.clear()
+        folder_id_cache.set_many({'Public_Portfolio': 'portfolio'})
+
+    def handler(self, method, params):
+        if "name='Weddings'" in params['q'] and "'portfolio' in parents" in params['q']:
+            return {'files': [{'id': 'weddings'}]}
+        if "'weddings' in parents" in params['q']:
+            return {'files': [{'id': 'a', 'name': 'a.jpg', 'mimeType': 'image/jpeg'}]}
+        return {'files': []}
+
+    def test_only_the_requested_gallery_is_listed(self):
+        drive = self.use_drive(self.handler)
+        images = GoogleDriveService().get_public_gallery('Weddings')
+
+        self.assertEqual([image['id'] for image in images], ['a'])
+        queries = [params['q'] for _, params in drive.calls]
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any("'portfolio' in parents and mimeType='application/vnd.google-apps.folder'" in query
+                             for query in queries))
+
+    def test_carousel_folder_is_not_a_gallery(self):
+        drive = self.use_drive(self.handler)
+        self.assertEqual(GoogleDriveService().get_public_gallery('public'), [])
+        self.assertEqual(drive.calls, [])
@@ -0,0 +1,50 @@
+import math
+import time
+from typing import Optional
+
+from django.conf import settings
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before a call could be made"""
+
+
+class TimeBudget:
+    """Time left to answer the current request, shared by every call made for it.
+
+    Vercel stops a function after its ``maxDuration``; REQUEST_TIME_BUDGET_SECONDS
+    is what a page may spend on Drive and GCS before that, leaving time to
+    render what was fetched. Outbound calls take the remaining time as their
+    timeout (``timeout``), optional work is skipped once less than
+    REQUEST_TIME_BUDGET_LOW_SECONDS is left (``low``), and calls made after
+    the deadline fail at once with DeadlineExceeded.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, low_seconds: Optional[float] = None):
+        self.seconds = seconds if seconds is not None else float(
+            getattr(settings, 'REQUEST_TIME_BUDGET_SECONDS', 25))
+        self.low_seconds = low_seconds if low_seconds is not None else float(
+            getattr(settings, 'REQUEST_TIME_BUDGET_LOW_SECONDS', 5))
+        self.deadline = time.monotonic() + self.seconds
+
+    @classmethod
+    def unlimited(cls) -> 'TimeBudget':
+        """No deadline, e.g. for management commands and background refreshes"""
+        return cls(seconds=math.inf, low_seconds=0)
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def low(self) -> bool:
+        """Whether optional work (e.g. probing fallback URLs) should be skipped"""
+        return self.remaining() < self.low_seconds
+
+    def timeout(self, cap: float) -> float:
+        """Timeout for the next call: the time left, at most ``cap``"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f'Request time budget of {self.seconds:g}s used up')
+        return min(cap, remaining)
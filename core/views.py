@@ -1,3 +1,29 @@
-from django.shortcuts import render
+import hmac
 
-# Create your views here.
+from django.conf import settings
+from django.http import Http404, HttpResponseForbidden, JsonResponse
+
+from core.jobs import cron_handler_names, run_pending, schedule_periodic_jobs
+
+
+def run_jobs(request):
+    """Cron entry point: queue and run due jobs that fit in the function's time limit.
+    
+    Only handlers registered with ``cron=True`` (the bounded, resumable
+    catalog sync) run here. Full Drive syncs with downloads and album
+    archive builds take longer than a serverless function may run; they
+    need a ``manage.py run_jobs --loop`` worker.
+    """
+    secret = getattr(settings, 'CRON_SECRET', '')
+    if not secret:
+        raise Http404()
+    
+    provided = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(provided, f'Bearer {secret}'):
+        return HttpResponseForbidden('Invalid cron secret')
+    
+    names = cron_handler_names()
+    schedule_periodic_jobs(names)
+    # One job per invocation; cron handlers stop within CRON_JOB_BUDGET_SECONDS
+    ran = run_pending(max_jobs=1, names=names)
+    return JsonResponse({'ran': ran})
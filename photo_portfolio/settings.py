@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -183,8 +184,158 @@ GCS_PUBLIC_PREFIX = os.environ.get('GCS_PUBLIC_PREFIX', 'ruansonder-r_public_por
 GCS_PRIVATE_BUCKET = os.environ.get('GCS_PRIVATE_BUCKET', '')
 GCS_PRIVATE_PREFIX = os.environ.get('GCS_PRIVATE_PREFIX', 'Private_Albums')
 GCS_SIGNED_URL_HOURS = int(os.environ.get('GCS_SIGNED_URL_HOURS', '6'))
+# Signed URLs are cached (per blob path) and reused until this many seconds
+# before they expire; pages with signed URLs are cached for at most this long
+GCS_SIGNED_URL_REUSE_MARGIN_SECONDS = int(os.environ.get('GCS_SIGNED_URL_REUSE_MARGIN_SECONDS', str(60 * 60)))
 GCP_SERVICE_ACCOUNT_JSON = os.environ.get('GCP_SERVICE_ACCOUNT_JSON', '')
 
+# How long resolved Google Drive folder IDs are cached (seconds)
+DRIVE_FOLDER_CACHE_SECONDS = int(os.environ.get('DRIVE_FOLDER_CACHE_SECONDS', str(6 * 60 * 60)))
+
+# Fetch the whole Public_Portfolio tree with batched '<id>' in parents queries
+# instead of one listing per gallery
+DRIVE_TREE_FETCH = os.environ.get('DRIVE_TREE_FETCH', 'True').lower() == 'true'
+DRIVE_TREE_FETCH_CHUNK = int(os.environ.get('DRIVE_TREE_FETCH_CHUNK', '50'))
+
+# Independent listings (one per gallery, galleries next to the carousel) run on
+# a process-wide pool of DRIVE_FANOUT_WORKERS threads (1 lists them one after
+# another). Listings
+# not done DRIVE_FANOUT_TIMEOUT seconds in are left out of the page
+DRIVE_FANOUT_WORKERS = int(os.environ.get('DRIVE_FANOUT_WORKERS', '8'))
+DRIVE_FANOUT_TIMEOUT = float(os.environ.get('DRIVE_FANOUT_TIMEOUT', '20'))
+
+# Time a page may spend on Drive/GCS calls (Vercel's maxDuration is 30s; the
+# rest is left for rendering). Each call's timeout is the time left; optional
+# work such as probing fallback image URLs is skipped once less than
+# REQUEST_TIME_BUDGET_LOW_SECONDS remain, and pages show what was listed in time
+REQUEST_TIME_BUDGET_SECONDS = float(os.environ.get('REQUEST_TIME_BUDGET_SECONDS', '25'))
+REQUEST_TIME_BUDGET_LOW_SECONDS = float(os.environ.get('REQUEST_TIME_BUDGET_LOW_SECONDS', '5'))
+
+# sync_google_drive download engine
+DRIVE_DOWNLOAD_WORKERS = int(os.environ.get('DRIVE_DOWNLOAD_WORKERS', '4'))
+# Simultaneous downloads per host; 0 allows one per worker
+DRIVE_DOWNLOAD_HOST_CONCURRENCY = int(os.environ.get('DRIVE_DOWNLOAD_HOST_CONCURRENCY', '0'))
+DRIVE_DOWNLOAD_MAX_RETRIES = int(os.environ.get('DRIVE_DOWNLOAD_MAX_RETRIES', '5'))
+DRIVE_DOWNLOAD_CHUNK_SIZE = int(os.environ.get('DRIVE_DOWNLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+
+# Render pages from the database image catalog (kept up to date by
+# `sync_google_drive --catalog`) instead of listing Google Drive per request
+IMAGE_CATALOG = os.environ.get('IMAGE_CATALOG', 'False').lower() == 'true'
+
+# Resized WebP/JPEG copies of downloaded images used by grid tiles (needs Pillow)
+IMAGE_DERIVATIVES = os.environ.get('IMAGE_DERIVATIVES', 'True').lower() == 'true'
+IMAGE_DERIVATIVE_WIDTHS = [int(width) for width in os.environ.get('IMAGE_DERIVATIVE_WIDTHS', '400,800,1600').split(',')]
+
+# On-demand resizes of public portfolio images served at
+# /img/<image_id>/w<width>.<webp|jpg>: the widths
+# that may be requested, and a size-bounded (LRU) disk cache for the results.
+# Defaults to the temp dir, the only writable path on Vercel
+IMAGE_RESIZE_WIDTHS = [int(width) for width in os.environ.get('IMAGE_RESIZE_WIDTHS', '200,400,600,800,1200,1600,2400').split(',')]
+IMAGE_RESIZE_CACHE_DIR = os.environ.get('IMAGE_RESIZE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'photo_portfolio', 'resized'))
+IMAGE_RESIZE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_RESIZE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+# Read size used when streaming album ZIP downloads
+ZIP_STREAM_CHUNK_SIZE = int(os.environ.get('ZIP_STREAM_CHUNK_SIZE', str(1024 * 1024)))
+# Images not stored locally are fetched from GCS/Drive by this many threads
+# ahead of the ZIP writer; each fetch stays in memory up to the spool size
+ZIP_PREFETCH_WORKERS = int(os.environ.get('ZIP_PREFETCH_WORKERS', '4'))
+ZIP_PREFETCH_SPOOL_BYTES = int(os.environ.get('ZIP_PREFETCH_SPOOL_BYTES', str(16 * 1024 * 1024)))
+# Album ZIPs are built once (in a background job) and kept here, keyed by a
+# hash of the album's image list; the sync drops them when an album changes.
+# Off unless ALBUM_ARCHIVE_DIR names writable storage shared by the worker
+# and the web processes (the deployed tree is read-only on Vercel)
+ALBUM_ARCHIVE_DIR = os.environ.get('ALBUM_ARCHIVE_DIR', '')
+ALBUM_ARCHIVE_CACHE = os.environ.get('ALBUM_ARCHIVE_CACHE', 'True' if ALBUM_ARCHIVE_DIR else 'False').lower() == 'true'
+
+# Hand file downloads to the web server instead of sending them from Python:
+# 'x-accel' (nginx X-Accel-Redirect to FILE_OFFLOAD_PREFIX + the path relative
+# to FILE_OFFLOAD_ROOT, an `internal` location) or 'x-sendfile' (Apache/lighttpd)
+FILE_OFFLOAD = os.environ.get('FILE_OFFLOAD', '')
+FILE_OFFLOAD_ROOT = os.environ.get('FILE_OFFLOAD_ROOT', str(BASE_DIR))
+FILE_OFFLOAD_PREFIX = os.environ.get('FILE_OFFLOAD_PREFIX', '/protected/')
+
+# Background jobs (`manage.py run_jobs`). Google Drive is synced by a
+# scheduled job every DRIVE_SYNC_INTERVAL_SECONDS (0 disables scheduling);
+# a worker's lease on a job expires after JOB_LEASE_SECONDS without a heartbeat
+DRIVE_SYNC_INTERVAL_SECONDS = int(os.environ.get('DRIVE_SYNC_INTERVAL_SECONDS', str(15 * 60)))
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '300'))
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', '7'))
+# Shared secret for the /jobs/run/ cron endpoint (Vercel Cron sends it as a
+# bearer token); the endpoint is disabled while this is empty. It only runs
+# jobs that fit in a function's time limit (with IMAGE_CATALOG, the catalog
+# change sync, which stops after CRON_JOB_BUDGET_SECONDS and continues on the
+# next call); downloads and album archives need a `run_jobs --loop` worker
+CRON_SECRET = os.environ.get('CRON_SECRET', '')
+CRON_JOB_BUDGET_SECONDS = float(os.environ.get('CRON_JOB_BUDGET_SECONDS', '20'))
+
+# Caching: a backend (L2) behind a small per-process LRU (L1). CACHE_BACKEND is
+# 'redis' (REDIS_URL, needs the redis package) or 'db' (a table in the main
+# database, created by build.sh) to share entries between every worker and
+# serverless instance; 'locmem' (per process) or 'file' (CACHE_LOCATION, which
+# must be writable; on Vercel only /tmp is, and it isn't shared) aren't shared
+# and must be chosen explicitly. Defaults to redis when REDIS_URL is set, else db
+REDIS_URL = os.environ.get('REDIS_URL', '')
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis' if REDIS_URL else 'db').lower()
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'photo_portfolio', 'django_cache'))
+CACHE_L1_MAX_ENTRIES = int(os.environ.get('CACHE_L1_MAX_ENTRIES', '256'))
+# Longest an L1 entry is used without checking L2, i.e. how long another
+# process's update or invalidation can take to be seen
+CACHE_L1_TIMEOUT = int(os.environ.get('CACHE_L1_TIMEOUT', '30'))
+
+if CACHE_BACKEND == 'redis':
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        print("WARNING: CACHE_BACKEND=redis but the redis package is not installed; using the db cache")
+        CACHE_BACKEND = 'db'
+
+if CACHE_BACKEND == 'redis' and REDIS_URL:
+    SHARED_CACHE = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}
+elif CACHE_BACKEND == 'file':
+    SHARED_CACHE = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_LOCATION}
+elif CACHE_BACKEND == 'locmem':
+    SHARED_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+else:
+    SHARED_CACHE = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'django_cache'}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': CACHE_L1_MAX_ENTRIES,
+            'L1_TIMEOUT': CACHE_L1_TIMEOUT,
+        },
+    },
+    'shared': SHARED_CACHE,
+}
+
+# Google Drive listings are cached at the service level: fresh for
+# LISTING_CACHE_FRESH_SECONDS, then served stale (up to
+# LISTING_CACHE_STALE_SECONDS longer) while one background refresh runs. When
+# Drive fails, the stale copy is kept and retried after LISTING_CACHE_RETRY_SECONDS
+LISTING_CACHE = os.environ.get('LISTING_CACHE', 'True').lower() == 'true'
+LISTING_CACHE_FRESH_SECONDS = int(os.environ.get('LISTING_CACHE_FRESH_SECONDS', str(5 * 60)))
+LISTING_CACHE_STALE_SECONDS = int(os.environ.get('LISTING_CACHE_STALE_SECONDS', str(24 * 60 * 60)))
+LISTING_CACHE_RETRY_SECONDS = int(os.environ.get('LISTING_CACHE_RETRY_SECONDS', '60'))
+LISTING_CACHE_LOCK_SECONDS = int(os.environ.get('LISTING_CACHE_LOCK_SECONDS', '60'))
+
+# Serve the home page, album pages and downloads with async views (for an
+# ASGI server, e.g. `uvicorn photo_portfolio.asgi:application`). Drive and GCS
+# calls then go through a pooled httpx client (needs the httpx package)
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False').lower() == 'true'
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.environ.get('ASYNC_HTTP_MAX_CONNECTIONS', '20'))
+ASYNC_HTTP_TIMEOUT = float(os.environ.get('ASYNC_HTTP_TIMEOUT', '10'))
+
+# Page cache lifetime per view in seconds, e.g. "portfolio_home=900,album_detail=300";
+# views not listed use 15 minutes
+CACHE_VIEW_TIMEOUTS = {
+    name.strip(): int(seconds)
+    for name, seconds in (
+        item.split('=', 1) for item in os.environ.get('CACHE_VIEW_TIMEOUTS', '').split(',') if '=' in item
+    )
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
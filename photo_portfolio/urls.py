@@ -19,11 +19,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
+from albums.views import resized_image
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('portfolio.urls')),
     path('album/', include('albums.urls')),
+    path('', include('core.urls')),
+    path('img/<str:image_id>/w<int:width>.<str:fmt>', resized_image, name='resized_image'),
     path('', RedirectView.as_view(url='/portfolio/', permanent=False)),
 ]
 
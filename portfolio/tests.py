@@ -1,3 +1,29 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.services import GoogleDriveService
+
+
+@override_settings(LISTING_CACHE_RETRY_SECONDS=60, CACHE_VIEW_TIMEOUTS={})
+class GalleryPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get(self, path, images):
+        with mock.patch.object(GoogleDriveService, 'get_public_gallery', return_value=images):
+            return self.client.get(path)
+
+    def test_gallery_page_is_cached_for_the_full_timeout(self):
+        response = self.get('/gallery/Weddings/', [{'id': 'a', 'name': 'a.jpg', 'download_url': '/a.jpg'}])
+        self.assertIn('max-age=900', response['Cache-Control'])
+
+    def test_unknown_gallery_is_only_cached_briefly(self):
+        response = self.get('/gallery/no-such-gallery/', [])
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+    def test_failed_render_is_only_cached_briefly(self):
+        with mock.patch.object(GoogleDriveService, 'get_public_gallery', side_effect=RuntimeError('Drive is down')):
+            response = self.client.get('/gallery/Weddings/')
+        self.assertIn('max-age=60', response['Cache-Control'])
@@ -1,23 +1,30 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 from django.http import JsonResponse
-from django.views.decorators.cache import cache_page
+from core.async_services import AsyncGoogleDriveService
 from core.services import GoogleDriveService
+from core.drive_client import drive_client_registry
+from core.page_cache import cache_stats, cached_page, mark_incomplete
+from core.time_budget import TimeBudget
 from urllib.parse import unquote
 
 
-@cache_page(60 * 15)  # Cache for 15 minutes
+@cached_page('portfolio_home')  # 15 minutes unless CACHE_VIEW_TIMEOUTS says otherwise
 def portfolio_home(request):
     """Display the main portfolio page with public galleries and carousel"""
     try:
-        drive_service = GoogleDriveService()
-        galleries = drive_service.get_public_portfolio_galleries()
-        carousel_images = drive_service.get_public_carousel_images()
+        # Drive calls stop in time to render whatever was listed before the function times out
+        drive_service = GoogleDriveService(budget=TimeBudget())
+        galleries, carousel_images = drive_service.get_public_portfolio()
         
         context = {
             'galleries': galleries,
             'carousel_images': carousel_images,
         }
-        return render(request, 'portfolio/home.html', context)
+        response = render(request, 'portfolio/home.html', context)
+        if drive_service.errors:
+            mark_incomplete(response)
+        return response
     except Exception as e:
         # Fallback to empty galleries if Google Drive is not available
         context = {
@@ -25,20 +32,49 @@ def portfolio_home(request):
             'carousel_images': [],
             'error': str(e) if request.user.is_staff else None,
         }
-        return render(request, 'portfolio/home.html', context)
+        return mark_incomplete(render(request, 'portfolio/home.html', context))
+
+
+@cached_page('portfolio_home')
+async def portfolio_home_async(request):
+    """Async portfolio_home (ASYNC_VIEWS): the galleries and the carousel are listed concurrently"""
+    drive_service = AsyncGoogleDriveService(budget=TimeBudget())
+    failed = False
+    try:
+        galleries, carousel_images = await drive_service.get_public_portfolio()
+        
+        context = {
+            'galleries': galleries,
+            'carousel_images': carousel_images,
+        }
+    except Exception as e:
+        failed = True
+        # Fallback to empty galleries if Google Drive is not available
+        user = await request.auser()
+        context = {
+            'galleries': {},
+            'carousel_images': [],
+            'error': str(e) if user.is_staff else None,
+        }
+    # Context processors touch the session and user: render off the event loop
+    response = await sync_to_async(render)(request, 'portfolio/home.html', context)
+    if failed or drive_service.errors:
+        mark_incomplete(response)
+    return response
 
 
 def portfolio_home_debug(request):
     """Debug version without caching"""
     try:
         drive_service = GoogleDriveService()
-        galleries = drive_service.get_public_portfolio_galleries()
-        carousel_images = drive_service.get_public_carousel_images()
+        galleries, carousel_images = drive_service.get_public_portfolio()
         
         context = {
             'galleries': galleries,
             'carousel_images': carousel_images,
             'debug': True,
+            'drive_client_stats': drive_client_registry.stats(),
+            'cache_stats': cache_stats(),
         }
         return render(request, 'portfolio/home.html', context)
     except Exception as e:
@@ -56,26 +92,29 @@ def contact(request):
     return render(request, 'portfolio/contact.html')
 
 
+@cached_page('gallery_detail')
 def gallery_detail(request, gallery_name):
     """Display a specific gallery"""
     try:
         # Decode the gallery name from URL encoding
         decoded_gallery_name = unquote(gallery_name)
         
-        drive_service = GoogleDriveService()
-        galleries = drive_service.get_public_portfolio_galleries()
-        
-        gallery_images = galleries.get(decoded_gallery_name, [])
+        drive_service = GoogleDriveService(budget=TimeBudget())
+        gallery_images = drive_service.get_public_gallery(decoded_gallery_name)
         
         context = {
             'gallery_name': decoded_gallery_name,
             'images': gallery_images,
         }
-        return render(request, 'portfolio/gallery_detail.html', context)
+        response = render(request, 'portfolio/gallery_detail.html', context)
+        # Any path renders a page, so an empty (or unknown) gallery is only cached briefly
+        if drive_service.errors or not gallery_images:
+            mark_incomplete(response)
+        return response
     except Exception as e:
         context = {
             'gallery_name': gallery_name,
             'images': [],
             'error': str(e) if request.user.is_staff else None,
         }
-        return render(request, 'portfolio/gallery_detail.html', context)
+        return mark_incomplete(render(request, 'portfolio/gallery_detail.html', context))
@@ -192,6 +192,19 @@ function initModalTouchEvents() {
   window.modalCarousel.addEventListener('touchend', handleEnd, { passive: false });
 }
 
+// Tiles whose thumbnail fails to load (Drive thumbnail links expire) show the full image instead
+function useImageFallback(img) {
+  const fallback = img.getAttribute('data-fallback');
+  if (!fallback || img.getAttribute('src') === fallback) return;
+  img.removeAttribute('srcset');
+  img.src = fallback;
+}
+
+// Image errors don't bubble, so listen in the capture phase
+document.addEventListener('error', (e) => {
+  if (e.target instanceof HTMLImageElement) useImageFallback(e.target);
+}, true);
+
 // Expose globally for templates that call these
 window.openModalCarousel = openModalCarousel;
 window.closeModalCarousel = closeModalCarousel;
@@ -207,6 +220,10 @@ document.addEventListener('DOMContentLoaded', () => {
   if (closeBtn) closeBtn.addEventListener('click', closeModalCarousel);
   // Init page carousel
   initCarousel();
+  // Thumbnails that failed before this script ran
+  document.querySelectorAll('img[data-fallback]').forEach((img) => {
+    if (img.complete && img.naturalWidth === 0) useImageFallback(img);
+  });
 });
 
 